@@ -1,58 +1,14 @@
+import argparse
+import hashlib
+import json
 import os
-import re
-
-# FAQ HTML and CSS
-FAQ_STYLE = """
-<style>
-.faq-section {
-    background: white;
-    border-radius: 15px;
-    box-shadow: 0 5px 25px rgba(0,0,0,0.1);
-    padding: 40px;
-    margin-top: 30px;
-    margin-bottom: 30px;
-}
-.faq-title {
-    font-size: 32px;
-    font-weight: bold;
-    color: #2d3748;
-    margin-bottom: 30px;
-    text-align: center;
-    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-}
-.faq-grid {
-    display: grid;
-    grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-    gap: 25px;
-}
-.faq-item {
-    background: #f9fafb;
-    padding: 25px;
-    border-radius: 12px;
-    border-right: 4px solid #667eea;
-    transition: transform 0.3s ease;
-}
-.faq-item:hover {
-    transform: translateY(-5px);
-}
-.faq-question {
-    font-weight: bold;
-    color: #2d3748;
-    margin-bottom: 12px;
-    font-size: 18px;
-    display: flex;
-    align-items: center;
-    gap: 10px;
-}
-.faq-answer {
-    color: #4b5563;
-    line-height: 1.6;
-}
-</style>
-"""
+import tempfile
+from functools import partial
+
+from html_pipeline import END, START, FaqStage, Pipeline, print_stage_timings
+from parallel import Timer, print_summary, run_files
 
+# FAQ HTML (its CSS is in templates/faq.css, bundled into the site stylesheet by build_assets.py)
 FAQ_HTML = """
 <section class="faq-section">
     <h2 class="faq-title">🤔 الأسئلة الشائعة</h2>
@@ -77,41 +33,109 @@ FAQ_HTML = """
 </section>
 """
 
-def update_product_pages():
-    products_dir = 'products'
+# Remembers size/mtime/hash of every page so reruns can skip untouched files without reading them
+MANIFEST_PATH = '.faq_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def template_hash():
+    return hashlib.sha256(FAQ_HTML.encode('utf-8')).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('version') != MANIFEST_VERSION:
+        manifest = {'version': MANIFEST_VERSION, 'template': None, 'files': {}}
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def generic_faq(texts):
+    return FAQ_HTML
+
+
+def build_pipeline(previous=None):
+    """Insert FAQ_HTML; `previous` is the template applied last time (replaced)."""
+    # Pages that already have an FAQ (current template or a product-specific one) keep it
+    stale = {previous['html'].strip()} if previous else set()
+    # Insert FAQ before footer
+    return Pipeline([FaqStage(generic_faq, anchors=((START, 'footer', None), (END, 'body', None)), stale=stale)])
+
+
+def process_page(path, pipeline, current_hash):
+    """Run the FAQ pipeline over one page; returns (changed, new manifest record, stage timings)."""
+    changed, digest, timings = pipeline.process_file(path)
+    st = os.stat(path)
+    return changed, {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': digest,
+        'template': current_hash,
+    }, timings
+
+
+def update_product_pages(products_dir='products', manifest_path=MANIFEST_PATH, jobs=1):
     if not os.path.exists(products_dir):
         print(f"Error: {products_dir} group not found.")
         return
 
-    count = 0
-    for filename in os.listdir(products_dir):
-        if filename.endswith('.html'):
-            filepath = os.path.join(products_dir, filename)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
+    manifest = load_manifest(manifest_path)
+    current = {'hash': template_hash(), 'html': FAQ_HTML}
+    previous = manifest['template']
+    if previous and previous['hash'] == current['hash']:
+        previous = None
+    elif previous:
+        print("FAQ template changed, re-applying to all pages...")
+    files = manifest['files']
 
-            # Skip if FAQ already exists
-            if 'faq-section' in content:
+    # Pages whose size/mtime match the manifest are skipped without being opened
+    pending = []
+    skipped = 0
+    seen = set()
+    with os.scandir(products_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.html'):
+                continue
+            seen.add(entry.name)
+            st = entry.stat()
+            record = files.get(entry.name)
+            if (record and record['size'] == st.st_size and record['mtime_ns'] == st.st_mtime_ns
+                    and record['template'] == current['hash']):
+                skipped += 1
                 continue
+            pending.append(entry.path)
+
+    pipeline = build_pipeline(previous)
+    worker = partial(process_page, pipeline=pipeline, current_hash=current['hash'])
+    with Timer() as t:
+        results = run_files(worker, pending, jobs)
+    for path, result, error in results:
+        if not error:
+            files[os.path.basename(path)] = result[1]
+
+    for name in set(files) - seen:
+        del files[name]
+    manifest['template'] = current
+    save_manifest(manifest, manifest_path)
 
-            # Insert CSS in head
-            if '</style>' in content:
-                content = content.replace('</style>', FAQ_STYLE + '</style>', 1)
-            
-            # Insert FAQ before footer
-            if '<footer' in content:
-                content = content.replace('<footer', FAQ_HTML + '<footer', 1)
-            elif '</body>' in content:
-                content = content.replace('</body>', FAQ_HTML + '</body>', 1)
-
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            count += 1
-            if count % 50 == 0:
-                print(f"Updated {count} files...")
-
-    print(f"Successfully updated {count} product pages with FAQ section!")
+    count, _ = print_summary(results, t.elapsed, jobs, changed=lambda result: result[0])
+    if results:
+        print_stage_timings(pipeline.names, results)
+    print(f"Successfully updated {count} product pages with FAQ section! ({skipped} unchanged, skipped)")
 
 if __name__ == "__main__":
-    update_product_pages()
+    parser = argparse.ArgumentParser(description="Add the FAQ section to every product page")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="worker processes (0 = one per CPU core)")
+    update_product_pages(jobs=parser.parse_args().jobs)
@@ -0,0 +1,77 @@
+// ============================================
+// Category page filtering and sorting over categories/<slug>.json (category_facets.py)
+// ============================================
+// الملف فيه أرقام المنتجات فقط: الشرائح والترتيب محسوبة مسبقاً، فكل تغيير
+// هو تقاطع مجموعات وإعادة ترتيب البطاقات الموجودة بدون المرور على المنتجات
+(() => {
+const bar = document.getElementById('facet-bar');
+if (!bar) return;
+const grid = document.querySelector('.products-grid');
+const priceSelect = document.getElementById('facet-price');
+const discountSelect = document.getElementById('facet-discount');
+const sortSelect = document.getElementById('facet-sort');
+const countLabel = document.getElementById('facet-count');
+
+function formatNumber(n) {
+return Number(n).toLocaleString('en-US');
+}
+
+function rangeLabel(low, high, unit) {
+if (high === null) return formatNumber(low) + unit + ' فأكثر';
+if (!low) return 'أقل من ' + formatNumber(high) + unit;
+return formatNumber(low) + ' - ' + formatNumber(high) + unit;
+}
+
+function fillOptions(select, buckets, unit) {
+buckets.forEach(([low, high, ids], i) => {
+if (!ids.length) return;
+const option = document.createElement('option');
+option.value = i;
+option.textContent = rangeLabel(low, high, unit) + ' (' + ids.length + ')';
+select.appendChild(option);
+});
+}
+
+function setup(facets) {
+// البطاقات القديمة بدون data-id تتبع ترتيب ids (نفس ترتيب الصفحة)
+const cards = new Map();
+Array.from(grid.querySelectorAll('.product-card')).forEach((card, i) => {
+cards.set(card.dataset.id ? Number(card.dataset.id) : facets.ids[i], card);
+});
+fillOptions(priceSelect, facets.price, ' د.ع');
+fillOptions(discountSelect, facets.discount, '%');
+
+function apply() {
+let allowed = null;
+for (const [select, buckets] of [[priceSelect, facets.price], [discountSelect, facets.discount]]) {
+if (select.value === '') continue;
+const ids = new Set(buckets[select.value][2]);
+allowed = allowed ? new Set([...allowed].filter(id => ids.has(id))) : ids;
+}
+let order = facets.ids;
+if (sortSelect.value === 'price-asc') order = facets.by_price;
+else if (sortSelect.value === 'price-desc') order = facets.by_price.slice().reverse();
+else if (sortSelect.value === 'discount-desc') order = facets.by_discount;
+
+const fragment = document.createDocumentFragment();
+let shown = 0;
+for (const id of order) {
+const card = cards.get(id);
+if (!card) continue;
+card.hidden = allowed !== null && !allowed.has(id);
+if (!card.hidden) shown++;
+fragment.appendChild(card);
+}
+grid.appendChild(fragment);
+countLabel.textContent = shown + ' من ' + facets.ids.length + ' منتج';
+}
+
+[priceSelect, discountSelect, sortSelect].forEach(select => select.addEventListener('change', apply));
+bar.hidden = false;
+}
+
+fetch(new URL(bar.dataset.facets, document.baseURI))
+.then(r => r.ok ? r.json() : Promise.reject(r.status))
+.then(setup)
+.catch(() => {});  // بدون البيانات تبقى الصفحة كما هي
+})();
@@ -16,21 +16,7 @@ const keywordMap = {
 "مجاني": "التوصيل مجاني لجميع المحافظات العراقية! ✓",
 "محافظات": "نوفر توصيل مجاني لجميع المحافظات العراقية. 📍",
 "منتجات": "لدينا أكثر من 302 منتج مميز! يمكنك تصفحها على الصفحة الرئيسية للمتجر. 🛍️",
-"سعر": "الأسعار تختلف حسب المنتج. يمكنك البحث عن اسم المنتج لمعرفة سعره. 💰",
-"فشار": "جهاز اعداد الفشار متوفر بسعر 73,400 د.ع. SKU: A.000161",
-"حراري": "الشورت الحراري متوفر بسعر 73,400 د.ع. SKU: A.002102",
-"نظارة": "نظارة القراءة وحماية العين من الاشعة متوفرة بسعر 75,100 د.ع. SKU: A.000855",
-"غسالة": "منظف اسطوانة الغسالة متوفر بسعر 75,131 د.ع. SKU: A.001433",
-"لحية": "قلم اللحية وزيت أوميغا لتطويل اللحية متوفران! 💈",
-"ميزان": "ميزان الطعام متوفر بسعر 76,030 د.ع. SKU: A.001247",
-"رقبة": "حزام الرقبة المغناطيسي متوفر بسعر 76,190 د.ع. SKU: A.001299",
-"إزالة": "بخاخ و لوشن لإزالة الشعر من مذهلة متوفر بسعر 76,540 د.ع. SKU: A.002151",
-"معجون": "معجون أسنان لتبييض الأسنان متوفر بسعر 77,250 د.ع. SKU: A.000856",
-"مصباح": "مصباح ليد يدوي صغير بإضاءة 6 واط متوفر بسعر 77,250 د.ع. SKU: A.003137",
-"سلة": "سله المهملات متوفرة بسعر 77,330 د.ع. SKU: A.001245",
-"بديكير": "أداة البديكير لإزالة الجلد القاسي متوفرة بسعر 77,330 د.ع. SKU: A.000174",
-"أضواء": "ثلاثة أضواء ليد مع ريموت كنترول متوفرة بسعر 77,630 د.ع. SKU: A.000271",
-"مكبرة": "مكبرة الشاشة الذكية متوفرة بسعر 77,630 د.ع. SKU: A.000860",
+"سعر": "الأسعار تختلف حسب المنتج. اكتب اسم المنتج أو رقم SKU لمعرفة سعره. 💰",
 "واتساب": "يمكنك التواصل معنا مباشرة عبر الواتساب على: https://wa.me/201110760081 📱",
 "whatsapp": "يمكنك التواصل معنا مباشرة عبر الواتساب على: https://wa.me/201110760081 📱",
 "اتصال": "للتواصل معنا، تفضل بزيارة صفحة اتصل بنا أو راسلنا على الواتساب.",
@@ -45,27 +31,58 @@ const keywordMap = {
 "ممتاز": "شكراً لك! نحن سعداء بإعجابك 🌟",
 };
 
-// دالة معالجة الرسائل
-function processMessage(userMessage) {
+// كلمات الأسئلة العامة لا تُستخدم في البحث عن المنتجات ("سعر الفشار" ← "فشار")
+const GENERIC_WORDS = "اريد أبي عندكم متوفر متوفرة بكم شنو منتج";
+
+function productQuery(message) {
+if (typeof NinjaSearch === 'undefined') return '';
+const ignored = new Set(NinjaSearch.tokenize(Object.keys(keywordMap).join(' ') + ' ' + GENERIC_WORDS));
+return NinjaSearch.tokenize(message).filter(t => !ignored.has(t)).join(' ');
+}
+
+// دالة معالجة الرسائل: ترجع {text, links}
+async function processMessage(userMessage) {
 const lowerMessage = userMessage.toLowerCase().trim();
 
+// البحث عن المنتجات في الفهرس (data/search/)
+const query = productQuery(lowerMessage);
+if (query) {
+try {
+const found = await NinjaSearch.search(query, 5);
+if (found.length > 0) {
+const text = `وجدت ${found.length} منتج:\n\n` + found.map(p =>
+`🛍️ ${p.title}\n💰 السعر: ${p.price} د.ع\n📦 SKU: ${p.sku}`).join('\n\n');
+return {text, links: found.map(p => ({href: p.url, label: `شاهد ${p.title}`}))};
+}
+} catch (err) {
+console.warn('search index unavailable', err);
+}
+}
+
 // البحث عن الكلمات المفتاحية
 for (const [keyword, response] of Object.entries(keywordMap)) {
 if (lowerMessage.includes(keyword)) {
-return response;
+return {text: response, links: []};
 }
 }
 
 // رسالة افتراضية إذا لم يتم العثور على كلمة مفتاحية
-return `عذراً، لم أتمكن من فهم سؤالك بدقة. يمكنك:\n\n1️⃣ تصفح منتجاتنا على الصفحة الرئيسية\n2️⃣ البحث عن منتج معين باستخدام مربع البحث\n3️⃣ التواصل معنا مباشرة على الواتساب: https://wa.me/201110760081`;
+return {text: `عذراً، لم أتمكن من فهم سؤالك بدقة. يمكنك:\n\n1️⃣ تصفح منتجاتنا على الصفحة الرئيسية\n2️⃣ البحث عن منتج معين باستخدام مربع البحث\n3️⃣ التواصل معنا مباشرة على الواتساب: https://wa.me/201110760081`, links: []};
 }
 
 // دالة إضافة رسالة للمحادثة
-function addMessage(text, sender) {
+function addMessage(text, sender, links = []) {
 const messagesContainer = document.getElementById('chatbot-messages');
 const messageDiv = document.createElement('div');
 messageDiv.className = `message ${sender}-message`;
 messageDiv.textContent = text;
+links.forEach(link => {
+const a = document.createElement('a');
+a.href = link.href;
+a.textContent = `🔗 ${link.label}`;
+messageDiv.appendChild(document.createElement('br'));
+messageDiv.appendChild(a);
+});
 messagesContainer.appendChild(messageDiv);
 messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
@@ -100,9 +117,9 @@ addMessage(message, 'user');
 userInput.value = '';
 
 // معالجة الرسالة والرد
-setTimeout(() => {
-const botResponse = processMessage(message);
-addMessage(botResponse, 'bot');
+setTimeout(async () => {
+const botResponse = await processMessage(message);
+addMessage(botResponse.text, 'bot', botResponse.links);
 }, 500);
 }
 
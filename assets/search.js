@@ -0,0 +1,104 @@
+// ============================================
+// Product search over the prebuilt index in data/search/ (search_index.py)
+// ============================================
+// قواعد التوحيد هنا يجب أن تطابق normalize/tokenize في search_index.py
+const NinjaSearch = (() => {
+const BASE = new URL('data/search/', document.baseURI);
+const INVISIBLE = /[\u0640\u200b-\u200f\u202a-\u202e\u2060\ufeff]/g;
+const DIACRITICS = /[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]/g;
+const LETTERS = {'أ':'ا','إ':'ا','آ':'ا','ٱ':'ا','ى':'ي','ة':'ه','ؤ':'و','ئ':'ي',
+'٠':'0','١':'1','٢':'2','٣':'3','٤':'4','٥':'5','٦':'6','٧':'7','٨':'8','٩':'9'};
+const LETTERS_RE = /[أإآٱىةؤئ\u0660-\u0669]/g;
+const TOKEN = /[0-9a-z\u0621-\u064a]+/g;
+const ARTICLE_PREFIXES = ['وال', 'بال', 'كال', 'فال', 'لل', 'ال'];
+const STOPWORDS = new Set(['من', 'في', 'علي', 'مع', 'عن', 'الي', 'او', 'ام', 'هل', 'ما', 'ماذا', 'كم', 'هذا', 'هذه',
+'ذلك', 'تلك', 'كل', 'عند', 'بين', 'اي', 'ان', 'لا', 'يا', 'لو', 'قد', 'هو', 'هي', 'ثم']);
+// الكلمات الأقصر من هذا لا يُبحث عنها كبداية كلمة
+const MIN_PREFIX = 2;
+
+const cache = new Map();
+
+function normalize(text) {
+return String(text).replace(INVISIBLE, '').replace(DIACRITICS, '')
+.replace(LETTERS_RE, c => LETTERS[c]).toLowerCase().replace(/([a-z])\.(?=\d)/g, '$1');
+}
+
+function stem(token) {
+for (const prefix of ARTICLE_PREFIXES) {
+if (token.startsWith(prefix) && token.length - prefix.length >= 3) return token.slice(prefix.length);
+}
+return token;
+}
+
+function tokenize(text) {
+return (normalize(text).match(TOKEN) || [])
+.filter(t => t.length >= 2 && !STOPWORDS.has(t))
+.map(stem);
+}
+
+// كل ملف يُحمّل مرة واحدة فقط ويبقى في الذاكرة
+function load(name) {
+if (!cache.has(name)) {
+cache.set(name, fetch(new URL(name, BASE)).then(r => {
+if (!r.ok) throw new Error(name + ': ' + r.status);
+return r.json();
+}).catch(err => { cache.delete(name); throw err; }));
+}
+return cache.get(name);
+}
+
+function shardKey(token) {
+return token.charCodeAt(0).toString(16).padStart(4, '0');
+}
+
+// المنتجات المطابقة لكلمة واحدة: تطابق كامل بوزنه الكامل، وبداية الكلمة بنصف الوزن
+async function lookup(token, meta) {
+const key = shardKey(token);
+const scores = new Map();
+if (!meta.shards.includes(key)) return scores;
+const shard = await load('t-' + key + '.json');
+const add = (postings, factor) => {
+for (let i = 0; i < postings.length; i += 2) {
+const score = postings[i + 1] * factor;
+if ((scores.get(postings[i]) || 0) < score) scores.set(postings[i], score);
+}
+};
+if (shard[token]) add(shard[token], 1);
+if (token.length >= MIN_PREFIX) {
+for (const [word, postings] of Object.entries(shard)) {
+if (word !== token && word.startsWith(token)) add(postings, 0.5);
+}
+}
+return scores;
+}
+
+// إرجاع أفضل limit منتج: [{title, url, price, sku, category}]
+async function search(query, limit = 10) {
+const tokens = [...new Set(tokenize(query))];
+if (!tokens.length) return [];
+const meta = await load('meta.json');
+const perToken = await Promise.all(tokens.map(t => lookup(t, meta)));
+
+// المنتجات التي تطابق كل الكلمات أولاً، ثم الأكثر تطابقاً
+const totals = new Map();
+perToken.forEach(scores => scores.forEach((score, doc) => {
+const entry = totals.get(doc) || {matched: 0, score: 0};
+entry.matched++;
+entry.score += score;
+totals.set(doc, entry);
+}));
+const ranked = [...totals.entries()]
+.sort((a, b) => b[1].matched - a[1].matched || b[1].score - a[1].score || a[0] - b[0])
+.slice(0, limit);
+
+const results = [];
+for (const [doc] of ranked) {
+const shard = await load('d-' + Math.floor(doc / meta.docs_per_shard) + '.json');
+const [title, url, price, sku, category] = shard[doc % meta.docs_per_shard];
+results.push({title, url, price, sku, category});
+}
+return results;
+}
+
+return {normalize, tokenize, search};
+})();
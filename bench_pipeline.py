@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء كل مراحل الموقع على كتالوج صناعي بأحجام مختلفة
+Benchmark suite for every pipeline stage on synthetic catalogs
+
+يولّد لكل حجم (--scale) كتالوجاً عربياً واقعياً: العناوين والأوصاف والفئات
+مأخوذة من products.json الحقيقي (مع كلمات إضافية حتى لا تتكرر العناوين) و SKU
+فريد لكل منتج، ثم يبني منه الموقع بـ build_site.py. صفحات المنتجات تُحفظ بدون
+قسم الأسئلة الشائعة حتى تقوم theme_manager.py و add_faq.py بعملهما كاملاً.
+
+كل مرحلة تُشغّل --repeat مرات على نسخة جديدة من البيانات (التحضير خارج
+القياس) ويُسجّل الوسيط والأقل والأكثر، ثم تشغيل إضافي تحت tracemalloc لقياس
+ذروة الذاكرة. النتائج تُحفظ في bench_results/ كملف JSON مع رقم الـ commit،
+و --compare يقارنها بنتيجة سابقة ويرجع بكود 1 عند وجود تراجع.
+
+الاستخدام / Usage:
+    python bench_pipeline.py
+    python bench_pipeline.py --scale 302 --scale 10000 --scale 100000 --repeat 3
+    python bench_pipeline.py --stages theme_manager,add_faq --compare bench_results/old.json
+    python bench_pipeline.py --site-dir .bench_sites   # إعادة استخدام المواقع المولّدة
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.parse import quote
+
+from add_faq import update_product_pages
+from bench_serve import run_load
+from build_assets import build_stylesheet
+from build_site import SITE_URL, build
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+from dedupe_products import slugs_csv
+from generate_feeds import write_feed, write_sitemaps
+from posting_ledger import PostingLedger
+from search_index import write_index
+from serve import RouteTable, make_server
+from theme_manager import process_file, theme_head
+from url_index import SLUGS_CSV_PATH, load_index
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = "bench_results"
+RESULTS_VERSION = 1
+DEFAULT_SCALES = (302, 10000)
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 1
+# نسبة المنتجات المنشورة مسبقاً في سجل البوت (منتصف دورة متأخر)
+POSTED_FRACTION = 0.9
+TWITTER_PICKS = 100
+SERVE_CLIENTS = 8
+SERVE_MAX_PAGES = 2000
+# التراجع الذي يُبلّغ عنه في --compare (نسبة من الوسيط السابق)
+REGRESSION_THRESHOLD = 0.10
+
+_FAQ_SECTION = '<section class="faq-section">'
+
+
+class StageSkipped(Exception):
+    """المرحلة لا يمكن تشغيلها في هذه البيئة (مثلاً مكتبة غير مثبتة)"""
+
+
+# ---- synthetic catalog ----
+
+def make_catalog(count, seed=DEFAULT_SEED, source=os.path.join(SCRIPT_DIR, PRODUCTS_JSON_PATH)):
+    """count منتج بنفس شكل products.json؛ نفس البذرة = نفس الكتالوج"""
+    with open(source, "r", encoding="utf-8") as f:
+        real = json.load(f)
+    rng = random.Random(seed)
+    words = sorted({w for p in real for w in p["title"].split() if len(w) > 2})
+    products = []
+    for i in range(count):
+        base = real[i % len(real)]
+        title = base["title"].strip()
+        if i >= len(real):
+            title = f"{title} {' '.join(rng.sample(words, 2))}"
+        price = rng.randrange(15000, 250000, 100)
+        token = "%08x-%04x-%04x" % (rng.getrandbits(32), rng.getrandbits(16), rng.getrandbits(16))
+        products.append({
+            "id": i + 1,
+            "sku": f"S.{i + 1:06d}",
+            "image_link": ("https://firebasestorage.googleapis.com/v0/b/ashyaatcrm.appspot.com/o/"
+                           f"images%2Fbench{i + 1:06d}.jpg?alt=media&token={token}"),
+            "title": title,
+            "price": price,
+            "sale_price": round(price * rng.uniform(0.6, 0.9), -2),
+            "description": (base.get("description") or "").replace(base["title"], title),
+            "category": base["category"],
+        })
+    return products
+
+
+def strip_faq(path):
+    """إزالة قسم الأسئلة الشائعة من صفحة منتج (حالة الصفحة قبل add_faq / theme_manager)"""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    start = content.find(_FAQ_SECTION)
+    if start != -1:
+        end = content.index("</section>", start) + len("</section>")
+        content = content[:start] + content[end:]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+def make_site(root, count, seed=DEFAULT_SEED):
+    """توليد الكتالوج والموقع في root (إلا إذا كان موجوداً بنفس الحجم والبذرة)"""
+    marker = os.path.join(root, "bench_site.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as f:
+            if json.load(f) == {"count": count, "seed": seed}:
+                return
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, PRODUCTS_JSON_PATH), "w", encoding="utf-8") as f:
+        json.dump(make_catalog(count, seed), f, ensure_ascii=False)
+    with contextlib.chdir(root), contextlib.redirect_stdout(io.StringIO()):
+        build(".", PRODUCTS_JSON_PATH)
+        catalog = load_catalog(PRODUCTS_JSON_PATH)
+        with open(SLUGS_CSV_PATH, "w", encoding="utf-8", newline="") as f:
+            f.write(slugs_csv(catalog))
+        write_sitemaps(catalog, SITE_URL, ".")
+    for entry in os.scandir(os.path.join(root, "products")):
+        strip_faq(entry.path)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"count": count, "seed": seed}, f)
+
+
+# ---- stages ----
+# كل مرحلة: setup(site) → (run, cleanup). run() هي الجزء المقاس وتُرجع عدد العناصر
+
+def _copy_products(site):
+    work = tempfile.mkdtemp(prefix="bench-")
+    products_dir = os.path.join(work, "products")
+    shutil.copytree(os.path.join(site, "products"), products_dir)
+    return work, products_dir
+
+
+def stage_catalog_cold(site):
+    cache = os.path.join(site, ".catalog_cache")
+    if os.path.exists(cache):
+        os.remove(cache)
+
+    def run():
+        return len(load_catalog(PRODUCTS_JSON_PATH, cache))
+    return run, None
+
+
+def stage_catalog_cached(site):
+    cache = os.path.join(site, ".catalog_cache")
+    load_catalog(PRODUCTS_JSON_PATH, cache)
+
+    def run():
+        return len(load_catalog(PRODUCTS_JSON_PATH, cache))
+    return run, None
+
+
+def stage_build_site(site):
+    out = tempfile.mkdtemp(prefix="bench-")
+    count = len(load_catalog(PRODUCTS_JSON_PATH))
+
+    def run():
+        build(out, PRODUCTS_JSON_PATH)
+        return count
+    return run, lambda: shutil.rmtree(out)
+
+
+def stage_theme_manager(site):
+    work, products_dir = _copy_products(site)
+    head = theme_head(build_stylesheet(work))
+    paths = [entry.path for entry in os.scandir(products_dir)]
+
+    def run():
+        for path in paths:
+            process_file(path, head)
+        return len(paths)
+    return run, lambda: shutil.rmtree(work)
+
+
+def stage_add_faq(site):
+    work, products_dir = _copy_products(site)
+    manifest = os.path.join(work, ".faq_manifest.json")
+
+    def run():
+        update_product_pages(products_dir, manifest)
+        return len(os.listdir(products_dir))
+    return run, lambda: shutil.rmtree(work)
+
+
+def stage_add_faq_incremental(site):
+    """تشغيل ثانٍ بدون تغييرات: كل الصفحات تُتخطى من الـ manifest"""
+    work, products_dir = _copy_products(site)
+    manifest = os.path.join(work, ".faq_manifest.json")
+    update_product_pages(products_dir, manifest)
+
+    def run():
+        update_product_pages(products_dir, manifest)
+        return len(os.listdir(products_dir))
+    return run, lambda: shutil.rmtree(work)
+
+
+def stage_feeds(site):
+    out = tempfile.mkdtemp(prefix="bench-")
+    catalog = load_catalog(PRODUCTS_JSON_PATH)
+
+    def run():
+        write_feed(os.path.join(out, "products_feed.xml"), catalog, SITE_URL)
+        write_sitemaps(catalog, SITE_URL, ".", os.path.join(out, "lastmod.json"))
+        return len(catalog)
+    return run, lambda: shutil.rmtree(out)
+
+
+def stage_search_index(site):
+    out = tempfile.mkdtemp(prefix="bench-")
+    count = len(load_catalog(PRODUCTS_JSON_PATH))
+
+    def run():
+        write_index(os.path.join(out, "search"), PRODUCTS_JSON_PATH)
+        return count
+    return run, lambda: shutil.rmtree(out)
+
+
+def import_twitter_bot():
+    """twitter_bot يحتاج tweepy ومفاتيح API عند الاستيراد؛ قيم وهمية تكفي لأن القياس لا ينشر شيئاً"""
+    for key in ("TWITTER_API_KEY", "TWITTER_API_KEY_SECRET", "TWITTER_ACCESS_TOKEN", "TWITTER_ACCESS_TOKEN_SECRET"):
+        os.environ.setdefault(key, "bench")
+    try:
+        import twitter_bot
+    except ImportError as e:
+        raise StageSkipped(f"twitter_bot غير متاح: {e}")
+    return twitter_bot
+
+
+def stage_twitter_choose(site):
+    bot = import_twitter_bot()
+    work = tempfile.mkdtemp(prefix="bench-")
+    products = load_catalog(PRODUCTS_JSON_PATH).products
+    posted = random.Random(DEFAULT_SEED).sample(products, int(len(products) * POSTED_FRACTION))
+    legacy = os.path.join(work, "posted_products.json")
+    with open(legacy, "w", encoding="utf-8") as f:
+        json.dump({"cycle_count": 1, "posted_products": [bot.make_product_key(p) for p in posted]}, f)
+    ledger = PostingLedger(os.path.join(work, "posted_products.db"), legacy).__enter__()
+    url_index = load_index()
+
+    def run():
+        for _ in range(TWITTER_PICKS):
+            bot.choose_product_for_post(products, url_index, ledger)
+        return TWITTER_PICKS
+
+    def cleanup():
+        ledger.__exit__(None, None, None)
+        shutil.rmtree(work)
+    return run, cleanup
+
+
+def stage_serve_routes(site):
+    def run():
+        return len(RouteTable(site).files)
+    return run, None
+
+
+def stage_serve(site):
+    httpd = make_server(port=0, bind="127.0.0.1", directory=site, log_requests=False)
+    threading.Thread(target=httpd.serve_forever, name="bench-server", daemon=True).start()
+    names = sorted(os.listdir(os.path.join(site, "products")))[:SERVE_MAX_PAGES]
+    paths = ["/index.html"] + ["/products/" + quote(name) for name in names]
+    port = httpd.server_address[1]
+
+    def run():
+        totals = run_load(port, paths, SERVE_CLIENTS, 1)
+        if totals["errors"]:
+            raise RuntimeError(f"{totals['errors']} طلب فشل")
+        return totals["requests"]
+
+    def cleanup():
+        httpd.shutdown()
+        httpd.server_close()
+    return run, cleanup
+
+
+STAGES = {
+    "catalog_cold": stage_catalog_cold,
+    "catalog_cached": stage_catalog_cached,
+    "build_site": stage_build_site,
+    "theme_manager": stage_theme_manager,
+    "add_faq": stage_add_faq,
+    "add_faq_incremental": stage_add_faq_incremental,
+    "feeds": stage_feeds,
+    "search_index": stage_search_index,
+    "twitter_choose": stage_twitter_choose,
+    "serve_routes": stage_serve_routes,
+    "serve": stage_serve,
+}
+
+
+# ---- measurement ----
+
+def run_once(setup, site, trace=False):
+    """تشغيل واحد: (الزمن، عدد العناصر، ذروة الذاكرة بالبايت أو None)"""
+    with contextlib.chdir(site), contextlib.redirect_stdout(io.StringIO()):
+        run, cleanup = setup(site)
+        try:
+            gc.collect()
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            items = run()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if trace else None
+        finally:
+            if trace:
+                tracemalloc.stop()
+            if cleanup:
+                cleanup()
+    return elapsed, items, peak
+
+
+def measure(setup, site, repeat):
+    runs = []
+    items = 0
+    for _ in range(repeat):
+        elapsed, items, _ = run_once(setup, site)
+        runs.append(elapsed)
+    _, _, peak = run_once(setup, site, trace=True)
+    median = statistics.median(runs)
+    return {
+        "median": median,
+        "min": min(runs),
+        "max": max(runs),
+        "runs": runs,
+        "items": items,
+        "per_item_us": median / items * 1e6 if items else None,
+        "peak_kb": peak / 1024,
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_stage(name, r):
+    if "skipped" in r:
+        print(f"   {name:<20} ⚠ تم التخطي: {r['skipped']}")
+        return
+    per_item = f"{r['per_item_us']:>9.1f} µs/عنصر" if r["per_item_us"] is not None else ""
+    print(f"   {name:<20} {r['median'] * 1000:>10.1f} ms  (أقل {r['min'] * 1000:.1f})  "
+          f"{per_item}  ذاكرة {r['peak_kb'] / 1024:>7.1f} MB")
+
+
+def run_suite(scales, stages, repeat, seed, site_dir=None):
+    results = {}
+    for count in scales:
+        root = os.path.join(site_dir, f"{count}-{seed}") if site_dir else tempfile.mkdtemp(prefix="bench-site-")
+        try:
+            start = time.perf_counter()
+            make_site(root, count, seed)
+            print(f"📊 {count} منتج (تجهيز الموقع {time.perf_counter() - start:.1f} ثانية)")
+            stage_results = {}
+            for name in stages:
+                try:
+                    stage_results[name] = measure(STAGES[name], root, repeat)
+                except StageSkipped as e:
+                    stage_results[name] = {"skipped": str(e)}
+                print_stage(name, stage_results[name])
+            results[str(count)] = {"products": count, "stages": stage_results}
+        finally:
+            if not site_dir:
+                shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def compare(previous, current, threshold=REGRESSION_THRESHOLD):
+    """طباعة الفرق لكل مرحلة مشتركة؛ يُرجع عدد التراجعات"""
+    regressions = 0
+    print(f"\n📊 مقارنة مع {previous.get('commit') or '?'} ({previous.get('date', '')})")
+    for scale, data in current["scales"].items():
+        old_stages = previous.get("scales", {}).get(scale, {}).get("stages", {})
+        for name, r in data["stages"].items():
+            old = old_stages.get(name)
+            if not old or "median" not in old or "median" not in r:
+                continue
+            change = (r["median"] - old["median"]) / old["median"] if old["median"] else 0
+            mark = "✓"
+            if change > threshold:
+                mark = "✗"
+                regressions += 1
+            print(f"   {mark} {scale:>7} {name:<20} {old['median'] * 1000:>9.1f} → "
+                  f"{r['median'] * 1000:>9.1f} ms  ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء مراحل الموقع على كتالوج صناعي")
+    parser.add_argument("--scale", type=int, action="append", help="عدد المنتجات (يمكن تكراره)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="المراحل مفصولة بفواصل")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="عدد مرات قياس كل مرحلة")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="بذرة توليد الكتالوج")
+    parser.add_argument("--site-dir", default=None, help="حفظ المواقع المولّدة وإعادة استخدامها")
+    parser.add_argument("--output", default=None, help=f"ملف النتائج (افتراضي: {RESULTS_DIR}/...)")
+    parser.add_argument("--compare", default=None, help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="نسبة الإبطاء التي تُعتبر تراجعاً (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"مراحل غير معروفة: {', '.join(unknown)} (المتاح: {', '.join(STAGES)})")
+    site_dir = os.path.abspath(args.site_dir) if args.site_dir else None
+
+    commit = git_commit()
+    report = {
+        "version": RESULTS_VERSION,
+        "commit": commit,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scales": run_suite(args.scale or DEFAULT_SCALES, stages, args.repeat, args.seed, site_dir),
+    }
+
+    output = args.output or os.path.join(
+        SCRIPT_DIR, RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ النتائج في {os.path.relpath(output)}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        if regressions:
+            print(f"✗ {regressions} تراجع في الأداء أكبر من {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
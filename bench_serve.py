@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء سيرفر التطوير المحلي (serve.py)
+Throughput benchmark for serve.py
+
+يشغّل serve.py كعملية منفصلة في كل وضع، ثم يسحب index.html وكل صفحات
+المنتجات من عدة عملاء بالتوازي ويطبع عدد الطلبات في الثانية.
+
+وضع --suite sendfile يسحب الملفات الكبيرة غير مضغوطة ويقارن زمن المعالج
+الذي يستهلكه السيرفر لكل ميجابايت مع sendfile وبدونه.
+
+الاستخدام / Usage:
+    python bench_serve.py
+    python bench_serve.py --clients 16 --rounds 2
+    python bench_serve.py --suite sendfile --rounds 200
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# الأوضاع التي تتم مقارنتها: الاسم ← معاملات serve.py الإضافية
+MODES = {
+    "single (الأصلي)": ["--single"],
+    "pooled + keep-alive": [],
+}
+
+SENDFILE_MODES = {
+    "copy (read/write)": ["--no-sendfile"],
+    "sendfile": [],
+}
+
+# أكبر الملفات في الموقع
+BIG_FILES = ["/index.html", "/products.json", "/sitemap.xml", "/products_slugs.csv"]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def collect_paths(limit=None):
+    """index.html + كل صفحات المنتجات بصيغة URL مُرمّزة"""
+    paths = ["/index.html"]
+    for name in sorted(os.listdir(os.path.join(SCRIPT_DIR, "products"))):
+        if name.endswith(".html"):
+            paths.append("/products/" + quote(name))
+    return paths[:limit] if limit else paths
+
+
+def start_server(port, extra_args):
+    cmd = [sys.executable, os.path.join(SCRIPT_DIR, "serve.py"), "--headless", "--port", str(port),
+           "--bind", "127.0.0.1"] + extra_args
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    raise RuntimeError("serve.py لم يبدأ خلال 10 ثوانٍ")
+
+
+def stop_server(proc):
+    """إيقاف السيرفر وإرجاع زمن المعالج الذي استهلكه (بالثواني) إن أمكن"""
+    proc.terminate()
+    if hasattr(os, "wait4"):
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = 0
+        return usage.ru_utime + usage.ru_stime
+    proc.wait()
+    return None
+
+
+def client_worker(port, paths, headers, totals, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    count = nbytes = errors = 0
+    for path in paths:
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+            if resp.status >= 400:
+                errors += 1
+            count += 1
+            nbytes += len(body)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+    conn.close()
+    with lock:
+        totals["requests"] += count
+        totals["bytes"] += nbytes
+        totals["errors"] += errors
+
+
+def run_load(port, paths, clients, rounds, headers=None):
+    """توزيع الطلبات على عدة عملاء متوازيين وقياس الزمن الكلي"""
+    work = paths * rounds
+    chunks = [work[i::clients] for i in range(clients)]
+    totals = {"requests": 0, "bytes": 0, "errors": 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=client_worker, args=(port, chunk, headers or {}, totals, lock))
+               for chunk in chunks if chunk]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    totals["seconds"] = time.perf_counter() - start
+    return totals
+
+
+def bench_mode(name, extra_args, paths, clients, rounds, headers=None):
+    port = free_port()
+    proc = start_server(port, extra_args)
+    try:
+        result = run_load(port, paths, clients, rounds, headers)
+    finally:
+        result_cpu = stop_server(proc)
+    result["name"] = name
+    result["server_cpu"] = result_cpu
+    return result
+
+
+def idle_cpu(extra_args):
+    """زمن المعالج لتشغيل السيرفر وإيقافه بدون أي طلب (يُطرح من القياس)"""
+    return bench_mode("idle", extra_args, [], 1, 1)["server_cpu"]
+
+
+def print_cpu_per_mb(r, baseline):
+    mb = r["bytes"] / 1024 / 1024
+    if r["server_cpu"] is None or not mb:
+        print(f"{r['name']:<24} {mb:>8.1f} MB  (قياس CPU غير متاح على هذا النظام)")
+        return
+    cpu = max(r["server_cpu"] - (baseline or 0), 0)
+    print(f"{r['name']:<24} {mb:>8.1f} MB  {r['seconds']:>6.2f}s  "
+          f"CPU {cpu:>6.2f}s  = {cpu * 1000 / mb:>6.2f} ms CPU/MB")
+
+
+def print_result(r):
+    rps = r["requests"] / r["seconds"] if r["seconds"] else 0
+    mbps = r["bytes"] / r["seconds"] / 1024 / 1024 if r["seconds"] else 0
+    cpu = f"{r['server_cpu']:.2f}s" if r["server_cpu"] is not None else "-"
+    print(f"{r['name']:<24} {r['requests']:>7} طلب  {r['seconds']:>7.2f}s  "
+          f"{rps:>8.1f} req/s  {mbps:>7.1f} MB/s  CPU {cpu:>7}  أخطاء {r['errors']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء serve.py")
+    parser.add_argument("--clients", type=int, default=8, help="عدد العملاء المتوازيين")
+    parser.add_argument("--rounds", type=int, default=1, help="عدد مرات سحب كل الصفحات")
+    parser.add_argument("--limit", type=int, default=None, help="أقصى عدد صفحات")
+    parser.add_argument("--accept-encoding", default=None, help="مثلاً gzip لقياس الردود المضغوطة")
+    parser.add_argument("--suite", choices=["throughput", "sendfile"], default="throughput")
+    args = parser.parse_args(argv)
+
+    if args.suite == "sendfile":
+        print(f"📊 {len(BIG_FILES)} ملفات كبيرة × {args.rounds} جولة، {args.clients} عميل متوازي\n")
+        for name, extra in SENDFILE_MODES.items():
+            baseline = idle_cpu(extra)
+            print_cpu_per_mb(bench_mode(name, extra, BIG_FILES, args.clients, args.rounds), baseline)
+        return
+
+    paths = collect_paths(args.limit)
+    headers = {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else None
+    print(f"📊 {len(paths)} صفحة × {args.rounds} جولة، {args.clients} عميل متوازي\n")
+    for name, extra in MODES.items():
+        print_result(bench_mode(name, extra, paths, args.clients, args.rounds, headers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بناء ملف CSS المشترك للموقع
+Content-hashed stylesheet for the theme and FAQ styles
+
+يجمع CSS الثيم (templates/theme.css) وقسم الأسئلة الشائعة (templates/faq.css)
+في ملف واحد مضغوط assets/site.<hash>.css. الـ hash من المحتوى، فأي تعديل
+ينتج اسماً جديداً ويمكن تخزين الملف في المتصفح لمدة سنة (.htaccess و serve.py).
+الصفحات تربط الملف بوسم <link> بدل نسخ الـ CSS داخل كل صفحة.
+
+الاستخدام / Usage:
+    python build_assets.py
+"""
+
+import glob
+import hashlib
+import os
+import re
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# الترتيب مهم: قواعد الثيم (مع !important) تأتي بعد قواعد الأسئلة الشائعة
+STYLE_SOURCES = ["templates/faq.css", "templates/theme.css"]
+STYLESHEET_NAME = "site"
+ASSETS_DIR = "assets"
+HASH_LENGTH = 10
+
+_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_SPACE_AROUND = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(text):
+    """حذف التعليقات والمسافات الزائدة (بدون تغيير معنى القواعد)"""
+    text = _COMMENTS.sub("", text)
+    text = re.sub(r"\s+", " ", text)
+    text = _SPACE_AROUND.sub(r"\1", text)
+    # المسافة قبل ":" قد تكون جزءاً من المحدد (.a :hover)، لذلك تُحذف بعدها فقط
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip() + "\n"
+
+
+def bundle_css(root=SCRIPT_DIR):
+    parts = []
+    for rel_path in STYLE_SOURCES:
+        with open(os.path.join(root, rel_path), "r", encoding="utf-8") as f:
+            parts.append(f.read())
+    return minify_css("\n".join(parts))
+
+
+def stylesheet_path(css):
+    digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+    return f"{ASSETS_DIR}/{STYLESHEET_NAME}.{digest}.css"
+
+
+def build_stylesheet(out_dir=".", root=SCRIPT_DIR):
+    """كتابة الملف إذا لم يكن موجوداً وحذف النسخ القديمة؛ يُرجع مساره النسبي"""
+    css = bundle_css(root)
+    rel_path = stylesheet_path(css)
+    path = os.path.join(out_dir, rel_path)
+    if not os.path.exists(path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(css)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    pattern = os.path.join(out_dir, ASSETS_DIR, f"{STYLESHEET_NAME}.{'[0-9a-f]' * HASH_LENGTH}.css")
+    for old in glob.glob(pattern):
+        if os.path.abspath(old) != os.path.abspath(path):
+            os.remove(old)
+    return rel_path
+
+
+def stylesheet_link(rel_path):
+    return f'<link rel="stylesheet" href="{rel_path}">'
+
+
+if __name__ == "__main__":
+    sources = sum(os.path.getsize(os.path.join(SCRIPT_DIR, p)) for p in STYLE_SOURCES)
+    rel_path = build_stylesheet(SCRIPT_DIR)
+    size = os.path.getsize(os.path.join(SCRIPT_DIR, rel_path))
+    print(f"✓ {rel_path}: {sources / 1024:.1f} KB ← {size / 1024:.1f} KB بعد الضغط")
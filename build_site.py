@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بناء صفحات الموقع مباشرة من products.json
+Single-pass static site build for Iraq Ninja Store
+
+يقرأ الكتالوج مرة واحدة ويكتب كل صفحة مرة واحدة: صفحات المنتجات، صفحات
+الفئات و index.html. القوالب في مجلد templates/ وتُحمّل مرة واحدة، و FAQ
+والثيم و <base> أجزاء (blocks) من القالب بدلاً من نصوص تُحقن لاحقاً.
+
+الصفحة الرئيسية تحتوي أول HOME_PAGE_SIZE بطاقة فقط، وباقي المنتجات تُكتب
+في data/home/page-N.json وتُحمّل عند التمرير. في نهاية البناء يُطبع تقرير
+يقارن حجم التحميل الأول لـ index.html القديم والجديد.
+
+الاستخدام / Usage:
+    python build_site.py
+    python build_site.py --out dist
+"""
+
+import argparse
+import gzip
+import html
+import json
+import os
+import random
+import re
+import string
+import tempfile
+import time
+from datetime import date, timedelta
+from urllib.parse import quote
+
+from build_assets import build_stylesheet
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+from category_facets import facets_json, facets_path
+from image_pipeline import CARD_SIZES, PRODUCT_SIZES, image_for, load_manifest, picture_html, srcset
+from theme_manager import BASE_TAG, FAQ_TEMPLATE, theme_head
+
+SITE_URL = "https://iraq-ninja-store.arabsad.com"
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+WHATSAPP_NUMBER = "201110760081"
+CURRENCY = "د.ع"
+
+# عدد البطاقات في كل صفحة من الصفحة الرئيسية (الأولى داخل index.html والباقي JSON)
+HOME_PAGE_SIZE = 24
+HOME_DATA_DIR = "data/home"
+HOME_CHUNK_RE = re.compile(r"page-\d+\.json")
+META_DESCRIPTION_LENGTH = 160
+PRICE_VALID_UNTIL = "2026-12-31"
+
+# التقييمات تُولّد بشكل ثابت لكل SKU حتى لا تتغير الصفحات بين بناء وآخر
+REVIEWS_END_DATE = date(2025, 11, 28)
+REVIEWERS = ["نور الهدى", "سارة احمد", "حسين علي", "علي محمد", "محمود صالح",
+             "احمد حسين", "فاطمة عباس", "عمر يوسف", "زينب كريم", "مريم حسن"]
+REVIEW_LOCATIONS = ["بغداد", "النجف", "البصرة", "أربيل", "كربلاء"]
+REVIEW_TEXTS = [
+    "منتج ممتاز والله واصل بوقته والجودة فوق الممتازة انصح بالشراء",
+    "جودة عالية جدا والتوصيل سريع شكرا الكم على الخدمة الراقية",
+    "استلمت الطلب وكان اروع من المتوقع صراحة يستاهل كل فلس دفعته",
+]
+JSON_LD_REVIEWS = 10
+
+
+_templates = {}
+
+
+def template(name):
+    """تحميل القالب وتحويله إلى string.Template مرة واحدة فقط"""
+    tpl = _templates.get(name)
+    if tpl is None:
+        with open(os.path.join(TEMPLATES_DIR, name), "r", encoding="utf-8") as f:
+            tpl = _templates[name] = string.Template(f.read())
+    return tpl
+
+
+_assets = {}
+
+
+def read_asset(name):
+    """محتوى ملف CSS من templates/، يُقرأ مرة واحدة فقط"""
+    content = _assets.get(name)
+    if content is None:
+        with open(os.path.join(TEMPLATES_DIR, name), "r", encoding="utf-8") as f:
+            content = _assets[name] = f.read()
+    return content
+
+
+def category_slug(category):
+    return re.sub(r"\s*>\s*", "-", category.strip()).replace(" ", "-")
+
+
+def format_price(value):
+    return f"{round(float(value)):,}"
+
+
+def whatsapp_link(text):
+    return f"https://wa.me/{WHATSAPP_NUMBER}?text={quote(text)}"
+
+
+def stars_for(rating):
+    full = int(round(rating))
+    return "★" * full + "☆" * (5 - full)
+
+
+def generate_reviews(sku):
+    """تقييمات ثابتة لكل منتج (نفس الـ SKU = نفس التقييمات في كل بناء)"""
+    rng = random.Random(sku)
+    count = rng.randint(18, 28)
+    rating = rng.choice([4.7, 4.8, 4.8, 4.9])
+    days = sorted((rng.randint(0, 3 * 365) for _ in range(count)))
+    reviews = []
+    for offset in days:
+        value = rng.choice([5, 5, 5, 4.5]) if rating >= 4.8 else rng.choice([5, 4.5])
+        reviews.append({
+            "name": rng.choice(REVIEWERS),
+            "location": rng.choice(REVIEW_LOCATIONS),
+            "date": (REVIEWS_END_DATE - timedelta(days=offset)).isoformat(),
+            "rating": value,
+            "text": rng.choice(REVIEW_TEXTS),
+        })
+    return rating, reviews
+
+
+def discount_for(sku):
+    return random.Random("discount:" + sku).randint(10, 35)
+
+
+class Site:
+    """بيانات مشتركة تُحسب مرة واحدة لكل البناء"""
+
+    def __init__(self, catalog, stylesheet):
+        self.products = catalog.products
+        self.categories = catalog.categories
+        self.css = read_asset("base.css")
+        # CSS الثيم والأسئلة الشائعة في ملف مشترك (build_assets.py)
+        self.theme = theme_head(stylesheet)
+        # النسخ المصغّرة للصور (image_pipeline.py)؛ بدونها تُستخدم الروابط الأصلية
+        self.images = load_manifest()
+        self.category_links = "\n".join(
+            f'<a href="categories/{category_slug(c)}.html">{html.escape(c)} ({len(items)})</a>'
+            for c, items in sorted(self.categories.items())
+        )
+        self.home = None  # يُملأ في pages()
+
+    def product_path(self, product):
+        return f"products/{product.slug}.html"
+
+    def product_url(self, product):
+        return f"{SITE_URL}/{self.product_path(product)}"
+
+    # ---- blocks ----
+    def blocks(self):
+        return {
+            "base_tag": BASE_TAG,
+            "theme": self.theme,
+            "category_links": self.category_links,
+        }
+
+    def page(self, title, description, canonical, content, css="", head="", scripts=""):
+        return template("layout.html").substitute(
+            self.blocks(),
+            title=html.escape(title),
+            description=html.escape(description),
+            canonical=canonical,
+            head=head,
+            css=self.css + css,
+            content=content,
+            scripts=scripts,
+        )
+
+    def image_tag(self, product, sizes, attrs="", lazy=True):
+        src = product.get("image_link") or "assets/logo.png"
+        image = image_for(self.images, product.get("image_link"))
+        return picture_html(image, src, product["title"], sizes, attrs, lazy)
+
+    # ---- cards ----
+    def card(self, product, extra_class=""):
+        name = product["title"]
+        price = format_price(product["price"])
+        url = self.product_path(product)
+        text = f"مرحباً، أريد طلب: {name} - SKU: {product['sku']} - السعر: {price} {CURRENCY}"
+        return template("card.html").substitute(
+            extra_class=extra_class,
+            id=product["id"],
+            image=self.image_tag(product, CARD_SIZES,
+                                 f' class="product-image" onclick="window.location.href=\'{url}\'"'),
+            name=html.escape(name),
+            url=url,
+            sku=product["sku"],
+            price=price,
+            whatsapp=whatsapp_link(text),
+        )
+
+    # ---- pages ----
+    def render_product(self, product):
+        name = product["title"]
+        sku = product["sku"]
+        url = self.product_url(product)
+        image = product.get("image_link") or f"{SITE_URL}/assets/logo.png"
+        price = float(product["price"])
+        discount = discount_for(sku)
+        rating, reviews = generate_reviews(sku)
+        description = product.get("description") or name
+        meta_description = description[:META_DESCRIPTION_LENGTH]
+        page_title = f"{name} | متجر نينجا العراق"
+
+        json_ld = {
+            "@context": "https://schema.org/",
+            "@type": "Product",
+            "name": name,
+            "description": description,
+            "image": [image],
+            "sku": sku,
+            "brand": {"@type": "Brand", "name": name.split()[0]},
+            "offers": {
+                "@type": "Offer",
+                "url": url,
+                "priceCurrency": "IQD",
+                "price": str(product["price"]),
+                "availability": "https://schema.org/InStock",
+                "priceValidUntil": PRICE_VALID_UNTIL,
+                "itemCondition": "https://schema.org/NewCondition",
+                "seller": {"@type": "Organization", "name": "متجر نينجا العراق"},
+            },
+            "aggregateRating": {
+                "@type": "AggregateRating",
+                "ratingValue": str(rating),
+                "reviewCount": str(len(reviews)),
+                "bestRating": "5",
+                "worstRating": "1",
+            },
+            "review": [
+                {
+                    "@type": "Review",
+                    "author": {"@type": "Person", "name": r["name"]},
+                    "datePublished": r["date"],
+                    "reviewBody": r["text"],
+                    "reviewRating": {"@type": "Rating", "ratingValue": str(r["rating"]),
+                                     "bestRating": "5", "worstRating": "1"},
+                }
+                for r in reviews[:JSON_LD_REVIEWS]
+            ],
+        }
+        head = template("product_head.html").substitute(
+            json_ld=json.dumps(json_ld, ensure_ascii=False).replace("</", "<\\/"),
+            canonical=url,
+            title=html.escape(page_title),
+            description=html.escape(meta_description),
+            image=html.escape(image),
+        )
+        review_tpl = template("review.html")
+        reviews_html = "".join(
+            review_tpl.substitute(
+                initial=r["name"][0],
+                name=r["name"],
+                location=r["location"],
+                date=r["date"],
+                stars=stars_for(r["rating"]),
+                text=r["text"],
+            )
+            for r in reviews
+        )
+        order_text = (f"مرحباً، أريد طلب: {name} - SKU: {sku} - السعر: {format_price(price)} {CURRENCY}"
+                      f" - الرابط: {url}")
+        content = template("product.html").substitute(
+            category_slug=category_slug(product["category"]),
+            category=html.escape(product["category"]),
+            name=html.escape(name),
+            image=self.image_tag(product, PRODUCT_SIZES, lazy=False),
+            stars=stars_for(rating),
+            rating=rating,
+            review_count=len(reviews),
+            price_before=format_price(price / (1 - discount / 100)),
+            price=format_price(price),
+            discount=discount,
+            sku=sku,
+            long_description=html.escape(description),
+            whatsapp=whatsapp_link(order_text),
+            faq=FAQ_TEMPLATE.format(product_name=html.escape(name)),
+            reviews=reviews_html,
+        )
+        return self.page(page_title, meta_description, url, content,
+                         css=read_asset("product.css"), head=head)
+
+    def render_category(self, category, products):
+        count = len(products)
+        slug = category_slug(category)
+        cards = "".join(self.card(p) for p in products)
+        content = template("category.html").substitute(
+            category=html.escape(category), count=count, cards=cards, facets=facets_path(slug))
+        return self.page(
+            f"{category} - متجر نينجا العراق | {count} منتج",
+            f"تسوق {category} في متجر نينجا العراق - {count} منتج متاح مع توصيل مجاني",
+            f"{SITE_URL}/categories/{slug}.html",
+            content,
+            css=read_asset("listing.css"),
+            # بيانات الفلترة تُحمّل بالتوازي مع الصفحة
+            head=('<meta name="robots" content="index, follow">\n'
+                  f'<link rel="preload" href="{facets_path(slug)}" as="fetch" crossorigin>'),
+            scripts='<script src="assets/category-filter.js" defer></script>',
+        )
+
+    def home_pages(self):
+        return [self.products[i:i + HOME_PAGE_SIZE] for i in range(0, len(self.products), HOME_PAGE_SIZE)]
+
+    def card_data(self, product):
+        """بيانات البطاقة المختصرة التي يبني منها JavaScript باقي الصفحات"""
+        data = {
+            "n": product["title"],
+            "u": self.product_path(product),
+            "i": product.get("image_link") or "assets/logo.png",
+            "s": product["sku"],
+            "p": format_price(product["price"]),
+        }
+        image = image_for(self.images, product.get("image_link"))
+        if image:
+            # w/j: srcset بصيغة WebP و JPEG، d: [العرض، الارتفاع]
+            data["i"] = image["variants"][min(1, len(image["variants"]) - 1)]["jpg"]
+            data["w"] = srcset(image, "webp")
+            data["j"] = srcset(image, "jpg")
+            data["d"] = [image["width"], image["height"]]
+        return data
+
+    def render_home_chunk(self, products):
+        return json.dumps([self.card_data(p) for p in products], ensure_ascii=False, separators=(",", ":"))
+
+    def render_home(self):
+        pages = self.home_pages()
+        cards = "".join(self.card(p) for p in (pages[0] if pages else []))
+        count = len(self.products)
+        content = template("home.html").substitute(count=count, cards=cards)
+        return self.page(
+            "متجر نينجا العراق - أفضل المنتجات بأسعار منافسة | توصيل مجاني",
+            f"تسوق أفضل {count} منتج في العراق مع توصيل مجاني",
+            f"{SITE_URL}/",
+            content,
+            css=read_asset("listing.css"),
+            head='<meta name="msvalidate.01" content="921ED565B1567A334F3BB30680CE040A" />',
+            scripts=template("home_scripts.html").substitute(
+                pages=len(pages), whatsapp_number=WHATSAPP_NUMBER, currency=CURRENCY,
+                card_sizes=CARD_SIZES),
+        )
+
+    def pages(self):
+        """
+        كل صفحات الموقع كأزواج (المسار النسبي، المحتوى). بعد انتهائها يبقى في
+        self.home (الصفحة الرئيسية، ملفات JSON، وقت بنائها بالثواني) لتقرير الحجم.
+        """
+        for p in self.products:
+            yield self.product_path(p), self.render_product(p)
+        for category, items in self.categories.items():
+            yield f"categories/{category_slug(category)}.html", self.render_category(category, items)
+            yield facets_path(category_slug(category)), facets_json(items, discount_for)
+        start = time.perf_counter()
+        home = self.render_home()
+        chunks = [self.render_home_chunk(chunk) for chunk in self.home_pages()[1:]]
+        self.home = (home, chunks, time.perf_counter() - start)
+        yield "index.html", home
+        for number, chunk in enumerate(chunks, start=2):
+            yield f"{HOME_DATA_DIR}/page-{number}.json", chunk
+
+
+def write_page(out_dir, rel_path, content):
+    """كتابة ذرية: ملف مؤقت في نفس المجلد ثم os.replace، فلا تُقرأ صفحة نصف مكتوبة"""
+    path = os.path.join(out_dir, rel_path)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def remove_stale_chunks(out_dir, written):
+    """حذف data/home/page-N.json التي لم تعد مكتوبة بعد تصغير الكتالوج"""
+    directory = os.path.join(out_dir, HOME_DATA_DIR)
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        rel_path = f"{HOME_DATA_DIR}/{name}"
+        if HOME_CHUNK_RE.fullmatch(name) and rel_path not in written:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+
+def gzip_size(data):
+    return len(gzip.compress(data, 6))
+
+
+def home_report(old_html, new_html, chunks, render_seconds):
+    """مقارنة حجم التحميل الأول للصفحة الرئيسية قبل وبعد التقسيم"""
+    new_bytes = new_html.encode("utf-8")
+    print("\n📊 الصفحة الرئيسية (التحميل الأول):")
+    if old_html is not None:
+        print(f"   index.html القديم: {len(old_html) / 1024:7.1f} KB  (gzip {gzip_size(old_html) / 1024:6.1f} KB)")
+    print(f"   index.html الجديد: {len(new_bytes) / 1024:7.1f} KB  (gzip {gzip_size(new_bytes) / 1024:6.1f} KB)"
+          f"  بُني في {render_seconds * 1000:.1f} ms")
+    if chunks:
+        sizes = [len(c.encode("utf-8")) for c in chunks]
+        print(f"   {len(chunks)} ملف JSON عند التمرير: {sum(sizes) / 1024:.1f} KB إجمالاً، "
+              f"متوسط {sum(sizes) / len(sizes) / 1024:.1f} KB لكل صفحة")
+    if old_html:
+        saved = 1 - len(new_bytes) / len(old_html)
+        print(f"   التوفير في التحميل الأول: {saved:.0%}")
+
+
+def build(out_dir=".", products_path=PRODUCTS_JSON_PATH):
+    start = time.perf_counter()
+    site = Site(load_catalog(products_path), build_stylesheet(out_dir))
+    index_path = os.path.join(out_dir, "index.html")
+    old_index = None
+    if os.path.exists(index_path):
+        with open(index_path, "rb") as f:
+            old_index = f.read()
+
+    count = total_bytes = 0
+    written = set()
+    for rel_path, content in site.pages():
+        write_page(out_dir, rel_path, content)
+        written.add(rel_path)
+        count += 1
+        total_bytes += len(content)
+    removed = remove_stale_chunks(out_dir, written)
+    if removed:
+        print(f"🗑️  حُذف {removed} ملف JSON قديم من {HOME_DATA_DIR}/")
+    elapsed = time.perf_counter() - start
+    print(f"✓ تم بناء {count} صفحة ({total_bytes / 1024 / 1024:.1f} MB) في {elapsed:.2f} ثانية → {out_dir}")
+
+    home_report(old_index, *site.home)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="بناء صفحات الموقع من products.json")
+    parser.add_argument("--out", default=".", help="مجلد الإخراج (افتراضي: مجلد المشروع)")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    args = parser.parse_args(argv)
+    build(args.out, args.products)
+
+
+if __name__ == "__main__":
+    main()
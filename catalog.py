@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كتالوج المنتجات المشترك لكل الأدوات
+Shared product catalog with indexes and a binary startup cache
+
+يحمّل products.json مرة واحدة ويوفر البحث حسب رقم المنتج، SKU، الـ slug،
+الفئة ونطاق السعر. كل منتج كائن Product بـ __slots__ (ويدعم product["title"]
+و product.get(...) مثل القاموس حتى تعمل الأدوات القديمة كما هي).
+
+بعد أول تحميل يُحفظ الكتالوج في .catalog_cache (marshal) مع حجم ووقت تعديل
+products.json، فتبدأ الأدوات التالية بدون تحليل JSON أو حساب الـ slugs.
+الأوصاف (أكبر جزء من البيانات) محفوظة في قسم منفصل من الكاش ولا تُقرأ إلا عند
+أول طلب لوصف منتج، فالأدوات التي لا تحتاجها لا تدفع ثمنها.
+
+الاستخدام / Usage:
+    from catalog import load_catalog
+    catalog = load_catalog()
+    catalog.by_sku("A.000161"), catalog.in_category("منتجات متنوعة"), catalog.price_between(50000, 80000)
+
+    python catalog.py            # إحصائيات وزمن التحميل
+"""
+
+import bisect
+import json
+import marshal
+import os
+import re
+import struct
+import tempfile
+import time
+from functools import cached_property
+
+PRODUCTS_JSON_PATH = "products.json"
+CACHE_PATH = ".catalog_cache"
+CACHE_VERSION = 3
+_HEADER = struct.Struct("<Q")
+
+_ZERO_WIDTH = re.compile("[\u200b-\u200f\u2060\ufeff]")
+
+
+def product_slug(product):
+    """نفس قاعدة products_slugs.csv: العنوان بشرطات + SKU بدون نقطة"""
+    title = _ZERO_WIDTH.sub("", product["title"])
+    title = re.sub(r"[^\w\s-]", "", title)
+    title = re.sub(r"[\s_-]+", "-", title.strip()).strip("-").lower()
+    return f"{title}-{product['sku'].replace('.', '').lower()}"
+
+
+class LazyTexts:
+    """قسم الأوصاف في الكاش: يُقرأ من القرص عند أول وصول فقط"""
+    __slots__ = ("path", "offset", "values")
+
+    def __init__(self, path, offset):
+        self.path = path
+        self.offset = offset
+        self.values = None
+
+    def __getitem__(self, index):
+        if self.values is None:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                self.values = marshal.loads(f.read())
+        return self.values[index]
+
+
+class Product:
+    __slots__ = ("id", "sku", "title", "price", "sale_price", "image_link", "category", "slug", "_description")
+    FIELDS = ("id", "sku", "title", "price", "sale_price", "image_link", "description", "category", "slug")
+
+    def __init__(self, id, sku, title, price, sale_price, image_link, category, slug, description=None):
+        self.id = id
+        self.sku = sku
+        self.title = title
+        self.price = price
+        self.sale_price = sale_price
+        self.image_link = image_link
+        self.category = category
+        self.slug = slug
+        # نص الوصف، أو (LazyTexts، رقم) حتى أول استخدام
+        self._description = description
+
+    @property
+    def description(self):
+        value = self._description
+        if type(value) is tuple:
+            texts, index = value
+            value = self._description = texts[index]
+        return value
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get("id"), data.get("sku", ""), data.get("title", ""), data.get("price"),
+                   data.get("sale_price"), data.get("image_link"), data.get("category", ""),
+                   product_slug(data), data.get("description"))
+
+    def as_row(self):
+        """الحقول المحفوظة في القسم الرئيسي من الكاش (بدون الوصف)"""
+        return (self.id, self.sku, self.title, self.price, self.sale_price, self.image_link,
+                self.category, self.slug)
+
+    def to_dict(self):
+        """نفس شكل السطر في products.json (بدون الحقول الفارغة)"""
+        return {name: getattr(self, name) for name in self.FIELDS[:-1] if getattr(self, name) is not None}
+
+    # توافق مع الكود الذي يتعامل مع المنتج كقاموس
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"Product(id={self.id!r}, sku={self.sku!r}, title={self.title!r})"
+
+
+class Catalog:
+    """قائمة المنتجات بترتيب products.json مع فهارس تُبنى عند أول استخدام"""
+
+    def __init__(self, products):
+        self.products = products
+
+    def __len__(self):
+        return len(self.products)
+
+    def __iter__(self):
+        return iter(self.products)
+
+    @cached_property
+    def _by_id(self):
+        return {p.id: p for p in self.products}
+
+    @cached_property
+    def _by_sku(self):
+        index = {}
+        for p in self.products:
+            index.setdefault(p.sku, []).append(p)
+        return index
+
+    @cached_property
+    def _by_slug(self):
+        return {p.slug: p for p in self.products}
+
+    @cached_property
+    def categories(self):
+        """الفئة ← المنتجات (بترتيب الكتالوج)"""
+        index = {}
+        for p in self.products:
+            index.setdefault(p.category, []).append(p)
+        return index
+
+    @cached_property
+    def _by_price(self):
+        ordered = sorted((p for p in self.products if p.price is not None), key=lambda p: p.price)
+        return [p.price for p in ordered], ordered
+
+    def by_id(self, product_id):
+        return self._by_id.get(product_id)
+
+    def by_sku(self, sku):
+        """أول منتج بهذا الـ SKU (بعض الـ SKUs مكررة؛ استخدم all_by_sku للكل)"""
+        matches = self._by_sku.get(sku)
+        return matches[0] if matches else None
+
+    def all_by_sku(self, sku):
+        return list(self._by_sku.get(sku, ()))
+
+    def by_slug(self, slug):
+        return self._by_slug.get(slug)
+
+    def in_category(self, category):
+        return list(self.categories.get(category, ()))
+
+    def price_between(self, low=None, high=None):
+        """المنتجات التي سعرها بين low و high (شاملة)، مرتبة حسب السعر"""
+        prices, ordered = self._by_price
+        start = 0 if low is None else bisect.bisect_left(prices, low)
+        end = len(prices) if high is None else bisect.bisect_right(prices, high)
+        return ordered[start:end]
+
+
+def _stamp(path):
+    """المسار الكامل للمصدر مع حجمه ووقت تعديله: ملف --products آخر لا يستخدم نفس الكاش"""
+    st = os.stat(path)
+    return os.path.realpath(path), st.st_size, st.st_mtime_ns
+
+
+def _read_cache(cache_path, stamp):
+    """الكاش: [طول القسم الرئيسي][القسم الرئيسي: الإصدار، الختم، الصفوف][الأوصاف]"""
+    try:
+        with open(cache_path, "rb") as f:
+            (length,) = _HEADER.unpack(f.read(_HEADER.size))
+            version, source, size, mtime_ns, rows = marshal.loads(f.read(length))
+    except (OSError, EOFError, ValueError, TypeError, struct.error):
+        return None
+    if version != CACHE_VERSION or (source, size, mtime_ns) != stamp:
+        return None
+    texts = LazyTexts(cache_path, _HEADER.size + length)
+    return [Product(*row, (texts, i)) for i, row in enumerate(rows)]
+
+
+def _write_cache(cache_path, stamp, products):
+    main = marshal.dumps((CACHE_VERSION, *stamp, [p.as_row() for p in products]))
+    descriptions = marshal.dumps([p.description for p in products])
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(len(main)))
+            f.write(main)
+            f.write(descriptions)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_catalog(path=PRODUCTS_JSON_PATH, cache_path=CACHE_PATH):
+    """تحميل الكتالوج من الكاش الثنائي، أو من products.json إذا تغيّر (ثم تحديث الكاش)"""
+    stamp = _stamp(path)
+    products = _read_cache(cache_path, stamp) if cache_path else None
+    if products is None:
+        with open(path, "r", encoding="utf-8") as f:
+            products = [Product.from_dict(item) for item in json.load(f)]
+        if cache_path:
+            try:
+                _write_cache(cache_path, stamp, products)
+            except OSError as e:
+                print(f"⚠ تعذر حفظ كاش الكتالوج: {e}")
+    return Catalog(products)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    catalog = load_catalog()
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(catalog)} منتج، {len(catalog.categories)} فئة — التحميل {elapsed * 1000:.1f} ms")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بيانات الفلترة والترتيب لصفحات الفئات
+Precomputed category facets for client-side filtering and sorting
+
+لكل فئة يُكتب categories/<slug>.json بجانب صفحتها، وفيه أرقام المنتجات
+(id) فقط كمصفوفات أرقام:
+- ids: المنتجات بترتيب البطاقات في الصفحة
+- price / discount: شرائح السعر والخصم [من، إلى (null = بلا حد)، [ids]]
+- by_price: الترتيب حسب السعر تصاعدياً (التنازلي = عكسه)
+- by_discount: الترتيب حسب نسبة الخصم تنازلياً
+
+assets/category-filter.js يحمّل الملف مع الصفحة (preload) ويفلتر ويرتب
+البطاقات الموجودة بدون المرور على المنتجات وبدون طلبات إضافية.
+
+الاستخدام / Usage:
+    python category_facets.py
+    python category_facets.py --out dist
+"""
+
+import argparse
+import bisect
+import json
+import os
+import time
+
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+
+FACETS_DIR = "categories"
+FACETS_VERSION = 1
+# حدود شرائح السعر (د.ع) والخصم (%)؛ discount_for في build_site.py بين 10 و 35
+PRICE_BOUNDS = (25000, 50000, 100000)
+DISCOUNT_BOUNDS = (20, 30)
+MIN_DISCOUNT = 10
+
+
+def buckets(products, value, bounds, low=0):
+    """توزيع المنتجات على الشرائح في مرور واحد: [[من، إلى، [ids]], ...]"""
+    edges = (low,) + tuple(bounds)
+    result = [[edge, upper, []] for edge, upper in zip(edges, tuple(bounds) + (None,))]
+    for product in products:
+        result[bisect.bisect_right(bounds, value(product))][2].append(product.id)
+    return result
+
+
+def category_facets(products, discount):
+    """بيانات فئة واحدة؛ discount(sku) هي نسبة الخصم المعروضة في صفحة المنتج"""
+    discounts = {p.id: discount(p.sku) for p in products}
+    return {
+        "v": FACETS_VERSION,
+        "ids": [p.id for p in products],
+        "price": buckets(products, lambda p: float(p.price), PRICE_BOUNDS),
+        "discount": buckets(products, lambda p: discounts[p.id], DISCOUNT_BOUNDS, MIN_DISCOUNT),
+        "by_price": [p.id for p in sorted(products, key=lambda p: (float(p.price), p.id))],
+        "by_discount": [p.id for p in sorted(products, key=lambda p: (-discounts[p.id], float(p.price), p.id))],
+    }
+
+
+def facets_json(products, discount):
+    return json.dumps(category_facets(products, discount), separators=(",", ":"))
+
+
+def facets_path(slug):
+    return f"{FACETS_DIR}/{slug}.json"
+
+
+def write_facets(out_dir=".", products_path=PRODUCTS_JSON_PATH):
+    # build_site يستورد هذا الملف لكتابة نفس البيانات أثناء البناء
+    from build_site import category_slug, discount_for
+
+    start = time.perf_counter()
+    catalog = load_catalog(products_path)
+    os.makedirs(os.path.join(out_dir, FACETS_DIR), exist_ok=True)
+    total = 0
+    for category, products in catalog.categories.items():
+        path = os.path.join(out_dir, facets_path(category_slug(category)))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(facets_json(products, discount_for))
+        total += os.path.getsize(path)
+    count = len(catalog.categories)
+    print(f"✓ بيانات الفلترة: {count} فئة، {total / 1024:.1f} KB (متوسط {total / max(count, 1) / 1024:.1f} KB) "
+          f"في {(time.perf_counter() - start) * 1000:.1f} ms → {os.path.join(out_dir, FACETS_DIR)}")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="بيانات الفلترة والترتيب لصفحات الفئات")
+    parser.add_argument("--out", default=".", help="مجلد الموقع (افتراضي: مجلد المشروع)")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    args = parser.parse_args(argv)
+    write_facets(args.out, args.products)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,3 @@
-// قاعدة بيانات المنتجات
-const products = [
-    {name: 'جهاز اعداد الفشار', sku: 'A.000161', price: '73,400', url: '/products/جهاز-اعداد-الفشار-a000161.html'},
-    {name: 'الشورت الحراري', sku: 'A.002102', price: '73,400', url: '/products/الشورت-الحراري-a002102.html'},
-    {name: 'نظارة القراءة وحماية العين من الاشعة', sku: 'A.000855', price: '75,100', url: '/products/نظارة-القراءة-وحماية-العين-من-الاشعة-a000855.html'},
-    {name: 'منظف ​​اسطوانة الغسالة', sku: 'A.001433', price: '75,131', url: '/products/منظف-اسطوانة-الغسالة-a001433.html'},
-    {name: 'قلم اللحية لملئ الفراغات و تحديد', sku: 'A.002225', price: '75,481', url: '/products/قلم-اللحية-لملئ-الفراغات-و-تحديد-a002225.html'},
-    {name: 'زيت أوميغا لتطويل اللحية وتعبئة الفراغات', sku: 'A.000185', price: '75,901', url: '/products/زيت-أوميغا-لتطويل-اللحية-وتعبئة-الفراغات-a000185.html'},
-    {name: 'ميزان الطعام', sku: 'A.001247', price: '76,030', url: '/products/ميزان-الطعام-a001247.html'},
-    {name: 'حزام الرقبة المغناطيسي', sku: 'A.001299', price: '76,190', url: '/products/حزام-الرقبة-المغناطيسي-a001299.html'},
-    {name: 'بخاخ و لوشن لإزالة الشعر من مذهلة', sku: 'A.002151', price: '76,540', url: '/products/بخاخ-و-لوشن-لإزالة-الشعر-من-مذهلة-a002151.html'},
-    {name: 'معجون أسنان لتبييض الأسنان', sku: 'A.000856', price: '77,250', url: '/products/معجون-أسنان-لتبييض-الأسنان-و-ازالة-البقع-بشكل-احترافي-a000856.html'},
-    {name: 'قطاعة متعددة الوظائف', sku: 'A.001147', price: '89,381', url: '/products/قطاعة-متعددة-الوظائف-a001147.html'},
-    {name: 'داعم الظهر السحري', sku: 'A.001316', price: '100,440', url: '/products/داعم-الظهر-السحري-a001316.html'},
-    {name: 'معجون تنظيف الفرن والاواني', sku: 'A.001730', price: '100,846', url: '/products/معجون-تنظيف-الفرن-والاواني-a001730.html'},
-    {name: 'مجففة الملابس العجبية', sku: 'A.000416', price: '89,381', url: '/products/مجففة-الملابس-العجبية-a000416.html'},
-    {name: 'خلاط عصير محمول', sku: 'A.000154', price: '100,540', url: '/products/خلاط-عصير-محمول-يعمل-على-بطارية-قابلة-للشحن-a000154.html'}
-];
-
 // الكلمات المفتاحية للأسئلة
 const keywordMap = {
     'سعر': 'أسعارنا تتراوح من 73,000 إلى 100,000 دينار عراقي حسب المنتج. استخدم زر "شاهد التفاصيل" لمعرفة سعر المنتج بالضبط.',
@@ -30,28 +11,42 @@ const keywordMap = {
     'شكرا': 'العفو! سعداء بخدمتك 😊'
 };
 
-// البحث عن منتج بالاسم أو SKU
-function searchProduct(query) {
-    query = query.toLowerCase();
-    return products.filter(p => 
-        p.name.toLowerCase().includes(query) || 
-        p.sku.toLowerCase().includes(query)
-    );
+// كلمات الأسئلة العامة لا تُستخدم في البحث عن المنتجات ("سعر الفشار" ← "فشار")
+const GENERIC_WORDS = 'اريد أبي عندكم متوفر متوفرة بكم شنو';
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// البحث عن منتج بالاسم أو SKU في فهرس البحث (assets/search.js)
+async function searchProduct(query) {
+    if (typeof NinjaSearch === 'undefined') return [];
+    const ignored = new Set(NinjaSearch.tokenize(Object.keys(keywordMap).join(' ') + ' ' + GENERIC_WORDS));
+    const terms = NinjaSearch.tokenize(query).filter(t => !ignored.has(t));
+    if (terms.length === 0) return [];
+    try {
+        return await NinjaSearch.search(terms.join(' '), 5);
+    } catch (err) {
+        console.warn('search index unavailable', err);
+        return [];
+    }
 }
 
 // توليد رد الروبوت
-function getBotResponse(userMessage) {
+async function getBotResponse(userMessage) {
     userMessage = userMessage.trim();
     
     // البحث في المنتجات أولاً
-    const foundProducts = searchProduct(userMessage);
+    const foundProducts = await searchProduct(userMessage);
     if (foundProducts.length > 0) {
         let response = `وجدت ${foundProducts.length} منتج:\n\n`;
         foundProducts.forEach(p => {
-            response += `🛍️ ${p.name}\n`;
+            response += `🛍️ ${escapeHtml(p.title)}\n`;
             response += `💰 السعر: ${p.price} د.ع\n`;
             response += `📦 SKU: ${p.sku}\n`;
-            response += `🔗 <a href="${p.url}" target="_blank">شاهد التفاصيل</a>\n\n`;
+            response += `🔗 <a href="${escapeHtml(p.url)}" target="_blank">شاهد التفاصيل</a>\n\n`;
         });
         return response;
     }
@@ -88,8 +83,8 @@ function sendMessage() {
     input.value = '';
     
     // الحصول على رد الروبوت
-    setTimeout(() => {
-        const botResponse = getBotResponse(userMessage);
+    setTimeout(async () => {
+        const botResponse = await getBotResponse(userMessage);
         addMessage(botResponse, true);
     }, 500);
 }
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فحص الروابط والملفات في كل صفحات الموقع
+Concurrent local link and asset integrity crawler
+
+يشغّل serve.py داخل نفس العملية على منفذ عشوائي، ثم يسحب كل صفحات HTML
+بالتوازي (asyncio مع اتصالات keep-alive) ويحلل كل صفحة أثناء وصولها. كل
+رابط (a, link, script, img, source ...) يُحوَّل إلى مسار داخل الموقع حسب
+وسم <base> ويُقارن بجدول مسارات السيرفر (RouteTable) المبني مسبقاً، بدون
+طلب HTTP لكل رابط.
+
+التقرير:
+- روابط مكسورة: مسار غير موجود، أو رابط "/..." يخرج من مجلد الموقع على GitHub Pages
+- صفحات يتيمة: صفحات لا يشير إليها أي رابط في صفحة أخرى
+- صفحات مكررة: نفس العنوان <title> في أكثر من ملف
+
+نتيجة كل صفحة تُحفظ في .link_check.json مع حجم ووقت تعديل ملفها، فالتشغيل
+التالي لا يسحب إلا الصفحات التي تغيّرت (--full لفحص كل شيء من جديد).
+
+الاستخدام / Usage:
+    python check_links.py
+    python check_links.py --full --concurrency 16 --report links_report.json
+"""
+
+import argparse
+import asyncio
+import codecs
+import json
+import os
+import tempfile
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import quote, urljoin, urlsplit
+
+from build_site import SITE_URL
+from serve import make_server
+from theme_manager import BASE_URL as GITHUB_URL
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = ".link_check.json"
+CACHE_VERSION = 1
+DEFAULT_CONCURRENCY = 8
+READ_CHUNK_SIZE = 64 * 1024
+
+# مجلدات لا تحتوي صفحات حقيقية (قوالب build_site.py)
+SKIP_DIRS = {"templates"}
+# صفحات لا يُتوقع أن يشير إليها أي رابط
+ENTRY_PAGES = {"/index.html", "/404.html"}
+# أصول الموقع: الصفحة تحت أحد هذه الروابط تُعتبر داخلية
+SITE_ROOTS = (GITHUB_URL, SITE_URL + "/")
+SITE_HOSTS = {urlsplit(root).netloc for root in SITE_ROOTS}
+SKIP_SCHEMES = ("mailto:", "tel:", "javascript:", "data:", "#")
+
+LINK_ATTRS = {
+    "a": ("href",),
+    "link": ("href",),
+    "script": ("src",),
+    "img": ("src", "data-src", "srcset"),
+    "source": ("src", "srcset"),
+    "iframe": ("src",),
+    "video": ("src", "poster"),
+    "audio": ("src",),
+}
+
+
+class LinkParser(HTMLParser):
+    """يجمع العنوان ووسم <base> والروابط أثناء تغذيته بأجزاء الصفحة"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base = None
+        self.title = ""
+        self.links = []
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "base":
+            self.base = self.base or dict(attrs).get("href")
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        names = LINK_ATTRS.get(tag)
+        if not names:
+            return
+        for name, value in attrs:
+            if name not in names or not value:
+                continue
+            if name == "srcset":
+                self.links.extend(part.split()[0] for part in value.split(",") if part.strip())
+            else:
+                self.links.append(value.strip())
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def page_url(path):
+    """رابط الصفحة كما يراه المتصفح على GitHub Pages (أساس الروابط النسبية)"""
+    return GITHUB_URL + path.lstrip("/")
+
+
+def classify(link, base):
+    """
+    تحويل الرابط إلى ("internal", مسار) أو ("outside", رابط) أو ("external", None).
+    outside = نفس النطاق لكن خارج مجلد الموقع (مثلاً href="/assets/.." مع <base>).
+    """
+    if link.startswith(SKIP_SCHEMES) or "${" in link:
+        return "external", None
+    url = urljoin(base, link)
+    for root in SITE_ROOTS:
+        if url.startswith(root):
+            return "internal", "/" + url[len(root):]
+    if urlsplit(url).netloc in SITE_HOSTS:
+        return "outside", url
+    return "external", None
+
+
+def html_pages(routes):
+    """كل ملفات HTML في جدول المسارات (بمساراتها الكاملة .html)"""
+    pages = {}
+    for path, full in routes.files.items():
+        if not path.endswith(".html") or path.split("/")[1] in SKIP_DIRS:
+            continue
+        pages[path] = full
+    return pages
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+# ---- HTTP client ----
+
+async def read_headers(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+async def fetch_page(reader, writer, path):
+    """GET على اتصال مفتوح؛ الجسم يُحلَّل جزءاً بجزء دون تجميعه في الذاكرة"""
+    writer.write(f"GET {quote(path)} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n"
+                 .encode("ascii"))
+    await writer.drain()
+    status, headers = await read_headers(reader)
+    remaining = int(headers.get("content-length", 0))
+    parser = LinkParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    size = 0
+    while remaining > 0:
+        chunk = await reader.read(min(remaining, READ_CHUNK_SIZE))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        remaining -= len(chunk)
+        size += len(chunk)
+        parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return {
+        "status": status,
+        "bytes": size,
+        "title": " ".join(parser.title.split()),
+        "base": parser.base,
+        "links": parser.links,
+    }
+
+
+async def fetch_worker(port, queue, results):
+    reader = writer = None
+    while True:
+        try:
+            path = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        for attempt in range(2):
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                results[path] = await fetch_page(reader, writer, path)
+                break
+            except (OSError, ConnectionError, ValueError, IndexError) as e:
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                if attempt:
+                    results[path] = {"status": 0, "error": str(e), "bytes": 0, "title": "", "base": None,
+                                     "links": []}
+    if writer is not None:
+        writer.close()
+
+
+async def fetch_all(port, paths, concurrency):
+    queue = asyncio.Queue()
+    for path in paths:
+        queue.put_nowait(path)
+    results = {}
+    workers = [fetch_worker(port, queue, results) for _ in range(max(1, min(concurrency, len(paths))))]
+    await asyncio.gather(*workers)
+    return results
+
+
+# ---- cache ----
+
+def load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get("pages", {}) if data.get("version") == CACHE_VERSION else {}
+
+
+def save_cache(path, pages):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "pages": pages}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# ---- analysis ----
+
+def analyze(pages, routes):
+    """مقارنة روابط كل الصفحات بجدول المسارات"""
+    broken = {}      # الهدف ← الصفحات التي تشير إليه
+    linked = set()   # الملفات التي يشير إليها رابط من صفحة أخرى
+    checked = external = 0
+    for path, page in pages.items():
+        if page["status"] != 200:
+            broken.setdefault(path, set()).add(f"HTTP {page['status'] or page.get('error')}")
+            continue
+        base = urljoin(page_url(path), page["base"]) if page["base"] else page_url(path)
+        own_file = routes.files.get(path)
+        for link in page["links"]:
+            kind, target = classify(link, base)
+            if kind == "external":
+                external += 1
+                continue
+            checked += 1
+            if kind == "outside":
+                broken.setdefault(target, set()).add(path)
+                continue
+            full, redirect = routes.resolve(target)
+            if redirect is not None:
+                full, _ = routes.resolve(redirect)
+            if full is None:
+                broken.setdefault(target.split("?", 1)[0].split("#", 1)[0], set()).add(path)
+            elif full != own_file:
+                linked.add(full)
+
+    orphans = sorted(p for p, full in html_pages(routes).items()
+                     if p in pages and full not in linked and p not in ENTRY_PAGES
+                     and not os.path.basename(p).startswith("google"))
+
+    by_title = {}
+    for path, page in pages.items():
+        if page.get("title"):
+            by_title.setdefault(page["title"], []).append(path)
+    duplicates = {title: sorted(paths) for title, paths in by_title.items() if len(paths) > 1}
+    return {
+        "checked_links": checked,
+        "external_links": external,
+        "broken": {target: sorted(sources) for target, sources in sorted(broken.items())},
+        "orphans": orphans,
+        "duplicates": duplicates,
+    }
+
+
+def start_server(root):
+    httpd = make_server(port=0, bind="127.0.0.1", directory=root, cache_mb=0, log_requests=False)
+    thread = threading.Thread(target=httpd.serve_forever, name="link-check-server", daemon=True)
+    thread.start()
+    return httpd
+
+
+def check_site(root=SCRIPT_DIR, concurrency=DEFAULT_CONCURRENCY, cache_path=CACHE_PATH, full=False):
+    """فحص الموقع وإرجاع (التقرير، إحصائيات التشغيل)"""
+    start = time.perf_counter()
+    httpd = start_server(root)
+    try:
+        routes = httpd.routes
+        targets = html_pages(routes)
+        cached = {} if full else load_cache(os.path.join(root, cache_path))
+
+        pages, stale = {}, []
+        for path, full_path in targets.items():
+            stamp = file_stamp(full_path)
+            entry = cached.get(path)
+            if entry and entry.get("stamp") == stamp and entry.get("status") == 200:
+                pages[path] = entry
+            else:
+                stale.append(path)
+
+        fetched = asyncio.run(fetch_all(httpd.server_address[1], stale, concurrency)) if stale else {}
+        for path, result in fetched.items():
+            result["stamp"] = file_stamp(targets[path])
+            pages[path] = result
+        report = analyze(pages, routes)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    if cache_path:
+        try:
+            save_cache(os.path.join(root, cache_path), pages)
+        except OSError as e:
+            print(f"⚠ تعذر حفظ نتائج الفحص: {e}")
+    stats = {
+        "pages": len(pages),
+        "fetched": len(fetched),
+        "reused": len(pages) - len(fetched),
+        "bytes": sum(r["bytes"] for r in fetched.values()),
+        "seconds": time.perf_counter() - start,
+    }
+    return report, stats
+
+
+def print_report(report, stats, limit):
+    def show(items):
+        for item in items[:limit]:
+            print(f"   {item}")
+        if len(items) > limit:
+            print(f"   ... و {len(items) - limit} أخرى")
+
+    print(f"📊 {stats['pages']} صفحة ({stats['fetched']} سُحبت، {stats['reused']} من الفحص السابق، "
+          f"{stats['bytes'] / 1024 / 1024:.1f} MB) في {stats['seconds']:.2f} ثانية")
+    print(f"   {report['checked_links']} رابط داخلي تم فحصه، {report['external_links']} رابط خارجي تم تجاهله")
+
+    broken = report["broken"]
+    if broken:
+        print(f"\n✗ {len(broken)} هدف مكسور:")
+        show([f"{target}  ← {len(sources)} صفحة (مثلاً {sources[0]})" for target, sources in broken.items()])
+    else:
+        print("\n✓ لا توجد روابط مكسورة")
+
+    if report["orphans"]:
+        print(f"\n⚠ {len(report['orphans'])} صفحة يتيمة (لا يشير إليها أي رابط):")
+        show(report["orphans"])
+
+    if report["duplicates"]:
+        print(f"\n⚠ {len(report['duplicates'])} عنوان مكرر في أكثر من صفحة:")
+        show([f"{title}: {', '.join(paths)}" for title, paths in report["duplicates"].items()])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="فحص الروابط والملفات في كل صفحات الموقع")
+    parser.add_argument("--root", default=SCRIPT_DIR, help="مجلد الموقع (افتراضي: مجلد المشروع)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="عدد الاتصالات المتوازية")
+    parser.add_argument("--full", action="store_true", help="تجاهل نتائج الفحص السابق وسحب كل الصفحات")
+    parser.add_argument("--limit", type=int, default=20, help="أقصى عدد عناصر تُطبع في كل قسم")
+    parser.add_argument("--report", help="حفظ التقرير الكامل كملف JSON")
+    args = parser.parse_args(argv)
+
+    report, stats = check_site(args.root, args.concurrency, full=args.full)
+    print_report(report, stats, args.limit)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(dict(report, stats=stats), f, ensure_ascii=False, indent=2)
+        print(f"\n✓ التقرير الكامل: {args.report}")
+    return 1 if report["broken"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إزالة صفحات المنتجات المكررة وتوليد خريطة التحويلات
+Deduplicate product pages and emit a redirect map
+
+معظم المنتجات لها صفحتان في products/: القديمة slug.html والجديدة
+slug-aXXXXXX.html. الأداة تجمع الصفحات حسب SKU (من JSON-LD في الصفحة) وحسب
+بصمة المحتوى، وتُبقي لكل منتج الصفحة الرسمية (نفس slug الكتالوج) وتحذف الباقي.
+
+بعدها تكتب:
+- redirects.json: المسار القديم ← المسار الرسمي (يقرأها serve.py)
+- قسم تحويلات 301 في .htaccess
+- products_slugs.csv و products_feed*.xml و sitemap.xml بالروابط الرسمية
+
+الاستخدام / Usage:
+    python dedupe_products.py --dry-run   # عرض ما سيتم بدون تعديل
+    python dedupe_products.py
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+
+from build_site import SITE_URL
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+from generate_feeds import FEEDS, write_feed, write_sitemaps
+from serve import REDIRECTS_FILE
+from url_index import SLUGS_CSV_PATH
+
+PRODUCTS_DIR = "products"
+HTACCESS_PATH = ".htaccess"
+HTACCESS_BEGIN = "# BEGIN product redirects (dedupe_products.py)"
+HTACCESS_END = "# END product redirects"
+
+_SKU_PATTERN = re.compile(rb'"sku"\s*:\s*"([^"]+)"')
+
+
+def scan_pages(products_dir):
+    """(اسم الملف، SKU أو None، بصمة المحتوى) لكل صفحة منتج"""
+    pages = []
+    for name in sorted(os.listdir(products_dir)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(products_dir, name), "rb") as f:
+            data = f.read()
+        match = _SKU_PATTERN.search(data)
+        sku = match.group(1).decode("utf-8") if match else None
+        pages.append((name, sku, hashlib.sha1(data).hexdigest()))
+    return pages
+
+
+def plan_dedupe(pages, catalog):
+    """
+    إرجاع {الملف المكرر: الملف الرسمي}.
+
+    الرسمي لكل SKU هو الملف الذي اسمه slug الكتالوج، وإلا أقصر اسم. الملفات
+    المتطابقة بالمحتوى تتبع رسمي أول نسخة منها حتى لو لم يوجد فيها SKU.
+    """
+    by_sku, by_hash = {}, {}
+    for name, sku, digest in pages:
+        if sku:
+            by_sku.setdefault(sku, []).append(name)
+        by_hash.setdefault(digest, []).append(name)
+
+    canonical = {}
+    for sku, names in by_sku.items():
+        wanted = {f"{p.slug}.html" for p in catalog.all_by_sku(sku)}
+        keep = next((n for n in names if n in wanted), None) or min(names, key=lambda n: (len(n), n))
+        for name in names:
+            canonical[name] = keep
+
+    for names in by_hash.values():
+        keep = next((canonical[n] for n in names if n in canonical), names[0])
+        for name in names:
+            canonical.setdefault(name, keep)
+    return {name: keep for name, keep in canonical.items() if name != keep}
+
+
+def redirect_map(removed, products_dir=PRODUCTS_DIR):
+    return {f"/{products_dir}/{old}": f"/{products_dir}/{new}" for old, new in sorted(removed.items())}
+
+
+def merge_redirects(path, new_redirects):
+    """إضافة التحويلات الجديدة للقديمة، مع توجيه أي سلسلة تحويلات للوجهة الأخيرة مباشرة"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            redirects = json.load(f)
+    except (OSError, ValueError):
+        redirects = {}
+    redirects.update(new_redirects)
+    for old in list(redirects):
+        target, seen = redirects[old], {old}
+        while target in redirects and target not in seen:
+            seen.add(target)
+            target = redirects[target]
+        redirects[old] = target
+    return dict(sorted(redirects.items()))
+
+
+def htaccess_block(redirects):
+    lines = [HTACCESS_BEGIN]
+    for old, new in redirects.items():
+        stem = re.escape(old.lstrip("/")[:-len(".html")] if old.endswith(".html") else old.lstrip("/"))
+        lines.append(f'RewriteRule "^{stem}(\\.html)?$" "{new}" [R=301,L]')
+    lines.append(HTACCESS_END)
+    return "\n".join(lines)
+
+
+def update_htaccess(text, block):
+    """استبدال قسم التحويلات إن وُجد، وإلا إضافته قبل قاعدة حذف .html"""
+    pattern = re.compile(re.escape(HTACCESS_BEGIN) + r".*?" + re.escape(HTACCESS_END), re.S)
+    if pattern.search(text):
+        return pattern.sub(lambda _: block, text)
+    anchor = "# Remove .html extension"
+    if anchor in text:
+        return text.replace(anchor, f"{block}\n\n{anchor}", 1)
+    return text.rstrip("\n") + f"\n\n{block}\n"
+
+
+def slugs_csv(catalog):
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["Index", "Title", "SKU", "Slug", "URL"])
+    for index, product in enumerate(catalog):
+        writer.writerow([index, product.title, product.sku, product.slug,
+                         f"{SITE_URL}/{PRODUCTS_DIR}/{product.slug}.html"])
+    return "\ufeff" + out.getvalue()
+
+
+def write_text(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def dedupe(root=".", products_path=PRODUCTS_JSON_PATH, dry_run=False):
+    catalog = load_catalog(products_path)
+    products_dir = os.path.join(root, PRODUCTS_DIR)
+    pages = scan_pages(products_dir)
+    removed = plan_dedupe(pages, catalog)
+    freed = sum(os.path.getsize(os.path.join(products_dir, name)) for name in removed)
+    print(f"📊 {len(pages)} صفحة منتج، {len(removed)} مكررة ({freed / 1024 / 1024:.1f} MB)، "
+          f"{len(pages) - len(removed)} تبقى")
+    if dry_run:
+        for old, new in list(removed.items())[:10]:
+            print(f"   {old} → {new}")
+        return removed
+
+    redirects = merge_redirects(os.path.join(root, REDIRECTS_FILE), redirect_map(removed))
+    write_text(os.path.join(root, REDIRECTS_FILE), json.dumps(redirects, ensure_ascii=False, indent=2) + "\n")
+    htaccess = os.path.join(root, HTACCESS_PATH)
+    with open(htaccess, "r", encoding="utf-8") as f:
+        text = f.read()
+    write_text(htaccess, update_htaccess(text, htaccess_block(redirects)))
+    for name in removed:
+        os.remove(os.path.join(products_dir, name))
+    print(f"✓ {len(redirects)} تحويل في {REDIRECTS_FILE} و {HTACCESS_PATH}")
+
+    write_text(os.path.join(root, SLUGS_CSV_PATH), slugs_csv(catalog))
+    print(f"✓ {SLUGS_CSV_PATH}: {len(catalog)} منتج")
+    for name, base_url in FEEDS.items():
+        write_feed(os.path.join(root, name), catalog, base_url)
+    parts, _ = write_sitemaps(catalog, SITE_URL, root)
+    print(f"✓ {', '.join(FEEDS)} و {', '.join(p[0] for p in parts)} بالروابط الرسمية")
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="إزالة صفحات المنتجات المكررة وتوليد التحويلات")
+    parser.add_argument("--root", default=".", help="مجلد الموقع (افتراضي: مجلد المشروع)")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    parser.add_argument("--dry-run", action="store_true", help="عرض الصفحات المكررة بدون حذف أو كتابة")
+    args = parser.parse_args(argv)
+    dedupe(args.root, args.products, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+توليد Google Merchant feed و sitemap من الكتالوج
+Streaming generator for the Merchant feeds and sitemaps
+
+يكتب products_feed.xml (النطاق الرسمي) و products_feed_gh.xml (GitHub Pages)
+لكل المنتجات، ثم sitemap.xml و sitemap_index.xml. الكتابة تتم عنصراً بعنصر
+مباشرة إلى الملف عبر XMLWriter، فالذاكرة لا تكبر مع عدد المنتجات.
+
+lastmod لكل صفحة يأتي من بصمة sha1 لمحتوى ملفها، محفوظة في
+sitemap_lastmod.json: إذا لم يتغير المحتوى يبقى التاريخ القديم، وإلا يصبح
+تاريخ اليوم. إذا تجاوز الـ sitemap 50,000 رابط أو 50 MB يُقسَّم تلقائياً إلى
+sitemap-1.xml و sitemap-2.xml ... وكلها مذكورة في sitemap_index.xml، ويصبح
+sitemap.xml نسخة من الـ index حتى لا تبقى فيه روابط قديمة.
+
+الاستخدام / Usage:
+    python generate_feeds.py
+    python generate_feeds.py --base-url https://sherow1982.github.io/iraq-ninja-store
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date
+from xml.sax.saxutils import escape, quoteattr
+
+from build_site import SITE_URL, category_slug, discount_for
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+from theme_manager import BASE_URL as GITHUB_URL
+
+STORE_NAME = "متجر نينجا العراق"
+STORE_DESCRIPTION = "أفضل المنتجات بأسعار منافسة مع توصيل مجاني لجميع المحافظات العراقية"
+FEEDS = {
+    "products_feed.xml": SITE_URL,
+    "products_feed_gh.xml": GITHUB_URL.rstrip("/"),
+}
+LASTMOD_PATH = "sitemap_lastmod.json"
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+GOOGLE_NS = "http://base.google.com/ns/1.0"
+
+# حدود بروتوكول sitemaps.org لكل ملف
+MAX_SITEMAP_URLS = 50000
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+LEGAL_PRIORITY = {
+    "about.html": "0.6",
+    "contact.html": "0.6",
+    "shipping.html": "0.5",
+    "returns.html": "0.5",
+    "privacy.html": "0.4",
+    "terms.html": "0.4",
+}
+
+
+class XMLWriter:
+    """كاتب XML تدفقي: كل عنصر يُكتب للملف فوراً ويُحسب عدد البايتات المكتوبة"""
+
+    def __init__(self, f, indent="  "):
+        self.f = f
+        self.indent = indent
+        self.stack = []
+        self.bytes = 0
+
+    def _write(self, text):
+        data = text.encode("utf-8")
+        self.f.write(data)
+        self.bytes += len(data)
+
+    def declaration(self):
+        self._write('<?xml version="1.0" encoding="UTF-8"?>\n')
+
+    def start(self, tag, **attrs):
+        attributes = "".join(f" {name.replace('__', ':')}={quoteattr(value)}" for name, value in attrs.items())
+        self._write(f"{self.indent * len(self.stack)}<{tag}{attributes}>\n")
+        self.stack.append(tag)
+
+    def end(self):
+        tag = self.stack.pop()
+        self._write(f"{self.indent * len(self.stack)}</{tag}>\n")
+
+    def element(self, tag, text):
+        self._write(f"{self.indent * len(self.stack)}<{tag}>{escape(str(text))}</{tag}>\n")
+
+    @staticmethod
+    def element_size(tag, text, depth, indent="  "):
+        """حجم العنصر بالبايت قبل كتابته (لمعرفة متى يجب تقسيم الملف)"""
+        return len(f"{indent * depth}<{tag}>{escape(str(text))}</{tag}>\n".encode("utf-8"))
+
+
+@contextmanager
+def atomic_output(path):
+    """ملف مؤقت بجانب الهدف يحل محله فقط إذا اكتملت الكتابة"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def feed_price(value):
+    """السعر كما في JSON-LD للصفحة (بدون .0 للأعداد الصحيحة)"""
+    value = float(value)
+    return f"{value:.0f}" if value.is_integer() else f"{value:.2f}".rstrip("0")
+
+
+# ---- Merchant feed ----
+
+def write_feed(path, catalog, base_url):
+    """
+    g:price هو السعر قبل الخصم و g:sale_price هو سعر البيع، تماماً كما تعرضهما
+    صفحة المنتج. المنتجات المكررة بنفس الـ SKU تظهر مرة واحدة (g:id فريد).
+    """
+    seen = set()
+    with atomic_output(path) as f:
+        xml = XMLWriter(f, indent="    ")
+        xml.declaration()
+        xml.start("rss", version="2.0", xmlns__g=GOOGLE_NS)
+        xml.start("channel")
+        xml.element("title", STORE_NAME)
+        xml.element("link", base_url)
+        xml.element("description", STORE_DESCRIPTION)
+        for product in catalog:
+            if product.sku in seen or product.price is None:
+                continue
+            seen.add(product.sku)
+            price = float(product.price)
+            regular = round(price / (1 - discount_for(product.sku) / 100))
+            xml.start("item")
+            xml.element("g:id", product.sku)
+            xml.element("g:title", product.title)
+            xml.element("g:description", product.description or product.title)
+            xml.element("g:link", f"{base_url}/products/{product.slug}.html")
+            xml.element("g:image_link", product.image_link or f"{base_url}/assets/logo.png")
+            xml.element("g:brand", product.title.split()[0])
+            xml.element("g:product_type", product.category)
+            xml.element("g:condition", "new")
+            xml.element("g:availability", "in_stock")
+            xml.element("g:price", f"{regular} IQD")
+            xml.element("g:sale_price", f"{feed_price(price)} IQD")
+            xml.end()
+        xml.end()
+        xml.end()
+    return len(seen)
+
+
+# ---- sitemap ----
+
+def file_digest(path, block_size=64 * 1024):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class LastmodTracker:
+    """تاريخ آخر تغيير لكل صفحة حسب بصمة محتواها"""
+
+    def __init__(self, path=LASTMOD_PATH, today=None):
+        self.path = path
+        self.today = (today or date.today()).isoformat()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.previous = json.load(f)
+        except (OSError, ValueError):
+            self.previous = {}
+        self.current = {}
+        self.changed = 0
+
+    def lastmod(self, rel_path, root="."):
+        if rel_path in self.current:
+            return self.current[rel_path][1]
+        full_path = os.path.join(root, rel_path)
+        if not os.path.isfile(full_path):
+            return None
+        digest = file_digest(full_path)
+        old = self.previous.get(rel_path)
+        if old and old[0] == digest:
+            entry = old
+        else:
+            entry = [digest, self.today]
+            self.changed += 1
+        self.current[rel_path] = entry
+        return entry[1]
+
+    def save(self):
+        with atomic_output(self.path) as f:
+            f.write(json.dumps(self.current, ensure_ascii=False, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def sitemap_entries(catalog, root="."):
+    """(المسار في الموقع، ملف الصفحة، changefreq، priority) لكل صفحة بالترتيب"""
+    yield "", "index.html", "daily", "1.0"
+    yield "categories.html", "categories.html", "weekly", "0.9"
+    for category in catalog.categories:
+        path = f"categories/{category_slug(category)}.html"
+        yield path, path, "weekly", "0.8"
+    for name, priority in LEGAL_PRIORITY.items():
+        path = f"legal/{name}"
+        if os.path.exists(os.path.join(root, path)):
+            yield path, path, "monthly", priority
+    seen = set()
+    for product in catalog:
+        path = f"products/{product.slug}.html"
+        if path not in seen:
+            seen.add(path)
+            yield path, path, "monthly", "0.7"
+
+
+class SitemapWriter:
+    """يكتب روابط الـ sitemap ويفتح ملفاً جديداً عند الوصول لحدود البروتوكول"""
+
+    CLOSING = "</urlset>\n"
+
+    def __init__(self, out_dir, max_urls=MAX_SITEMAP_URLS, max_bytes=MAX_SITEMAP_BYTES):
+        self.out_dir = out_dir
+        self.max_urls = max_urls
+        self.max_bytes = max_bytes
+        self.parts = []  # (ملف مؤقت، عدد الروابط، الحجم، أحدث lastmod)
+        self.file = self.xml = None
+
+    def _open(self):
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.out_dir)
+        self.file = os.fdopen(fd, "wb")
+        self.xml = XMLWriter(self.file)
+        self.xml.declaration()
+        self.xml.start("urlset", xmlns=SITEMAP_NS)
+        self.parts.append([tmp_path, 0, 0, None])
+
+    def _close(self):
+        self.xml.end()
+        part = self.parts[-1]
+        part[2] = self.xml.bytes
+        self.file.close()
+        self.file = self.xml = None
+
+    @staticmethod
+    def url_size(loc, lastmod, changefreq, priority):
+        size = len("  <url>\n  </url>\n")
+        for tag, text in (("loc", loc), ("lastmod", lastmod), ("changefreq", changefreq), ("priority", priority)):
+            if text:
+                size += XMLWriter.element_size(tag, text, 2)
+        return size
+
+    def add(self, loc, lastmod, changefreq, priority):
+        size = self.url_size(loc, lastmod, changefreq, priority)
+        if self.xml is not None:
+            part = self.parts[-1]
+            if part[1] >= self.max_urls or self.xml.bytes + size + len(self.CLOSING) > self.max_bytes:
+                self._close()
+        if self.xml is None:
+            self._open()
+        xml = self.xml
+        xml.start("url")
+        xml.element("loc", loc)
+        if lastmod:
+            xml.element("lastmod", lastmod)
+        xml.element("changefreq", changefreq)
+        xml.element("priority", priority)
+        xml.end()
+        part = self.parts[-1]
+        part[1] += 1
+        if lastmod and (part[3] is None or lastmod > part[3]):
+            part[3] = lastmod
+
+    def finish(self):
+        """نقل الملفات لأسمائها النهائية: sitemap.xml إذا كان ملفاً واحداً، وإلا sitemap-N.xml"""
+        if self.xml is not None:
+            self._close()
+        for old in glob.glob(os.path.join(self.out_dir, "sitemap-*.xml")):
+            os.remove(old)
+        names = ["sitemap.xml"] if len(self.parts) == 1 else [f"sitemap-{i}.xml" for i in range(1, len(self.parts) + 1)]
+        results = []
+        for name, (tmp_path, count, size, lastmod) in zip(names, self.parts):
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, os.path.join(self.out_dir, name))
+            results.append((name, count, size, lastmod))
+        return results
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+        for tmp_path, *_ in self.parts:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def write_sitemaps(catalog, base_url, root=".", lastmod_path=LASTMOD_PATH,
+                   max_urls=MAX_SITEMAP_URLS, max_bytes=MAX_SITEMAP_BYTES):
+    tracker = LastmodTracker(os.path.join(root, lastmod_path))
+    writer = SitemapWriter(root, max_urls, max_bytes)
+    try:
+        for site_path, file_path, changefreq, priority in sitemap_entries(catalog, root):
+            writer.add(f"{base_url}/{site_path}", tracker.lastmod(file_path, root), changefreq, priority)
+        parts = writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+
+    # عند التقسيم يُكتب sitemap.xml كـ index أيضاً: نسخته القديمة (ملف واحد) لا تبقى
+    index_names = ["sitemap_index.xml"] + (["sitemap.xml"] if len(parts) > 1 else [])
+    for index_name in index_names:
+        with atomic_output(os.path.join(root, index_name)) as f:
+            xml = XMLWriter(f)
+            xml.declaration()
+            xml.start("sitemapindex", xmlns=SITEMAP_NS)
+            for name, _, _, lastmod in parts:
+                xml.start("sitemap")
+                xml.element("loc", f"{base_url}/{name}")
+                if lastmod:
+                    xml.element("lastmod", lastmod)
+                xml.end()
+            xml.end()
+    tracker.save()
+    return parts, tracker.changed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="توليد Merchant feed و sitemap من products.json")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    parser.add_argument("--root", default=".", help="مجلد الموقع (افتراضي: مجلد المشروع)")
+    parser.add_argument("--base-url", default=SITE_URL, help=f"رابط الموقع في الـ sitemap (افتراضي: {SITE_URL})")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    catalog = load_catalog(args.products)
+    for name, base_url in FEEDS.items():
+        count = write_feed(os.path.join(args.root, name), catalog, base_url)
+        print(f"✓ {name}: {count} منتج")
+
+    parts, changed = write_sitemaps(catalog, args.base_url.rstrip("/"), args.root)
+    for name, count, size, _ in parts:
+        print(f"✓ {name}: {count} رابط ({size / 1024:.1f} KB)")
+    print(f"✓ sitemap_index.xml: {len(parts)} ملف — {changed} صفحة تغيّر تاريخها")
+    print(f"📊 اكتمل في {time.perf_counter() - start:.2f} ثانية")
+
+
+if __name__ == "__main__":
+    main()
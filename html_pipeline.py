@@ -0,0 +1,548 @@
+# Streaming HTML rewriting shared by theme_manager.py and add_faq.py
+#
+# A page is tokenized while it is read (in chunks) and every token
+# flows through an ordered list of stages. Tokens keep their exact source text, so
+# whatever no stage touches is written back byte for byte, and the file is only
+# rewritten when the output differs. Stages work on whole tags and elements instead
+# of regexes over the page text, and each one recognises its own output, so a second
+# run changes nothing.
+import hashlib
+import html
+import os
+import re
+import tempfile
+import time
+from functools import lru_cache
+
+READ_CHUNK_SIZE = 64 * 1024
+
+# Token kinds; comments, doctypes and processing instructions are all OTHER
+START, END, DATA, OTHER = 'start', 'end', 'data', 'other'
+
+# One match per token, in the order html.parser would report them. script/style start
+# tags are matched together with their raw content, up to (not including) the end tag;
+# a '<' that opens no tag is matched on its own as text. Possessive quantifiers keep a
+# tag or script cut by the chunk boundary from backtracking. {text} is where
+# token_pattern() lets the tags no stage asked for run on as text.
+TOKEN_RE_TEMPLATE = r'''
+    (?P<text>{text})
+  | (?P<other><!--.*?-->|<![^>]*+>|<\?[^>]*+>)
+  | (?P<raw><(?P<rawtag>(?i:script|style))(?=[\s/>])(?:[^>"'/]++|/(?!>)|"[^"]*+"|'[^']*+')*+>)
+    (?P<body>(?:[^<]++|<(?!/(?i:(?P=rawtag))[\s/>]))*+)(?=</)
+  | (?P<end></(?P<endtag>[a-zA-Z][^\s/>]*+)[^>]*+>)
+  | (?P<start><(?P<tag>[a-zA-Z][^\s/>]*+)(?:[^>"']++|"[^"]*+"|'[^']*+')*+>)
+  | (?P<lt><)
+'''
+ATTR_RE = re.compile(r'''([^\s/>"'=][^\s/>=]*)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]*)))?''')
+RAW_TEXT_TAGS = ('script', 'style')
+
+
+@lru_cache(maxsize=None)
+def token_pattern(tags=None):
+    """
+    The token regex for the given ((tag, hint), ...); None reports every tag. Other tags stay
+    inside the surrounding text token. A tag with a hint is only reported as a start tag
+    that contains the hint (a prefilter: the stage still checks the tag itself).
+    Comments and script/style elements are always tokens, so nothing inside them
+    is ever taken for a tag.
+    """
+    if tags is None:
+        text = r'[^<]++'
+    else:
+        names = '|'.join(re.escape(tag) for tag, hint in tags if hint is None)
+        hinted = ''.join(rf'|(?i:{re.escape(tag)})(?=[\s/>])[^>]*?{re.escape(hint)}' for tag, hint in tags if hint)
+        reported = r'/?(?i:script|style' + (f'|{names}' if names else '') + r')[\s/>]' + hinted
+        # Most tags are let through on their first letter before trying the names
+        initials = {tag[0] for tag, _ in tags} | {'s'}  # and script/style
+        initials = ''.join(sorted(initials | {c.upper() for c in initials}))
+        text = rf'(?:[^<]++|</?+(?![{re.escape(initials)}!?/])|<(?![!?]|{reported}))++'
+    return re.compile(TOKEN_RE_TEMPLATE.replace('{text}', text), re.VERBOSE | re.DOTALL)
+
+
+class Token:
+    __slots__ = ('kind', 'text', 'tag')
+
+    def __init__(self, kind, text, tag=None):
+        self.kind = kind
+        self.text = text
+        self.tag = tag
+
+    @property
+    def attrs(self):
+        """[(name, value)] like html.parser, parsed from the text only when asked for."""
+        if self.kind != START:
+            return []
+        attrs = []
+        for match in ATTR_RE.finditer(self.text, len(self.tag) + 1):
+            name, *values = match.groups()
+            value = next((v for v in values if v is not None), None)
+            attrs.append((name.lower(), None if value is None else html.unescape(value)))
+        return attrs
+
+    def attr(self, name, default=None):
+        for key, value in self.attrs:
+            if key == name:
+                return value
+        return default
+
+    def with_text(self, text):
+        return Token(self.kind, text, self.tag)
+
+    def __repr__(self):
+        return f"Token({self.kind!r}, {self.text!r})"
+
+
+class Tokenizer:
+    """
+    Splits HTML fed in chunks into tokens whose text is the exact source slice, so
+    joining them gives back the input byte for byte. Tags and attributes come out as
+    html.parser reports them; text runs and tags cut by a chunk boundary wait for the
+    next chunk. With `tags` (see token_pattern) only those tags become tokens.
+    """
+
+    def __init__(self, tags=None):
+        self.tokens = []
+        self._buffer = ''
+        self._pattern = token_pattern(tags)
+
+    def feed(self, data):
+        self._buffer += data
+        self._scan(final=False)
+
+    def close(self):
+        self._scan(final=True)
+
+    def pop(self):
+        tokens, self.tokens = self.tokens, []
+        return tokens
+
+    def _scan(self, final):
+        buffer, tokens = self._buffer, self.tokens
+        size = len(buffer)
+        pos = 0  # start of the text not emitted yet
+        for match in self._pattern.finditer(buffer):
+            kind = match.lastgroup
+            if kind == 'text':
+                if not final and match.end() == size:
+                    break  # the text may go on in the next chunk
+                tokens.append(Token(DATA, match.group()))
+            elif kind == 'start':
+                tag = match.group('tag').lower()
+                text = match.group()
+                if tag in RAW_TEXT_TAGS and not text.endswith('/>'):
+                    # Its end tag is not in the buffer yet
+                    if not final:
+                        break
+                    tokens.append(Token(START, text, tag))
+                    if match.end() < size:
+                        tokens.append(Token(DATA, buffer[match.end():]))
+                    pos = size
+                    break
+                tokens.append(Token(START, text, tag))
+            elif kind == 'end':
+                tokens.append(Token(END, match.group(), match.group('endtag').lower()))
+            elif kind == 'body':
+                tokens.append(Token(START, match.group('raw'), match.group('rawtag').lower()))
+                if match.group('body'):
+                    tokens.append(Token(DATA, match.group('body')))
+            elif kind == 'lt':
+                following = buffer[match.end():match.end() + 1]
+                if not final and (not following or following.isalpha() or following in '/!?'):
+                    break  # maybe a tag cut by the chunk boundary
+                tokens.append(Token(DATA, '<'))
+            else:
+                tokens.append(Token(OTHER, match.group()))
+            pos = match.end()
+        self._buffer = buffer[pos:]
+
+
+def tokenize(text, tags=None):
+    tokenizer = Tokenizer(tags)
+    tokenizer.feed(text)
+    tokenizer.close()
+    return tokenizer.pop()
+
+
+def atomic_write(path, content):
+    """Write to a temp file in the same directory, then rename over the target."""
+    directory = os.path.dirname(path) or '.'
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.html')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        # mkstemp creates 0600 files; keep the page readable by the web server
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def strip_newlines(token, count=1):
+    """A text token without up to `count` leading line breaks; None if nothing is left."""
+    if token.kind != DATA:
+        return token
+    text = token.text
+    while count and text.startswith('\n'):
+        text, count = text[1:], count - 1
+    if not text:
+        return None
+    return token if text == token.text else token.with_text(text)
+
+
+class Stage:
+    """
+    One rewrite step. process() gets the tokens of each chunk in document order and
+    returns the tokens to pass on, with some dropped, changed or inserted. State
+    carries over between chunks; close() returns anything still held back.
+
+    `tags` maps the tags the stage looks at to a hint (see token_pattern) or None;
+    every other tag reaches it inside text tokens. None means every tag.
+
+    A stage that drops a tag sets self.eat so the line break after it goes too.
+    """
+    name = 'stage'
+    tags = None
+
+    def start(self, path):
+        self.eat = 0
+
+    def process(self, tokens):
+        return tokens
+
+    def close(self):
+        return []
+
+
+class BaseTagStage(Stage):
+    """Exactly one <base>, right after <head>: every other <base> tag is dropped."""
+    name = 'base'
+    tags = {'head': None, 'base': None}
+
+    def __init__(self, base_tag):
+        self.tokens = [Token(DATA, '\n')] + tokenize(base_tag)
+
+    def start(self, path):
+        super().start(path)
+        self.done = False
+
+    def process(self, tokens):
+        out = []
+        for token in tokens:
+            if self.eat:
+                token, self.eat = strip_newlines(token, self.eat), 0
+                if token is None:
+                    continue
+            if token.kind == START:
+                if token.tag == 'base':
+                    self.eat = 1
+                    continue
+                if token.tag == 'head' and not self.done:
+                    self.done = True
+                    out.append(token)
+                    out.extend(self.tokens)
+                    continue
+            out.append(token)
+        return out
+
+
+class RelativeLinksStage(Stage):
+    """
+    Root-relative href/src/action values ("/x") become relative ("x") so <base> applies,
+    in tags, in the markup around them and in inline scripts (window.location.href='/x').
+    "//host/x" is left alone.
+    """
+    name = 'links'
+    tags = {}
+    PATTERN = re.compile(r'''(\b(?:href|src|action)=["'])/(?!/)''')
+
+    def process(self, tokens):
+        pattern = self.PATTERN
+        out = []
+        for token in tokens:
+            text = token.text
+            if token.kind in (START, DATA) and ('="/' in text or "='/" in text):
+                text = pattern.sub(r'\1', text)
+                if text != token.text:
+                    token = token.with_text(text)
+            out.append(token)
+        return out
+
+
+class ThemeStage(Stage):
+    """
+    Drops stale theme links and inline CSS, then puts the current theme block right
+    before </head>. stale_links are matched against whole <link> tags; stale_css is
+    cut out of <style> elements (an element left empty is dropped) and loose text.
+    Stray </style> tags left by older injections are dropped too.
+    """
+    name = 'theme'
+    tags = {'head': None, 'style': None, 'link': None}
+
+    def __init__(self, head=None, stale_links=(), stale_css=()):
+        self.tokens = tokenize(head + '\n') if head else []
+        self.stale_links = stale_links
+        self.stale_css = stale_css
+
+    def start(self, path):
+        super().start(path)
+        self.done = not self.tokens
+        self.style = None  # tokens of the <style> element being read
+
+    def _clean(self, css):
+        for pattern in self.stale_css:
+            css = pattern.sub('', css)
+        return css
+
+    def _end_style(self, end):
+        start, content = self.style[0], self.style[1:]
+        self.style = None
+        css = ''.join(token.text for token in content)
+        cleaned = self._clean(css)
+        if cleaned == css:
+            return [start] + content + [end]
+        if not cleaned.strip():
+            self.eat = 1
+            return []
+        return [start, Token(DATA, cleaned), end]
+
+    def process(self, tokens):
+        out = []
+        for token in tokens:
+            if self.eat:
+                token, self.eat = strip_newlines(token, self.eat), 0
+                if token is None:
+                    continue
+            kind = token.kind
+            if self.style is not None:
+                if kind == END and token.tag == 'style':
+                    out.extend(self._end_style(token))
+                else:
+                    self.style.append(token)
+                continue
+            if kind == START:
+                if token.tag == 'style':
+                    self.style = [token]
+                    continue
+                if token.tag == 'link' and any(p.fullmatch(token.text) for p in self.stale_links):
+                    self.eat = 1
+                    continue
+            elif kind == END:
+                if token.tag == 'style':
+                    self.eat = 1
+                    continue
+                if token.tag == 'head' and not self.done:
+                    self.done = True
+                    out.extend(self.tokens)
+            elif kind == DATA and self.stale_css and ('{' in token.text or '/*' in token.text):
+                # Only the text up to the next tag: loose CSS never holds markup
+                css, markup, rest = token.text.partition('<')
+                text = self._clean(css) + markup + rest
+                if text != token.text:
+                    if not text:
+                        continue
+                    token = token.with_text(text)
+            out.append(token)
+        return out
+
+    def close(self):
+        style, self.style = self.style or [], None
+        return style
+
+
+class FaqStage(Stage):
+    """
+    Puts one FAQ section before the first anchor tag of the page.
+
+    render(texts) returns the HTML to insert; texts holds the raw text of the first
+    element of each `capture` tag (tag -> required class or None) seen so far.
+    Existing <section class="faq-section"> elements are removed when `stale` is None
+    or contains their HTML; any other existing FAQ is kept and nothing is inserted.
+    The inserted section is only split into the tags this stage looks at, so it is
+    meant to be the last stage.
+    """
+    name = 'faq'
+
+    def __init__(self, render, anchors, capture=None, applies=None, stale=None):
+        self.render = render
+        self.anchors = anchors  # (kind, tag, class or None)
+        self.anchor_tags = {(kind, tag) for kind, tag, _ in anchors}
+        self.capture = capture or {}
+        self.applies = applies
+        self.stale = stale
+        self.tags = {'section': None, **dict.fromkeys(self.capture)}
+        for _, tag, cls in anchors:
+            # A class is only a hint when nothing else needs the whole tag
+            self.tags[tag] = cls if self.tags.get(tag, cls) == cls else None
+        self.token_tags = tuple(sorted(self.tags.items()))
+
+    def start(self, path):
+        super().start(path)
+        self.active = self.applies is None or self.applies(path)
+        self.texts = {}
+        self.capturing = None
+        self.captured = []
+        self.section = None
+        self.depth = 0
+        self.held = None  # the text right before the current tag, see _end_section
+        self.found = False
+        self.inserted = False
+
+    def _is_anchor(self, token):
+        return any(token.kind == kind and token.tag == tag and (cls is None or token.attr('class') == cls)
+                   for kind, tag, cls in self.anchors)
+
+    def _capture(self, token):
+        if self.capturing:
+            if token.kind == END and token.tag == self.capturing:
+                self.texts[self.capturing] = ''.join(self.captured)
+                self.capturing = None
+            else:
+                self.captured.append(token.text)
+        elif token.tag not in self.texts and self.capture[token.tag] in (None, token.attr('class')):
+            self.capturing = token.tag
+            self.captured = []
+
+    def _end_section(self):
+        section, self.section = self.section, None
+        html = ''.join(token.text for token in section)
+        if self.stale is not None and html not in self.stale:
+            self.found = True
+            held, self.held = self.held, None
+            return [held] + section if held else section
+        # Inserted sections are wrapped in line breaks: take them out with the section
+        if self.held and self.held.text.endswith('\n'):
+            self.held = self.held.with_text(self.held.text[:-1])
+        self.eat = 2
+        return []
+
+    def process(self, tokens):
+        if not self.active:
+            return tokens
+        out = []
+        for token in tokens:
+            if self.eat:
+                token, self.eat = strip_newlines(token, self.eat), 0
+                if token is None:
+                    continue
+            kind = token.kind
+            if self.section is not None:
+                self.section.append(token)
+                if token.tag == 'section':
+                    self.depth += 1 if kind == START else -1 if kind == END else 0
+                    if not self.depth:
+                        out.extend(self._end_section())
+                continue
+            if self.capturing or kind == START and token.tag in self.capture:
+                self._capture(token)
+            if kind == DATA:
+                if self.held:
+                    out.append(self.held)
+                self.held = token
+                continue
+            if kind == START and token.tag == 'section' and token.attr('class') == 'faq-section':
+                self.section = [token]  # the text before it is kept or trimmed at its end
+                self.depth = 1
+                continue
+            if self.held:
+                out.append(self.held)
+                self.held = None
+            if (not self.inserted and not self.found and (kind, token.tag) in self.anchor_tags
+                    and self._is_anchor(token)):
+                self.inserted = True
+                out.extend(tokenize(self.render(self.texts), self.token_tags))
+            out.append(token)
+        return out
+
+    def close(self):
+        out = [self.held] if self.held else []
+        self.held = None
+        out.extend(self.section or [])
+        self.section = None
+        return out
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    @property
+    def names(self):
+        return ['tokenize'] + [stage.name for stage in self.stages]
+
+    @property
+    def tags(self):
+        """((tag, hint), ...) for the Tokenizer, merged over all stages; None for every tag."""
+        merged = {}
+        for stage in self.stages:
+            if stage.tags is None:
+                return None
+            for tag, hint in stage.tags.items():
+                merged[tag] = hint if merged.get(tag, hint) == hint else None
+        return tuple(sorted(merged.items()))
+
+    def _push(self, tokens, first, out, timings):
+        for stage in self.stages[first:]:
+            start = time.perf_counter()
+            tokens = stage.process(tokens)
+            timings[stage.name] += time.perf_counter() - start
+        out.extend(token.text for token in tokens)
+
+    def run(self, chunks, path=''):
+        """Rewrite a page given as text chunks; returns (new text, {stage name: seconds})."""
+        timings = dict.fromkeys(self.names, 0.0)
+        for stage in self.stages:
+            stage.start(path)
+        tokenizer = Tokenizer(self.tags)
+        out = []
+        for chunk in chunks:
+            start = time.perf_counter()
+            tokenizer.feed(chunk)
+            timings['tokenize'] += time.perf_counter() - start
+            self._push(tokenizer.pop(), 0, out, timings)
+        start = time.perf_counter()
+        tokenizer.close()
+        timings['tokenize'] += time.perf_counter() - start
+        self._push(tokenizer.pop(), 0, out, timings)
+        for index, stage in enumerate(self.stages):
+            start = time.perf_counter()
+            tokens = stage.close()
+            timings[stage.name] += time.perf_counter() - start
+            self._push(tokens, index + 1, out, timings)
+        return ''.join(out), timings
+
+    def process_file(self, path):
+        """
+        Read the page once, run every stage and write it back only if it changed.
+        Returns (changed, sha256 of the resulting page, {stage name: seconds}).
+        """
+        original = []
+
+        def chunks():
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+                    original.append(chunk)
+                    yield chunk
+
+        content, timings = self.run(chunks(), path)
+        changed = content != ''.join(original)
+        if changed:
+            atomic_write(path, content)
+        return changed, hashlib.sha256(content.encode('utf-8')).hexdigest(), timings
+
+
+def print_stage_timings(names, results):
+    """Per-stage time summed over every file (the third item of each process_file result)."""
+    totals = dict.fromkeys(names, 0.0)
+    for _, result, error in results:
+        if not error:
+            for name, seconds in result[2].items():
+                totals[name] += seconds
+    total = sum(totals.values()) or 1
+    for name, seconds in totals.items():
+        print(f"  {name:<10} {seconds * 1000:8.1f} ms  {seconds / total:6.1%}")
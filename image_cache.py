@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+كاش صور المنتجات على القرص لبوت تويتر
+Bounded on-disk image cache for twitter_bot.py
+
+كل صورة تُحفظ في .image_cache/ باسم sha256 لرابطها (image_link). عند القراءة
+يُحدَّث وقت آخر استخدام، وعند تجاوز الحد الأقصى للحجم تُحذف الصور الأقدم
+استخداماً أولاً (LRU).
+"""
+
+import hashlib
+import os
+import tempfile
+
+CACHE_DIR = ".image_cache"
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class ImageCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_for(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def get(self, url):
+        path = self.path_for(url)
+        # الصورة قد تُحذف (evict) بين القراءة وتحديث الوقت: تُعامل كأنها غير موجودة
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, url, data):
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path_for(url))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """حذف الصور الأقدم استخداماً حتى يصبح الحجم الكلي ضمن الحد"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                    total += st.st_size
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+صور المنتجات المصغّرة للموقع (WebP + JPEG بعدة مقاسات)
+Responsive product image pipeline
+
+كل صورة image_link في products.json تُحمّل مرة واحدة إلى .image_sources/
+باسم sha256 محتواها، ثم تُولّد منها نسخ مصغّرة في assets/img/ بعرض 320 و 640
+و 960 بكسل (WebP و JPEG). assets/img/manifest.json يربط كل رابط بالنسخ
+وأبعادها، ومنه يكتب build_site.py وسوم <picture> مع srcset و width/height.
+
+عند إعادة التشغيل لا يُحمّل إلا الرابط الجديد، ولا تُولّد النسخ إلا لمحتوى
+جديد (نفس المحتوى من رابط مختلف يستخدم نفس الملفات). --refresh يرسل طلباً
+شرطياً (ETag / Last-Modified) للروابط المعروفة لاكتشاف الصور التي تغيّرت.
+
+يحتاج Pillow لتوليد النسخ: pip install Pillow
+
+الاستخدام / Usage:
+    python image_pipeline.py
+    python image_pipeline.py --refresh --workers 8
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+
+try:
+    from PIL import Image, ImageOps  # اختياري: pip install Pillow
+except ImportError:
+    Image = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_DIR = ".image_sources"
+OUTPUT_DIR = "assets/img"
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "manifest.json")
+MANIFEST_VERSION = 1
+WIDTHS = (320, 640, 960)
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+DEFAULT_WORKERS = 4
+REQUEST_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+# عرض الصورة في الصفحة (sizes) لكل مكان تظهر فيه
+CARD_SIZES = "(max-width: 640px) 100vw, 340px"
+PRODUCT_SIZES = "(max-width: 768px) 100vw, 500px"
+
+
+# ---- manifest ----
+
+def load_manifest(path=os.path.join(SCRIPT_DIR, MANIFEST_PATH)):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        manifest = {"version": MANIFEST_VERSION, "sources": {}, "images": {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def image_for(manifest, url):
+    """بيانات النسخ المصغّرة لرابط الصورة، أو None إذا لم تُولّد بعد"""
+    source = manifest["sources"].get(url) if url else None
+    return manifest["images"].get(source["sha256"]) if source else None
+
+
+def srcset(image, fmt):
+    return ", ".join(f"{v[fmt]} {v['width']}w" for v in image["variants"])
+
+
+def picture_html(image, src, alt, sizes, attrs="", lazy=True):
+    """
+    وسم <picture> بنسخ WebP و JPEG مع الأبعاد. lazy=False للصورة الرئيسية في
+    أعلى الصفحة (تُحمّل فوراً). بدون نسخ مصغّرة (image=None) يُرجع <img>
+    بالرابط الأصلي كما كان.
+    """
+    alt = html.escape(alt)
+    attrs += ' loading="lazy" decoding="async"' if lazy else ' fetchpriority="high"'
+    if image is None:
+        return f'<img src="{html.escape(src)}" alt="{alt}"{attrs}>'
+    fallback = image["variants"][min(1, len(image["variants"]) - 1)]
+    return (f'<picture><source type="image/webp" srcset="{srcset(image, "webp")}" sizes="{sizes}">'
+            f'<img src="{fallback["jpg"]}" srcset="{srcset(image, "jpg")}" sizes="{sizes}" '
+            f'width="{image["width"]}" height="{image["height"]}" alt="{alt}"{attrs}></picture>')
+
+
+# ---- download ----
+
+def make_session(workers=DEFAULT_WORKERS):
+    """نفس إعدادات جلسة twitter_bot.py: اتصالات مشتركة وإعادة المحاولة عند 429/5xx"""
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=workers, pool_maxsize=workers)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch_source(session, url, source_dir, known=None):
+    """
+    تحميل الصورة إلى source_dir/<sha256> أثناء حساب البصمة.
+    يُرجع سجل المصدر الجديد، أو known كما هو إذا رد السيرفر 304.
+    """
+    headers = {}
+    if known and os.path.exists(os.path.join(source_dir, known["sha256"])):
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+    with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as resp:
+        if resp.status_code == 304 and headers:
+            return known
+        resp.raise_for_status()
+        os.makedirs(source_dir, exist_ok=True)
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=source_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    h.update(chunk)
+                    f.write(chunk)
+            digest = h.hexdigest()
+            os.replace(tmp_path, os.path.join(source_dir, digest))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return {"sha256": digest, "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified")}
+
+
+# ---- thumbnails ----
+
+def make_variants(source_path, digest, out_dir, widths=WIDTHS):
+    """النسخ المصغّرة لصورة واحدة؛ لا تُكبّر الصورة أكثر من عرضها الأصلي"""
+    with Image.open(source_path) as im:
+        im = ImageOps.exif_transpose(im).convert("RGB")
+        width, height = im.size
+        targets = sorted({min(w, width) for w in widths})
+        os.makedirs(out_dir, exist_ok=True)
+        variants = []
+        for target in targets:
+            resized = im if target == width else im.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS)
+            name = f"{digest[:16]}-{target}"
+            resized.save(os.path.join(out_dir, name + ".webp"), "WEBP", quality=WEBP_QUALITY, method=6)
+            resized.save(os.path.join(out_dir, name + ".jpg"), "JPEG", quality=JPEG_QUALITY,
+                         optimize=True, progressive=True)
+            variants.append({"width": target, "height": resized.size[1],
+                             "webp": f"{OUTPUT_DIR}/{name}.webp", "jpg": f"{OUTPUT_DIR}/{name}.jpg"})
+    largest = variants[-1]
+    return {"width": largest["width"], "height": largest["height"], "variants": variants}
+
+
+def variants_exist(image, root):
+    return all(os.path.exists(os.path.join(root, v[fmt])) for v in image["variants"] for fmt in ("webp", "jpg"))
+
+
+class ImagePipeline:
+    def __init__(self, root=SCRIPT_DIR, session=None, workers=DEFAULT_WORKERS, refresh=False):
+        self.root = root
+        self.source_dir = os.path.join(root, SOURCE_DIR)
+        self.out_dir = os.path.join(root, OUTPUT_DIR)
+        self.manifest_path = os.path.join(root, MANIFEST_PATH)
+        self.manifest = load_manifest(self.manifest_path)
+        self.session = session or make_session(workers)
+        self.workers = workers
+        self.refresh = refresh
+        self.stats = {"cached": 0, "downloaded": 0, "not_modified": 0, "generated": 0, "failed": 0}
+
+    def _up_to_date(self, url):
+        image = image_for(self.manifest, url)
+        return image is not None and variants_exist(image, self.root)
+
+    def process(self, url):
+        """تحميل رابط واحد (إذا لزم) وتوليد نسخه؛ يُرجع اسم الإحصائية"""
+        known = self.manifest["sources"].get(url)
+        if not self.refresh and self._up_to_date(url):
+            return "cached"
+        source = fetch_source(self.session, url, self.source_dir, known)
+        status = "not_modified" if source is known else "downloaded"
+        self.manifest["sources"][url] = source
+        image = self.manifest["images"].get(source["sha256"])
+        if image is None or not variants_exist(image, self.root):
+            self.manifest["images"][source["sha256"]] = make_variants(
+                os.path.join(self.source_dir, source["sha256"]), source["sha256"], self.out_dir)
+            return "generated"
+        return status
+
+    def run(self, urls):
+        urls = list(dict.fromkeys(u for u in urls if u))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for url, future in [(u, pool.submit(self.process, u)) for u in urls]:
+                try:
+                    self.stats[future.result()] += 1
+                except (requests.RequestException, OSError) as e:
+                    self.stats["failed"] += 1
+                    print(f"⚠ {url[:80]}: {e}")
+        removed = self.prune(urls)
+        save_manifest(self.manifest, self.manifest_path)
+        return removed
+
+    def prune(self, urls):
+        """حذف روابط المنتجات المحذوفة والنسخ التي لم يعد يستخدمها أي رابط"""
+        wanted = set(urls)
+        sources = self.manifest["sources"]
+        for url in [u for u in sources if u not in wanted]:
+            del sources[url]
+        used = {s["sha256"] for s in sources.values()}
+        images = self.manifest["images"]
+        for digest in [d for d in images if d not in used]:
+            del images[digest]
+        keep = {os.path.basename(v[fmt]) for image in images.values()
+                for v in image["variants"] for fmt in ("webp", "jpg")}
+        removed = 0
+        if os.path.isdir(self.out_dir):
+            for name in os.listdir(self.out_dir):
+                if name.endswith((".webp", ".jpg")) and name not in keep:
+                    os.remove(os.path.join(self.out_dir, name))
+                    removed += 1
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="توليد صور المنتجات المصغّرة من image_link")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="عدد التحميلات المتوازية")
+    parser.add_argument("--refresh", action="store_true", help="طلب شرطي لكل الروابط لاكتشاف الصور المتغيرة")
+    args = parser.parse_args(argv)
+
+    if Image is None:
+        print("✗ توليد الصور يحتاج Pillow: pip install Pillow")
+        return 1
+    start = time.perf_counter()
+    urls = [p.image_link for p in load_catalog(args.products)]
+    pipeline = ImagePipeline(workers=args.workers, refresh=args.refresh)
+    removed = pipeline.run(urls)
+    s = pipeline.stats
+    print(f"✓ {len(pipeline.manifest['sources'])} صورة في {MANIFEST_PATH}: {s['generated']} جديدة، "
+          f"{s['cached']} من الكاش، {s['not_modified']} لم تتغير، {s['failed']} فشلت، {removed} ملف قديم حُذف")
+    print(f"📊 اكتمل في {time.perf_counter() - start:.2f} ثانية")
+    return 1 if s["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+# Shared --jobs support for the page rewriting scripts (theme_manager.py, add_faq.py)
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+DEFAULT_CHUNK_SIZE = 25
+
+
+def resolve_jobs(jobs):
+    """0 or a negative value means one worker per CPU core."""
+    if jobs is None or jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _run_chunk(func, chunk):
+    results = []
+    for item in chunk:
+        try:
+            results.append((item, func(item), None))
+        except Exception as e:
+            results.append((item, None, f"{type(e).__name__}: {e}"))
+    return results
+
+
+def run_files(func, items, jobs=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Apply func to every item and return [(item, result, error), ...] in input order.
+
+    With jobs > 1 the items are split into chunks and spread over a process pool,
+    so func and the items must be picklable (module-level functions, partials).
+    One failing file never stops the run; its error message is returned instead.
+    """
+    items = list(items)
+    jobs = resolve_jobs(jobs)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if jobs == 1 or len(chunks) <= 1:
+        return [r for chunk in chunks for r in _run_chunk(func, chunk)]
+    results = []
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        for chunk_results in pool.map(partial(_run_chunk, func), chunks):
+            results.extend(chunk_results)
+    return results
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_summary(results, elapsed, jobs, changed=bool):
+    """Print totals, timing and every per-file error."""
+    errors = [(item, error) for item, _, error in results if error]
+    updated = sum(1 for _, result, error in results if not error and changed(result))
+    rate = len(results) / elapsed if elapsed else 0
+    print(f"Processed {len(results)} files with {resolve_jobs(jobs)} job(s) in {elapsed:.2f}s "
+          f"({rate:.0f} files/s): {updated} changed, {len(errors)} errors")
+    for item, error in errors:
+        print(f"  ✗ {item}: {error}")
+    return updated, errors
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سجل المنشورات لبوت تويتر (SQLite) بدلاً من posted_products.json
+Indexed posting ledger for twitter_bot.py
+
+كل منشور يُضاف كسطر جديد في جدول posts ولا يُعاد كتابة الملف كاملاً.
+فحص "هل نُشر هذا المنتج في الدورة الحالية" يتم عبر فهرس فريد على
+(الدورة، المنتج)، وعدد منشورات كل شهر محفوظ في جدول monthly_counts.
+أثناء التشغيل يُقفل ملف .lock بجانب قاعدة البيانات حتى لا يتداخل تشغيلان.
+
+عند أول فتح يُستورد posted_products.json القديم تلقائياً إن وُجد. قاعدة البيانات
+نفسها لا تُحفظ في git (ملف ثنائي يكبر مع كل تشغيل)؛ الـ workflow يحفظها في
+كاش GitHub Actions ويصدّر الدورة الحالية إلى posted_products.json بنفس الصيغة
+القديمة، فتُراجع في git وتُستورد منها القاعدة إذا ضاع الكاش.
+
+الاستخدام / Usage:
+    python posting_ledger.py                            # الإحصائيات
+    python posting_ledger.py --import posted_products.json
+    python posting_ledger.py --export posted_products.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEDGER_PATH = "posted_products.db"
+LEGACY_TRACKING_FILE = "posted_products.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    cycle INTEGER NOT NULL,
+    product_key TEXT NOT NULL,
+    month TEXT NOT NULL,
+    posted_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS posts_cycle_key ON posts (cycle, product_key);
+CREATE TABLE IF NOT EXISTS monthly_counts (month TEXT PRIMARY KEY, posts INTEGER NOT NULL);
+"""
+
+
+def current_month(now=None):
+    return (now or datetime.now()).strftime("%Y-%m")
+
+
+class FileLock:
+    """قفل حصري على ملف (fcntl على Linux/Mac و msvcrt على Windows)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a+b")
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        else:
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.file.close()
+
+
+class PostingLedger:
+    def __init__(self, path=LEDGER_PATH, legacy_path=LEGACY_TRACKING_FILE):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lock = FileLock(path + ".lock")
+        self.db = None
+        self._cycle = None  # الدورة الحالية، تُقرأ مرة واحدة لكل فتح (القفل يمنع تغييرها من الخارج)
+
+    def __enter__(self):
+        self.lock.__enter__()
+        try:
+            self.db = sqlite3.connect(self.path)
+            self.db.executescript(SCHEMA)
+            if self.legacy_path and self._meta("cycle") is None and os.path.exists(self.legacy_path):
+                self.import_json(self.legacy_path)
+        except BaseException:
+            self.lock.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.db.close()
+        self.db = None
+        self._cycle = None
+        self.lock.__exit__(*exc)
+
+    def _meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def cycle(self):
+        if self._cycle is None:
+            self._cycle = int(self._meta("cycle") or 0)
+        return self._cycle
+
+    def is_posted(self, product_key):
+        """هل نُشر المنتج في الدورة الحالية؟ (بحث في الفهرس الفريد)"""
+        row = self.db.execute("SELECT 1 FROM posts WHERE cycle = ? AND product_key = ?",
+                              (self.cycle, str(product_key))).fetchone()
+        return row is not None
+
+    def posted_in_cycle(self):
+        return self.db.execute("SELECT COUNT(*) FROM posts WHERE cycle = ?", (self.cycle,)).fetchone()[0]
+
+    def posts_this_month(self, month=None):
+        row = self.db.execute("SELECT posts FROM monthly_counts WHERE month = ?",
+                              (month or current_month(),)).fetchone()
+        return row[0] if row else 0
+
+    def new_cycle(self):
+        cycle = self.cycle + 1
+        with self.db:
+            self._set_meta("cycle", cycle)
+        self._cycle = cycle
+        return cycle
+
+    def record_post(self, product_key, now=None):
+        now = now or datetime.now()
+        month = current_month(now)
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO posts (cycle, product_key, month, posted_at) VALUES (?, ?, ?, ?)",
+                (self.cycle, str(product_key), month, now.isoformat(timespec="seconds")))
+            self.db.execute(
+                "INSERT INTO monthly_counts (month, posts) VALUES (?, 1) "
+                "ON CONFLICT(month) DO UPDATE SET posts = posts + 1", (month,))
+
+    def import_json(self, path):
+        """استيراد posted_products.json القديم: الدورة الحالية وعداد الشهر"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        cycle = int(data.get("cycle_count", 0))
+        month = data.get("current_month") or current_month()
+        with self.db:
+            self._set_meta("cycle", cycle)
+            self._cycle = cycle
+            self.db.executemany(
+                "INSERT OR IGNORE INTO posts (cycle, product_key, month, posted_at) VALUES (?, ?, ?, '')",
+                ((cycle, str(key), month) for key in data.get("posted_products", [])))
+            self.db.execute("INSERT OR REPLACE INTO monthly_counts (month, posts) VALUES (?, ?)",
+                            (month, int(data.get("posts_this_month", 0))))
+        print(f"✓ تم استيراد {len(data.get('posted_products', []))} منتج من {path} (الدورة {cycle})")
+
+    def export_json(self, path):
+        """تصدير الدورة الحالية بصيغة posted_products.json (نص يُحفظ في git ويُستورد بـ import_json)"""
+        keys = [row[0] for row in self.db.execute(
+            "SELECT product_key FROM posts WHERE cycle = ? ORDER BY id", (self.cycle,))]
+        month = current_month()
+        data = {
+            "posted_products": keys,
+            "current_month": month,
+            "posts_this_month": self.posts_this_month(month),
+            "cycle_count": self.cycle,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"✓ تم تصدير {len(keys)} منتج إلى {path} (الدورة {self.cycle})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="سجل منشورات بوت تويتر")
+    parser.add_argument("--db", default=LEDGER_PATH, help=f"مسار قاعدة البيانات (افتراضي: {LEDGER_PATH})")
+    parser.add_argument("--import", dest="import_path", help="استيراد ملف JSON قديم")
+    parser.add_argument("--export", dest="export_path", help="تصدير الدورة الحالية إلى ملف JSON")
+    args = parser.parse_args(argv)
+    with PostingLedger(args.db, legacy_path=None) as ledger:
+        if args.import_path:
+            ledger.import_json(args.import_path)
+        if args.export_path:
+            ledger.export_json(args.export_path)
+        print(f"📊 الدورة: {ledger.cycle} | المنشور في الدورة: {ledger.posted_in_cycle()} | "
+              f"هذا الشهر ({current_month()}): {ledger.posts_this_month()}")
+
+
+if __name__ == "__main__":
+    main()
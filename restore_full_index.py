@@ -3,67 +3,36 @@
 """
 سكريبت لاستعادة index.html الأصلي الكامل وإضافة الشات بوت تلقائياً
 
+بدون معاملات: يستعيد index.html من origin/main ويضيف الشات بوت ثم يسأل عن الرفع.
+
+مع مسارات أو أنماط (مثل "products/*.html"): يستعيد كل الملفات المطابقة في
+النسخة --rev مرة واحدة. كل المحتوى يُقرأ من عملية `git cat-file --batch`
+واحدة، ويمر على إضافة الشات بوت في قراءة واحدة متدفقة (بدون تحميل الملف كاملاً)،
+ثم يُكتب كل ملف بشكل ذري (ملف مؤقت + os.replace). الملفات المطابقة للنسخة
+المحلية لا تُعاد كتابتها.
+
 الاستخدام:
     python restore_full_index.py
+    python restore_full_index.py "products/*.html" --rev HEAD~3
+    python restore_full_index.py index.html categories.html --no-chatbot --dry-run
 """
 
+import argparse
+import codecs
+import filecmp
+import fnmatch
+import os
+import re
 import subprocess
 import sys
-import os
+import tempfile
+import time
 
-def run_command(cmd):
-    """تنفيذ أمر وإرجاع النتيجة"""
-    result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-    return result.returncode == 0, result.stdout, result.stderr
+DEFAULT_REV = "origin/main"
+CHUNK_SIZE = 64 * 1024
 
-def main():
-    print("🚀 بدء عملية الاستعادة...\n")
-    
-    # 1. التأكد من وجود git
-    print("1️⃣ التحقق من Git...")
-    success, _, _ = run_command("git --version")
-    if not success:
-        print("❌ Git غير مثبت! يرجى تثبيته أولاً.")
-        sys.exit(1)
-    print("   ✅ Git موجود\n")
-    
-    # 2. جلب آخر التحديثات
-    print("2️⃣ جلب آخر التحديثات من الريبو...")
-    success, _, err = run_command("git fetch origin")
-    if not success:
-        print(f"   ⚠️ تحذير: {err}")
-    else:
-        print("   ✅ تم جلب التحديثات\n")
-    
-    # 3. استعادة الملف الأصلي من الكوميت القديم
-    print("3️⃣ استعادة index.html الأصلي (مع كل المنتجات)...")
-    # نستخدم أول كوميت كان فيه الملف كامل
-    success, _, err = run_command("git show origin/main:index.html > index_backup.html")
-    
-    if not success:
-        print(f"   ❌ فشل في استعادة الملف: {err}")
-        print("   💡 جرب يدوياً: git log --all --full-history -- index.html")
-        sys.exit(1)
-    
-    print("   ✅ تم استعادة النسخة الاحتياطية\n")
-    
-    # 4. قراءة الملف وإضافة الشات بوت
-    print("4️⃣ إضافة الشات بوت للملف...")
-    try:
-        with open('index_backup.html', 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # التحقق من وجود رابط CSS
-        if '<link rel="stylesheet" href="/chatbot.css">' not in content:
-            # إضافة في head
-            content = content.replace(
-                '</head>',
-                '<link rel="stylesheet" href="/chatbot.css">\n</head>'
-            )
-            print("   ✅ تم إضافة رابط chatbot.css")
-        
-        # التحقق من وجود كود HTML الشات بوت
-        chatbot_html = '''<!-- Chatbot Container -->
+CHATBOT_CSS = '<link rel="stylesheet" href="/chatbot.css">'
+CHATBOT_HTML = '''<!-- Chatbot Container -->
 <div id="chatbot-container">
     <button id="chatbot-toggle" aria-expanded="false" aria-controls="chatbot-window">
         <span>💬</span>
@@ -88,64 +57,348 @@ def main():
         </div>
     </div>
 </div>'''
-        
-        if 'chatbot-container' not in content:
-            # إضافة قبل </body>
-            content = content.replace('</body>', chatbot_html + '\n\n<script src="/chatbot.js"></script>\n</body>')
-            print("   ✅ تم إضافة كود الشات بوت HTML")
-        
-        # حفظ الملف الجديد
-        with open('index.html', 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print("   ✅ تم حفظ index.html المحدث\n")
-        
-    except Exception as e:
-        print(f"   ❌ خطأ في معالجة الملف: {e}")
+CHATBOT_SCRIPTS = '\n\n<script src="/assets/search.js"></script>\n<script src="/chatbot.js"></script>\n'
+PRODUCT_CARD = '<div class="product-card'
+
+_MARKERS = [CHATBOT_CSS, "</head>", "chatbot-container", "</body>", PRODUCT_CARD]
+_MARKER_RE = re.compile("|".join(re.escape(m) for m in _MARKERS))
+# آخر جزء من كل قطعة يبقى للقطعة التالية حتى لا تنقسم علامة بين قطعتين
+_CARRY = max(len(m) for m in _MARKERS) - 1
+
+
+def run_command(cmd):
+    """تنفيذ أمر (قائمة معاملات، بدون shell) وإرجاع النتيجة"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError as e:
+        return False, "", str(e)
+    return result.returncode == 0, result.stdout, result.stderr
+
+
+class ChatbotInjector:
+    """
+    إضافة الشات بوت لصفحة HTML أثناء قراءتها على أجزاء
+
+    رابط chatbot.css يُضاف قبل أول </head> إذا لم يظهر قبلها، وكود الشات بوت
+    والسكربتات قبل أول </body> إذا لم يظهر chatbot-container قبلها. أثناء
+    المرور تُعد بطاقات المنتجات والأسطر.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.has_css = False
+        self.has_chatbot = False
+        self.head_done = False
+        self.body_done = False
+        self.added_css = False
+        self.added_chatbot = False
+        self.product_cards = 0
+        self.lines = 0
+        self._carry = ""
+
+    def feed(self, text, final=False):
+        buf = self._carry + text
+        limit = len(buf) if final else max(len(buf) - _CARRY, 0)
+        out = []
+        pos = cut = 0
+        for match in _MARKER_RE.finditer(buf):
+            if match.start() >= limit:
+                break
+            marker = match.group()
+            if marker == PRODUCT_CARD:
+                self.product_cards += 1
+            elif marker == CHATBOT_CSS:
+                self.has_css = True
+            elif marker == "chatbot-container":
+                self.has_chatbot = True
+            elif marker == "</head>" and not self.head_done:
+                self.head_done = True
+                if self.enabled and not self.has_css:
+                    out.append(buf[pos:match.start()])
+                    out.append(CHATBOT_CSS + "\n")
+                    pos = match.start()
+                    self.added_css = True
+            elif marker == "</body>" and not self.body_done:
+                self.body_done = True
+                if self.enabled and not self.has_chatbot:
+                    out.append(buf[pos:match.start()])
+                    out.append(CHATBOT_HTML + CHATBOT_SCRIPTS)
+                    pos = match.start()
+                    self.added_chatbot = True
+            cut = match.end()
+        cut = max(cut, limit)
+        out.append(buf[pos:cut])
+        self._carry = buf[cut:]
+        consumed = buf[:cut]
+        self.lines += consumed.count("\n")
+        if final and consumed and not consumed.endswith("\n"):
+            self.lines += 1
+        return "".join(out)
+
+
+class GitBlobReader:
+    """عملية `git cat-file --batch` واحدة لقراءة كل الملفات"""
+
+    def __init__(self, cwd=None):
+        self.cwd = cwd
+        self.proc = None
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=self.cwd,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+    def chunks(self, rev, path):
+        """
+        أجزاء محتوى rev:path بالترتيب. يجب استهلاكها كاملة قبل طلب ملف آخر.
+        يرفع KeyError إذا لم يوجد الملف في تلك النسخة.
+        """
+        self.proc.stdin.write(f"{rev}:{path}\n".encode("utf-8"))
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().decode("utf-8", "replace").split()
+        if len(header) != 3 or header[1] != "blob":
+            raise KeyError(path)
+        return self._read_blob(int(header[2]))
+
+    def _read_blob(self, size):
+        remaining = size
+        while remaining:
+            chunk = self.proc.stdout.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise EOFError("git cat-file توقف قبل نهاية الملف")
+            remaining -= len(chunk)
+            yield chunk
+        self.proc.stdout.read(1)  # سطر جديد بعد كل ملف
+
+
+def list_files(rev, patterns, cwd=None):
+    """الملفات في rev المطابقة للمسارات أو الأنماط (بترتيب git)"""
+    ok, out, err = run_command(["git", "-C", cwd or ".", "ls-tree", "-r", "--name-only", "-z", rev])
+    if not ok:
+        raise RuntimeError(err.strip() or f"النسخة {rev} غير موجودة")
+    names = [n for n in out.split("\0") if n]
+    patterns = [p.replace(os.sep, "/") for p in patterns]
+    patterns = [p[2:] if p.startswith("./") else p for p in patterns]
+    return [n for n in names if any(n == p or fnmatch.fnmatchcase(n, p) for p in patterns)]
+
+
+def _write_blob(f, blob, injector, html):
+    """كتابة المحتوى: صفحات HTML تمر على الشات بوت، والباقي يُنسخ كما هو"""
+    size = 0
+    if not html:
+        for chunk in blob:
+            size += len(chunk)
+            f.write(chunk)
+        return size
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in blob:
+        size += len(chunk)
+        f.write(injector.feed(decoder.decode(chunk)).encode("utf-8"))
+    f.write(injector.feed(decoder.decode(b"", final=True), final=True).encode("utf-8"))
+    return size
+
+
+def restore_file(reader, rev, path, root=".", chatbot=True, dry_run=False):
+    """استعادة ملف واحد؛ يُرجع إحصائياته"""
+    html = path.endswith(".html")
+    injector = ChatbotInjector(chatbot and html)
+    target = os.path.join(root, path)
+    blob = reader.chunks(rev, path)
+    if dry_run:
+        directory = tempfile.gettempdir()
+    else:
+        directory = os.path.dirname(os.path.abspath(target))
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            size_in = _write_blob(f, blob, injector, html)
+        if os.path.exists(target) and filecmp.cmp(tmp_path, target, shallow=False):
+            status = "unchanged"
+        else:
+            status = "would restore" if dry_run else "restored"
+        size_out = os.path.getsize(tmp_path)
+        if status == "restored":
+            if os.path.exists(target):
+                os.chmod(tmp_path, os.stat(target).st_mode & 0o777)
+            else:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        else:
+            os.unlink(tmp_path)
+    except BaseException:
+        # باقي الملف يجب أن يُقرأ من git حتى لا يختلط بالملف التالي
+        for _ in blob:
+            pass
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return {
+        "path": path,
+        "status": status,
+        "bytes_in": size_in,
+        "bytes_out": size_out,
+        "lines": injector.lines,
+        "product_cards": injector.product_cards,
+        "added_css": injector.added_css,
+        "added_chatbot": injector.added_chatbot,
+    }
+
+
+def restore_paths(rev, patterns, root=".", chatbot=True, dry_run=False):
+    """استعادة كل الملفات المطابقة من rev عبر عملية git واحدة"""
+    files = list_files(rev, patterns, root)
+    results = []
+    with GitBlobReader(root) as reader:
+        for path in files:
+            try:
+                results.append(restore_file(reader, rev, path, root, chatbot, dry_run))
+            except (KeyError, UnicodeDecodeError, OSError) as e:
+                results.append({"path": path, "status": "failed", "error": f"{type(e).__name__}: {e}"})
+    return results
+
+
+def print_results(results, elapsed, verbose=True):
+    marks = {"restored": "✓", "would restore": "↺", "unchanged": "=", "failed": "✗"}
+    for r in results:
+        if r["status"] == "failed":
+            print(f"   ✗ {r['path']}: {r['error']}")
+            continue
+        if not verbose and r["status"] == "unchanged":
+            continue
+        added = [name for name, flag in (("css", r["added_css"]), ("chatbot", r["added_chatbot"])) if flag]
+        details = [f"{r['bytes_out'] / 1024:.1f} KB"]
+        if r["lines"]:
+            details.append(f"{r['lines']} سطر")
+        if r["product_cards"]:
+            details.append(f"{r['product_cards']} منتج")
+        print(f"   {marks[r['status']]} {r['path']}: {'، '.join(details)}"
+              + (f" (+{'+'.join(added)})" if added else ""))
+    counts = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    total = sum(r.get("bytes_out", 0) for r in results)
+    summary = "، ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"\n📊 {len(results)} ملف ({summary})، {total / 1024 / 1024:.2f} MB في {elapsed:.2f} ثانية")
+
+
+def fetch(rev):
+    """جلب آخر التحديثات إذا كانت النسخة على remote"""
+    if "/" not in rev:
+        return
+    success, _, err = run_command(["git", "fetch", rev.split("/", 1)[0]])
+    if not success:
+        print(f"   ⚠️ تحذير: {err.strip()}")
+    else:
+        print("   ✅ تم جلب التحديثات\n")
+
+
+def bulk_main(args):
+    print(f"🚀 استعادة {', '.join(args.paths)} من {args.rev}...\n")
+    if not args.no_fetch:
+        fetch(args.rev)
+    start = time.perf_counter()
+    try:
+        results = restore_paths(args.rev, args.paths, chatbot=not args.no_chatbot, dry_run=args.dry_run)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not results:
+        print("⚠️ لا توجد ملفات مطابقة في هذه النسخة")
         sys.exit(1)
-    
-    # 5. عرض الإحصائيات
+    print_results(results, time.perf_counter() - start, verbose=len(results) <= 50 or args.verbose)
+    if any(r["status"] == "failed" for r in results):
+        sys.exit(1)
+
+
+def main():
+    print("🚀 بدء عملية الاستعادة...\n")
+
+    # 1. التأكد من وجود git
+    print("1️⃣ التحقق من Git...")
+    success, _, _ = run_command(["git", "--version"])
+    if not success:
+        print("❌ Git غير مثبت! يرجى تثبيته أولاً.")
+        sys.exit(1)
+    print("   ✅ Git موجود\n")
+
+    # 2. جلب آخر التحديثات
+    print("2️⃣ جلب آخر التحديثات من الريبو...")
+    fetch(DEFAULT_REV)
+
+    # 3. استعادة الملف الأصلي وإضافة الشات بوت في نفس الخطوة
+    print("3️⃣ استعادة index.html الأصلي (مع كل المنتجات) وإضافة الشات بوت...")
+    try:
+        results = restore_paths(DEFAULT_REV, ["index.html"])
+    except RuntimeError as e:
+        results = [{"status": "failed", "error": str(e)}]
+    if not results or results[0]["status"] == "failed":
+        print(f"   ❌ فشل في استعادة الملف: {results[0]['error'] if results else 'index.html غير موجود'}")
+        print("   💡 جرب يدوياً: git log --all --full-history -- index.html")
+        sys.exit(1)
+    result = results[0]
+    if result["added_css"]:
+        print("   ✅ تم إضافة رابط chatbot.css")
+    if result["added_chatbot"]:
+        print("   ✅ تم إضافة كود الشات بوت HTML")
+    print("   ✅ تم حفظ index.html المحدث\n")
+
+    # 4. عرض الإحصائيات
     print("📊 الإحصائيات:")
-    print(f"   📄 حجم الملف: {os.path.getsize('index.html') / 1024:.2f} KB")
-    
-    with open('index.html', 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        product_count = sum(1 for line in lines if 'product-card' in line and '<div class="product-card' in line)
-    
-    print(f"   🛍️ عدد المنتجات: {product_count}")
-    print(f"   📝 عدد الأسطر: {len(lines)}")
-    
-    # 6. رفع على Git
-    print("\n5️⃣ رفع التعديلات...")
+    print(f"   📄 حجم الملف: {result['bytes_out'] / 1024:.2f} KB")
+    print(f"   🛍️ عدد المنتجات: {result['product_cards']}")
+    print(f"   📝 عدد الأسطر: {result['lines']}")
+
+    # 5. رفع على Git
+    print("\n4️⃣ رفع التعديلات...")
     response = input("   هل تريد رفع الملف على GitHub؟ (y/n): ")
-    
+
     if response.lower() == 'y':
-        run_command("git add index.html")
-        run_command('git commit -m "استعادة كل المنتجات + دمج الشات بوت المطور"')
-        success, out, err = run_command("git push origin main")
-        
+        run_command(["git", "add", "index.html"])
+        run_command(["git", "commit", "-m", "استعادة كل المنتجات + دمج الشات بوت المطور"])
+        success, out, err = run_command(["git", "push", "origin", "main"])
+
         if success:
             print("   ✅ تم الرفع بنجاح!\n")
         else:
             print(f"   ❌ فشل الرفع: {err}\n")
     else:
         print("   ⏭️ تم تخطي الرفع\n")
-    
+
     print("\n" + "="*50)
     print("✨ انتهت العملية بنجاح!")
     print("="*50)
     print("\n📌 الملفات الناتجة:")
     print("   • index.html (محدث مع الشات بوت)")
-    print("   • index_backup.html (نسخة احتياطية)")
     print("\n🌐 اختبر الموقع: https://iraq-ninja-store.arabsad.com/")
     print("💬 جرب الشات بوت: اكتب 'فشار' أو 'قطاعة' أو 'A.001147'\n")
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="استعادة ملفات الموقع من git مع إضافة الشات بوت")
+    parser.add_argument("paths", nargs="*", help='مسارات أو أنماط مثل "products/*.html" (بدونها: index.html فقط)')
+    parser.add_argument("--rev", default=DEFAULT_REV, help=f"النسخة التي تُستعاد منها (افتراضي {DEFAULT_REV})")
+    parser.add_argument("--no-chatbot", action="store_true", help="استعادة الملفات كما هي بدون إضافة الشات بوت")
+    parser.add_argument("--no-fetch", action="store_true", help="عدم تشغيل git fetch قبل الاستعادة")
+    parser.add_argument("--dry-run", action="store_true", help="عرض ما سيتغير بدون كتابة")
+    parser.add_argument("--verbose", "-v", action="store_true", help="عرض كل ملف حتى غير المتغير")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     try:
-        main()
+        args = parse_args()
+        if args.paths:
+            bulk_main(args)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n⚠️ تم إيقاف السكريبت بواسطة المستخدم")
         sys.exit(0)
     except Exception as e:
         print(f"\n❌ خطأ غير متوقع: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
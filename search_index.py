@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+بناء فهرس البحث للموقع والشات بوت من products.json
+Prebuilt Arabic search index for the search box and chatbot
+
+يبني فهرساً معكوساً (كلمة ← المنتجات) على العنوان والوصف و SKU والفئة بعد
+توحيد الكتابة العربية (أشكال الألف والهمزة، التاء المربوطة، التطويل، التشكيل
+والأحرف غير المرئية). الفهرس يُكتب في data/search/ كملفات JSON صغيرة مقسّمة
+حسب أول حرف من الكلمة، فيحمّل المتصفح فقط الجزء الذي يحتاجه عند كل بحث
+(assets/search.js).
+
+يجب أن تبقى قواعد التوحيد هنا مطابقة لـ normalize/tokenize في assets/search.js.
+
+الاستخدام / Usage:
+    python search_index.py
+    python search_index.py --out dist/data/search
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from build_site import format_price
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+
+SEARCH_DIR = "data/search"
+INDEX_VERSION = 1
+DOCS_PER_SHARD = 64
+# الملفات التي يكتبها هذا السكربت؛ غيرها في مجلد الإخراج لا يُلمس
+INDEX_FILE_RE = re.compile(r"(?:t-[0-9a-f]{4,}|d-\d+|meta)\.json")
+
+# وزن كل حقل في ترتيب النتائج
+FIELD_WEIGHTS = {"sku": 8, "title": 4, "category": 2, "description": 1}
+
+_INVISIBLE = re.compile("[\u0640\u200b-\u200f\u202a-\u202e\u2060\ufeff]")  # تطويل + أحرف بعرض صفري
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed]")
+_LETTERS = str.maketrans("أإآٱىةؤئ٠١٢٣٤٥٦٧٨٩", "اااايهوي0123456789")
+_SKU_DOT = re.compile(r"([a-z])\.(?=\d)")  # A.000161 → a000161
+_TOKEN = re.compile("[0-9a-z\u0621-\u064a]+")
+ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+# مكتوبة بعد التوحيد (على ← علي، إلى ← الي)
+STOPWORDS = {
+    "من", "في", "علي", "مع", "عن", "الي", "او", "ام", "هل", "ما", "ماذا", "كم", "هذا", "هذه",
+    "ذلك", "تلك", "كل", "عند", "بين", "اي", "ان", "لا", "يا", "لو", "قد", "هو", "هي", "ثم",
+}
+
+
+def normalize(text):
+    """توحيد الكتابة العربية والحروف اللاتينية قبل التقطيع"""
+    text = _INVISIBLE.sub("", text)
+    text = _DIACRITICS.sub("", text)
+    text = text.translate(_LETTERS).lower()
+    return _SKU_DOT.sub(r"\1", text)
+
+
+def stem(token):
+    """حذف أداة التعريف (وما يسبقها) إذا بقي بعدها 3 أحرف على الأقل"""
+    for prefix in ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text):
+    tokens = []
+    for token in _TOKEN.findall(normalize(text)):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        tokens.append(stem(token))
+    return tokens
+
+
+def shard_key(token):
+    """اسم ملف الجزء: رمز أول حرف بالست عشري (أسماء ملفات ASCII فقط)"""
+    return f"{ord(token[0]):04x}"
+
+
+def product_fields(product):
+    sku = product.sku
+    return {
+        "sku": f"{sku} {sku.split('.')[-1]}",
+        "title": product.title,
+        "category": product.category.replace(">", " "),
+        "description": product.description or "",
+    }
+
+
+def build_index(products):
+    """إرجاع (المستندات، الفهرس) حيث الفهرس: كلمة ← {رقم المنتج: الوزن}"""
+    docs = []
+    index = {}
+    for doc_id, product in enumerate(products):
+        docs.append([
+            product.title,
+            f"products/{product.slug}.html",
+            format_price(product.price),
+            product.sku,
+            product.category,
+        ])
+        for field, text in product_fields(product).items():
+            weight = FIELD_WEIGHTS[field]
+            for token in set(tokenize(text)):
+                postings = index.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) + weight
+    return docs, index
+
+
+def shard_index(index):
+    """تقسيم الفهرس حسب أول حرف؛ كل قائمة مضغوطة كـ [منتج، وزن، منتج، وزن، ...]"""
+    shards = {}
+    for token in sorted(index):
+        postings = sorted(index[token].items(), key=lambda item: (-item[1], item[0]))
+        shards.setdefault(shard_key(token), {})[token] = [n for pair in postings for n in pair]
+    return shards
+
+
+def dump(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return os.path.getsize(path)
+
+
+def write_index(out_dir=SEARCH_DIR, products_path=PRODUCTS_JSON_PATH):
+    start = time.perf_counter()
+    docs, index = build_index(load_catalog(products_path))
+    shards = shard_index(index)
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    total = 0
+    written = set()
+    for key, shard in shards.items():
+        written.add(f"t-{key}.json")
+        total += dump(os.path.join(out_dir, f"t-{key}.json"), shard)
+    doc_shards = (len(docs) + DOCS_PER_SHARD - 1) // DOCS_PER_SHARD
+    for n in range(doc_shards):
+        written.add(f"d-{n}.json")
+        total += dump(os.path.join(out_dir, f"d-{n}.json"), docs[n * DOCS_PER_SHARD:(n + 1) * DOCS_PER_SHARD])
+    written.add("meta.json")
+    total += dump(os.path.join(out_dir, "meta.json"), {
+        "version": INDEX_VERSION,
+        "docs": len(docs),
+        "docs_per_shard": DOCS_PER_SHARD,
+        "shards": sorted(shards),
+    })
+    # حذف أجزاء الفهرس القديمة فقط (لم تعد موجودة بعد تغيّر الكتالوج)
+    for name in os.listdir(out_dir):
+        if name not in written and INDEX_FILE_RE.fullmatch(name):
+            os.remove(os.path.join(out_dir, name))
+
+    elapsed = time.perf_counter() - start
+    largest = max((os.path.getsize(os.path.join(out_dir, f"t-{k}.json")) for k in shards), default=0)
+    print(f"✓ فهرس البحث: {len(docs)} منتج، {len(index)} كلمة، {len(shards)} جزء للكلمات + "
+          f"{doc_shards} جزء للمنتجات ({total / 1024:.1f} KB، أكبر جزء {largest / 1024:.1f} KB) "
+          f"في {elapsed:.2f} ثانية → {out_dir}")
+    return len(index)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="بناء فهرس البحث من products.json")
+    parser.add_argument("--out", default=SEARCH_DIR, help=f"مجلد الإخراج (افتراضي: {SEARCH_DIR})")
+    parser.add_argument("--products", default=PRODUCTS_JSON_PATH, help="مسار products.json")
+    args = parser.parse_args(argv)
+    write_index(args.out, args.products)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,57 +6,964 @@ Local web server for Iraq Ninja Store
 
 الاستخدام / Usage:
     python serve.py
-    
+    python serve.py --port 8080 --bind 0.0.0.0 --workers 32 --headless
+    python serve.py --single          # السيرفر القديم (اتصال واحد في كل مرة)
+    python serve.py --enable-profiler # تفعيل /__profile
+
 سيفتح السيرفر على: http://localhost:8000
 The server will open at: http://localhost:8000
 """
 
+import argparse
+import bisect
+import cProfile
+import email.utils
+import gzip
 import http.server
+import io
+import json
+import posixpath
+import pstats
+import re
 import socketserver
+import threading
+import time
 import webbrowser
 import os
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, quote, unquote
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
+try:
+    import brotli  # اختياري: pip install brotli
+except ImportError:
+    brotli = None
+
 PORT = 8000
+BIND = ""
+DEFAULT_WORKERS = 16
+# مدة انتظار الطلب التالي على نفس الاتصال (keep-alive) قبل إغلاقه
+KEEPALIVE_TIMEOUT = 15
+# الحد الأقصى لذاكرة كاش الردود المضغوطة (بالميجابايت)
+DEFAULT_CACHE_MB = 64
+# كل كم ثانية نفحص المجلدات لتحديث جدول المسارات
+ROUTE_REFRESH_INTERVAL = 2.0
+NOT_FOUND_PAGE = "404.html"
+# تحويلات 301 الدائمة (مسار قديم ← مسار جديد) يولّدها dedupe_products.py
+REDIRECTS_FILE = "redirects.json"
+# حجم القطعة عند النسخ العادي (بدون sendfile)
+COPY_BUFSIZE = 64 * 1024
+INDEX_PAGE = "index.html"
+
+# مسارات داخلية للسيرفر (لا تُسجّل في الإحصائيات)
+INTERNAL_PREFIX = "/__"
+STATS_PATH = "/__stats"
+PROFILE_PATH = "/__profile"
+# حدود الـ histogram لزمن الرد (ms)؛ ما بعد آخر حد يُحسب في +Inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# أقصى عدد مسارات تُتابع منفصلة؛ الباقي يُجمع تحت OTHER_PATHS
+MAX_STATS_PATHS = 2000
+OTHER_PATHS = "(other)"
+STATS_TOP = 20
+PROFILE_DIR = ".profiles"
+DEFAULT_PROFILE_SECONDS = 10
+MAX_PROFILE_SECONDS = 300
+
+# نوع المحتوى حسب الامتداد؛ ما لم يُذكر هنا يُترك لمكتبة mimetypes
+MIME_TYPES = {
+    ".html": "text/html",
+    ".htm": "text/html",
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".json": "application/json",
+    ".xml": "application/xml",
+    ".txt": "text/plain",
+    ".csv": "text/csv",
+    ".md": "text/markdown",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".ico": "image/x-icon",
+}
+
+# أنواع نصية غير text/* تحتاج charset=utf-8
+TEXT_LIKE_TYPES = {"application/javascript", "application/json", "application/xml", "image/svg+xml"}
+
+DAY = 24 * 3600
+MONTH = 30 * DAY
+YEAR = 365 * DAY
+
+# ExpiresByType من .htaccess (بالثواني)
+EXPIRES_BY_TYPE = {
+    "image/jpeg": YEAR,
+    "image/gif": YEAR,
+    "image/png": YEAR,
+    "image/webp": YEAR,
+    "text/css": MONTH,
+    "application/javascript": MONTH,
+    "text/html": DAY,
+}
+
+# الملفات التي في اسمها hash للمحتوى (assets/site.<hash>.css) لا تتغير أبداً:
+# تُخزّن سنة كاملة كما في قسم FilesMatch في .htaccess
+HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{10}\.(css|js)$")
+
+# نفس Security Headers في .htaccess
+SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "SAMEORIGIN"),
+    ("X-XSS-Protection", "1; mode=block"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+)
+
+# نفس الأنواع التي يضغطها mod_deflate في .htaccess
+COMPRESSIBLE_TYPES = {
+    "text/html", "text/plain", "text/xml", "text/css", "text/javascript",
+    "application/javascript", "application/json", "application/xml",
+}
+
+
+def _compress_gzip(data):
+    # mtime=0 حتى يكون الناتج ثابتاً لنفس المحتوى
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _compress_brotli(data):
+    return brotli.compress(data, quality=5)
+
+
+# الترتيب = الأفضلية عند تساوي q في Accept-Encoding
+ENCODERS = OrderedDict()
+if brotli is not None:
+    ENCODERS["br"] = _compress_brotli
+ENCODERS["gzip"] = _compress_gzip
+
+
+def negotiate_encoding(accept_encoding, available=ENCODERS):
+    """اختيار أفضل ترميز يقبله العميل من Accept-Encoding (أو None)"""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class ResponseCache:
+    """
+    كاش LRU للردود المضغوطة في الذاكرة
+
+    كل ملف يُضغط مرة واحدة لكل ترميز، ويُعاد ضغطه فقط إذا تغيّر mtime أو
+    الحجم. عند تجاوز max_bytes تُحذف أقدم المدخلات استخداماً.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, encoding, st):
+        """إرجاع الجسم المضغوط للملف path، مع ضغطه عند الحاجة"""
+        key = (path, encoding)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # الضغط خارج القفل حتى لا يوقف باقي الطلبات
+        with open(path, "rb") as f:
+            body = ENCODERS[encoding](f.read())
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[1])
+            if len(body) <= self.max_bytes:
+                self._entries[key] = (stamp, body)
+                self.size += len(body)
+                while self.size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        return body
+
+
+def _percentile(histogram, fraction):
+    """الحد الأعلى للـ bucket الذي يقع فيه الطلب رقم fraction من الإجمالي"""
+    total = sum(histogram)
+    if not total:
+        return None
+    target, seen = total * fraction, 0
+    for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), histogram):
+        seen += count
+        if seen >= target:
+            return bound
+    return "+Inf"
+
+
+class RequestStats:
+    """
+    إحصائيات الطلبات في الذاكرة (تُعرض على /__stats)
+
+    لكل مسار: عدد الطلبات والبايتات ومجموع وأقصى زمن الرد؛ وللسيرفر كله:
+    أكواد الحالة و histogram لزمن الرد. كل طلب = قفل واحد وبضع عمليات على
+    قاموس، فالتكلفة لا تُذكر مقارنة بقراءة الملف وإرساله.
+    """
+
+    def __init__(self, max_paths=MAX_STATS_PATHS):
+        self.max_paths = max_paths
+        self.started = time.time()
+        self.requests = 0
+        self.bytes = 0
+        self.statuses = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        # المسار ← [الطلبات، البايتات، مجموع الزمن، أقصى زمن]
+        self.paths = {}
+        self._lock = threading.Lock()
+
+    def record(self, path, status, nbytes, seconds):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.requests += 1
+            self.bytes += nbytes
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.histogram[bucket] += 1
+            entry = self.paths.get(path)
+            if entry is None:
+                if len(self.paths) >= self.max_paths:
+                    path = OTHER_PATHS
+                entry = self.paths.get(path)
+                if entry is None:
+                    entry = self.paths[path] = [0, 0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += nbytes
+            entry[2] += seconds
+            if seconds > entry[3]:
+                entry[3] = seconds
+
+    def snapshot(self, cache=None, top=STATS_TOP):
+        with self._lock:
+            requests, nbytes = self.requests, self.bytes
+            statuses = dict(self.statuses)
+            histogram = list(self.histogram)
+            paths = {path: list(entry) for path, entry in self.paths.items()}
+        uptime = time.time() - self.started
+
+        def path_row(item):
+            path, (count, path_bytes, total, worst) = item
+            return {"path": path, "requests": count, "bytes": path_bytes,
+                    "mean_ms": round(total / count * 1000, 3), "max_ms": round(worst * 1000, 3)}
+
+        data = {
+            "uptime_seconds": round(uptime, 1),
+            "requests": requests,
+            "requests_per_second": round(requests / uptime, 2) if uptime else 0,
+            "bytes_out": nbytes,
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+            "not_modified_ratio": round(statuses.get(304, 0) / requests, 4) if requests else 0,
+            "latency_ms": {
+                "buckets": [{"le": bound, "count": count}
+                            for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), histogram)],
+                "p50": _percentile(histogram, 0.5),
+                "p90": _percentile(histogram, 0.9),
+                "p99": _percentile(histogram, 0.99),
+            },
+            "top_paths": [path_row(item) for item in
+                          sorted(paths.items(), key=lambda item: item[1][0], reverse=True)[:top]],
+            "slowest_paths": [path_row(item) for item in
+                              sorted(paths.items(), key=lambda item: item[1][2] / item[1][0], reverse=True)[:top]],
+            "tracked_paths": len(paths),
+        }
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            data["compression_cache"] = {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_ratio": round(cache.hits / lookups, 4) if lookups else 0,
+                "entries": len(cache._entries),
+                "bytes": cache.size,
+                "max_bytes": cache.max_bytes,
+            }
+        return data
+
+
+class RequestProfiler:
+    """
+    cProfile لفترة زمنية محددة (يُفعّل بـ --enable-profiler ثم /__profile?seconds=N)
+
+    cProfile يقيس الـ thread الذي فعّله فقط، لذلك كل طلب خلال الفترة يُقاس
+    بـ Profile خاص به، وعند انتهائها تُدمج كلها في ملف .prof واحد في
+    .profiles/ (يُفتح بـ python -m pstats). خارج الفترة التكلفة مقارنة واحدة.
+    """
+
+    def __init__(self, enabled=False, out_dir=PROFILE_DIR):
+        self.enabled = enabled
+        self.out_dir = out_dir
+        self.until = 0.0
+        self.last = None
+        self._profiles = []
+        self._lock = threading.Lock()
+        # كل فترة لها رقم: مؤقت فترة سابقة لا يُنهي فترة جديدة
+        self._generation = 0
+        self._timer = None
+
+    @property
+    def active(self):
+        return bool(self.until)
+
+    def start(self, seconds):
+        """بدء فترة قياس؛ False إذا كانت هناك فترة جارية"""
+        with self._lock:
+            if self.until:
+                return False
+            self._profiles = []
+            self.until = time.monotonic() + seconds
+            self._generation += 1
+            self._cancel_timer()
+            self._timer = threading.Timer(seconds, self.stop, args=(self._generation,))
+            self._timer.daemon = True
+            self._timer.start()
+        return True
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def cancel(self):
+        """إلغاء مؤقت الفترة الجارية بدون حفظ (عند إغلاق السيرفر)"""
+        with self._lock:
+            self._cancel_timer()
+
+    def begin(self):
+        if not self.until or time.monotonic() > self.until:
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def end(self, profile):
+        profile.disable()
+        with self._lock:
+            if self.until:
+                self._profiles.append(profile)
+
+    def stop(self, generation=None):
+        """
+        دمج قياسات الفترة وحفظها؛ يُرجع ملخص آخر قياس. generation يمرره المؤقت:
+        إذا انتهت فترته مسبقاً (?stop=1) أو بدأت فترة أحدث لا يفعل شيئاً
+        """
+        with self._lock:
+            if generation is not None and (generation != self._generation or not self.until):
+                return self.last
+            self._cancel_timer()
+            profiles, self._profiles, self.until = self._profiles, [], 0.0
+        summary = {"file": None, "requests": len(profiles), "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "top": []}
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, f"serve-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+            stats.dump_stats(path)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:STATS_TOP]
+            summary["file"] = path
+            summary["top"] = [{"function": f"{file}:{line}({name})", "calls": calls,
+                               "tottime_ms": round(tottime * 1000, 3), "cumtime_ms": round(cumtime * 1000, 3)}
+                              for (file, line, name), (_, calls, tottime, cumtime, _) in rows]
+            print(f"📊 profile: {len(profiles)} طلب → {path}")
+        self.last = summary
+        return summary
+
+
+class RouteTable:
+    """
+    جدول المسارات: مسار URL ← ملف على القرص
+
+    يُبنى مرة واحدة عند التشغيل بنفس قواعد .htaccess:
+    - /products/slug و /products/slug.html يشيران لنفس الملف
+    - /dir/ يخدم dir/index.html و /dir يُحوّل إلى /dir/
+    - الملفات والمجلدات المخفية (.git, .htaccess) غير متاحة
+    - المسارات في redirects.json تُحوّل 301 لمساراتها الجديدة (مثل .htaccess)
+
+    يُعاد بناؤه تلقائياً عند إضافة أو حذف ملفات (بفحص mtime المجلدات).
+    """
+
+    def __init__(self, root, refresh_interval=ROUTE_REFRESH_INTERVAL):
+        self.root = os.path.abspath(root)
+        self.refresh_interval = refresh_interval
+        self.files = {}
+        self.redirects = {}
+        self.not_found = None
+        self._dir_stamps = {}
+        self._watcher = None
+        self._stopped = threading.Event()
+        self.rebuild()
+
+    def _scan(self):
+        files, redirects, stamps = {}, {}, {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".") and d != "__pycache__"]
+            stamps[dirpath] = os.stat(dirpath).st_mtime_ns
+            rel = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            prefix = "/" if rel == "." else f"/{rel}/"
+            for name in filenames:
+                if name.startswith("."):
+                    continue
+                full = os.path.join(dirpath, name)
+                files[prefix + name] = full
+                if name == INDEX_PAGE:
+                    files[prefix] = full
+                    if prefix != "/":
+                        redirects[prefix[:-1]] = prefix
+            for name in filenames:
+                stem, ext = os.path.splitext(name)
+                # RewriteCond %{REQUEST_FILENAME} !-d : المجلد له الأولوية
+                if ext == ".html" and not name.startswith(".") and stem not in dirnames:
+                    files.setdefault(prefix + stem, os.path.join(dirpath, name))
+        for old, new in self._load_redirect_map().items():
+            redirects.setdefault(old, new)
+            if old.endswith(".html"):
+                redirects.setdefault(old[:-len(".html")], new)
+        return files, redirects, stamps
+
+    def _load_redirect_map(self):
+        try:
+            with open(os.path.join(self.root, REDIRECTS_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def rebuild(self):
+        files, redirects, stamps = self._scan()
+        # استبدال القواميس دفعة واحدة حتى لا ترى الطلبات جدولاً نصف مبني
+        self.files, self.redirects, self._dir_stamps = files, redirects, stamps
+        self.not_found = files.get("/" + NOT_FOUND_PAGE)
+
+    def changed(self):
+        """هل أُضيف أو حُذف أي ملف منذ آخر بناء؟"""
+        for dirpath, stamp in self._dir_stamps.items():
+            try:
+                if os.stat(dirpath).st_mtime_ns != stamp:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def watch(self):
+        """تشغيل thread في الخلفية يعيد بناء الجدول عند تغيّر الملفات"""
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while not self._stopped.wait(self.refresh_interval):
+                if self.changed():
+                    self.rebuild()
+
+        self._stopped.clear()
+        self._watcher = threading.Thread(target=loop, name="route-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """إيقاف thread المراقبة (إن كان يعمل) وانتظار انتهائه"""
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self._stopped.set()
+            watcher.join()
+
+    def resolve(self, url):
+        """إرجاع (الملف، التحويل) لمسار الطلب؛ كلاهما None إذا لم يوجد"""
+        path = unquote(url.split("?", 1)[0].split("#", 1)[0])
+        target = self.files.get(path)
+        if target is not None:
+            return target, None
+        redirect = self.redirects.get(path)
+        if redirect is not None:
+            query = url[len(url.split("?", 1)[0]):]
+            return None, redirect + query
+        return None, None
+
+
+class FileSlice:
+    """جزء من ملف مفتوح يُرسل بـ sendfile مباشرة من الكيرنل إلى الـ socket"""
+
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.offset = offset
+        self.length = length
+
+    def close(self):
+        self.file.close()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    تحليل Range: bytes=... وإرجاع (start, end) شاملة
+
+    يُرجع None إذا كان الرأس غير مفهوم أو يطلب عدة أجزاء (عندها يُرسل الملف كاملاً
+    كما تسمح RFC 9110)، ويرفع RangeNotSatisfiable إذا كان الجزء خارج الملف.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # bytes=-N : آخر N بايت
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def content_type_header(ctype):
+    """إضافة charset=utf-8 للأنواع النصية فقط"""
+    if ctype.startswith("text/") or ctype in TEXT_LIKE_TYPES:
+        return f"{ctype}; charset=utf-8"
+    return ctype
+
+
+def make_etag(st, encoding=None):
+    """ETag قوي من mtime والحجم، مختلف لكل ترميز (gzip/br) للملف نفسه"""
+    tag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    if encoding:
+        tag += f"-{encoding}"
+    return f'"{tag}"'
+
+
+def etag_matches(header, etag):
+    """مقارنة If-None-Match (مقارنة ضعيفة كما تنص RFC 9110)"""
+    if header.strip() == "*":
+        return True
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
 
 class ArabicHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """
     HTTP Request Handler with proper UTF-8 encoding for Arabic content
     """
-    
+
+    # HTTP/1.1 يبقي الاتصال مفتوحاً بين الطلبات (keep-alive)
+    protocol_version = "HTTP/1.1"
+    timeout = KEEPALIVE_TIMEOUT
+    # بدون هذا تتأخر الردود على نفس الاتصال ~40ms بسبب Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    # حالة الطلب الحالي للإحصائيات (تُصفّر في parse_request)
+    _started = None
+    _status = None
+    _bytes_out = 0
+    _profile = None
+
+    def parse_request(self):
+        self._started = time.perf_counter()
+        self._status = None
+        self._bytes_out = 0
+        self._profile = self.server.profiler.begin()
+        return super().parse_request()
+
+    def handle_one_request(self):
+        # الزمن يبدأ بعد وصول سطر الطلب، فانتظار keep-alive لا يُحسب
+        self._started = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self._started is not None:
+                self._record_request()
+
+    def _record_request(self):
+        elapsed = time.perf_counter() - self._started
+        if self._profile is not None:
+            self.server.profiler.end(self._profile)
+            self._profile = None
+        path = getattr(self, "path", "").split("?", 1)[0]
+        if self._status is None or path.startswith(INTERNAL_PREFIX):
+            return
+        nbytes = 0 if self.command == "HEAD" else self._bytes_out
+        self.server.stats.record(unquote(path), self._status, nbytes, elapsed)
+
+    def send_response(self, code, message=None):
+        self._status = int(code)
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword == "Content-Length":
+            self._bytes_out = int(value)
+        super().send_header(keyword, value)
+
+    def guess_type(self, path):
+        ext = posixpath.splitext(path)[1].lower()
+        return MIME_TYPES.get(ext) or super().guess_type(path)
+
+    def send_head(self):
+        """
+        إرسال رؤوس الرد للملف المطلوب وإرجاع كائن يُقرأ منه الجسم
+
+        - نوع المحتوى الصحيح حسب الامتداد
+        - ETag و Last-Modified ورد 304 للطلبات الشرطية
+        - Cache-Control / Expires حسب .htaccess
+        - الملفات النصية مضغوطة من الكاش إذا كان العميل يقبل ذلك
+        """
+        if self.path.startswith(INTERNAL_PREFIX):
+            return self._send_internal()
+        path, redirect = self.server.routes.resolve(self.path)
+        if redirect is not None:
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", quote(redirect, safe="/?=&#%"))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        ctype = self.guess_type(path)
+        compressible = ctype in COMPRESSIBLE_TYPES
+        try:
+            byte_range = self._requested_range(st)
+            unsatisfiable = False
+        except RangeNotSatisfiable:
+            byte_range, unsatisfiable = None, True
+        # الأجزاء (Range) تُخدم دائماً من الملف غير المضغوط
+        encoding = None
+        if compressible and byte_range is None and not unsatisfiable:
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+        etag = make_etag(st, encoding)
+
+        if self._not_modified(etag, st):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self._send_validators(ctype, etag, st, compressible)
+            self.end_headers()
+            return None
+
+        if unsatisfiable:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{st.st_size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+
+        try:
+            if encoding:
+                body = self.server.response_cache.get(path, encoding, st)
+                f, length = io.BytesIO(body), len(body)
+            else:
+                start, end = byte_range or (0, st.st_size - 1)
+                length = end - start + 1
+                f = FileSlice(open(path, "rb"), start, length)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        if byte_range:
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{st.st_size}")
+        else:
+            self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type_header(ctype))
+        self.send_header("Content-Length", str(length))
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Accept-Ranges", "bytes")
+        self._send_validators(ctype, etag, st, compressible)
+        self.end_headers()
+        return f
+
+    def _send_internal(self):
+        """/__stats و /__profile: JSON بدون كاش"""
+        path, _, query = self.path.partition("?")
+        if path == STATS_PATH:
+            return self._send_json(self.server.stats.snapshot(self.server.response_cache))
+        if path == PROFILE_PATH and self.server.profiler.enabled:
+            profiler = self.server.profiler
+            params = parse_qs(query)
+            status = HTTPStatus.OK
+            if "seconds" in params:
+                try:
+                    seconds = min(float(params["seconds"][0]), MAX_PROFILE_SECONDS)
+                except ValueError:
+                    seconds = DEFAULT_PROFILE_SECONDS
+                status = HTTPStatus.ACCEPTED if profiler.start(seconds) else HTTPStatus.CONFLICT
+            elif "stop" in params and profiler.active:
+                profiler.stop()
+            remaining = max(profiler.until - time.monotonic(), 0) if profiler.active else 0
+            return self._send_json({"active": profiler.active, "remaining_seconds": round(remaining, 1),
+                                    "last": profiler.last}, status)
+        self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+        return None
+
+    def _send_json(self, data, status=HTTPStatus.OK):
+        body = json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type_header("application/json"))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def _requested_range(self, st):
+        """
+        الجزء المطلوب (start, end) إذا كان يجب احترام Range، وإلا None
+
+        Range يُتجاهل إذا لم يطابق If-Range النسخة الحالية من الملف.
+        """
+        header = self.headers.get("Range")
+        if not header:
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range:
+            if_range = if_range.strip()
+            if if_range.startswith(('"', "W/")):
+                # If-Range يتطلب مقارنة قوية؛ الـ ETag الضعيف لا يطابق أبداً
+                if if_range != make_etag(st):
+                    return None
+            elif if_range != self.date_time_string(st.st_mtime):
+                return None
+        return parse_range(header, st.st_size)
+
+    def copyfile(self, source, outputfile):
+        if not isinstance(source, FileSlice):
+            return super().copyfile(source, outputfile)
+        if not source.length:
+            return
+        if self.server.use_sendfile:
+            # socket.sendfile يستخدم os.sendfile (zero-copy) حيث يتوفر
+            self.connection.sendfile(source.file, source.offset, source.length)
+            return
+        source.file.seek(source.offset)
+        remaining = source.length
+        while remaining:
+            chunk = source.file.read(min(COPY_BUFSIZE, remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            remaining -= len(chunk)
+
+    def _not_modified(self, etag, st):
+        """هل النسخة الموجودة عند المتصفح ما زالت صالحة؟"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            # If-None-Match له الأولوية على If-Modified-Since
+            return etag_matches(if_none_match, etag)
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(st.st_mtime) <= since.timestamp()
+        return False
+
+    def _send_validators(self, ctype, etag, st, compressible):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+        if compressible:
+            self.send_header("Vary", "Accept-Encoding")
+        if HASHED_ASSET_RE.search(self.path.split("?", 1)[0]):
+            max_age, immutable = YEAR, ", immutable"
+        else:
+            max_age, immutable = EXPIRES_BY_TYPE.get(ctype), ""
+        if max_age:
+            self.send_header("Cache-Control", f"public, max-age={max_age}{immutable}")
+            self.send_header("Expires", self.date_time_string(time.time() + max_age))
+
+    def send_error(self, code, message=None, explain=None):
+        """صفحة 404.html المخصصة (ErrorDocument 404 في .htaccess)"""
+        page = self.server.routes.not_found if code == HTTPStatus.NOT_FOUND else None
+        if page is None:
+            return super().send_error(code, message, explain)
+        try:
+            with open(page, "rb") as f:
+                body = f.read()
+        except OSError:
+            return super().send_error(code, message, explain)
+        self.log_error("code %d, message %s", code, message)
+        self.send_response(code, message)
+        self.send_header("Content-Type", content_type_header("text/html"))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
     def end_headers(self):
-        # إضافة UTF-8 encoding للملفات
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        for name, value in SECURITY_HEADERS:
+            self.send_header(name, value)
         super().end_headers()
-    
+
     def log_message(self, format, *args):
         """تسجيل الطلبات مع دعم اللغة العربية"""
-        print(f"[{self.log_date_time_string()}] {format % args}")
+        if self.server.log_requests:
+            print(f"[{self.log_date_time_string()}] {format % args}")
+
+
+class LegacyHTTPRequestHandler(ArabicHTTPRequestHandler):
+    """نفس المعالج بدون keep-alive، كما كان السيرفر الأصلي"""
+
+    protocol_version = "HTTP/1.0"
+
 
+class SiteServerMixin:
+    """
+    إعدادات وحالة السيرفر الواحد (make_server يملؤها)؛ المعالج يقرأها من
+    self.server، فسيرفران في نفس العملية (الاختبارات والقياس) لا يتداخلان
+    """
+
+    routes = None
+    stats = None
+    profiler = None
+    response_cache = None
+    use_sendfile = True
+    log_requests = True
+
+    def server_close(self):
+        super().server_close()
+        if self.routes is not None:
+            self.routes.stop()
+        if self.profiler is not None:
+            self.profiler.cancel()
+
+
+class PooledHTTPServer(SiteServerMixin, http.server.HTTPServer):
+    """
+    سيرفر يوزع الاتصالات على عدد ثابت من الـ threads
+
+    كل اتصال (مع كل طلبات keep-alive الخاصة به) يُعالج داخل worker واحد،
+    فالعميل البطيء لا يوقف باقي العملاء.
+    """
 
-def run_server():
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ninja-http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleHTTPServer(SiteServerMixin, socketserver.TCPServer):
+    """السيرفر الأصلي: اتصال واحد في كل مرة (للمقارنة في bench_serve.py)"""
+
+    allow_reuse_address = True
+
+
+def make_server(port=PORT, bind=BIND, workers=DEFAULT_WORKERS, single=False, directory=None,
+                cache_mb=DEFAULT_CACHE_MB, sendfile=True, log_requests=True, profiler=False):
+    """إنشاء السيرفر بدون تشغيله (يُستخدم أيضاً في سكريبتات القياس)"""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    if single:
+        httpd = SingleHTTPServer((bind, port), partial(LegacyHTTPRequestHandler, directory=directory))
+    else:
+        handler = partial(ArabicHTTPRequestHandler, directory=directory)
+        httpd = PooledHTTPServer((bind, port), handler, workers=workers)
+    httpd.response_cache = ResponseCache(cache_mb * 1024 * 1024)
+    httpd.use_sendfile = sendfile
+    httpd.log_requests = log_requests
+    httpd.routes = RouteTable(directory)
+    httpd.routes.watch()
+    httpd.stats = RequestStats()
+    httpd.profiler = RequestProfiler(profiler, os.path.join(directory, PROFILE_DIR))
+    return httpd
+
+
+def run_server(port=PORT, bind=BIND, workers=DEFAULT_WORKERS, headless=False, single=False,
+               cache_mb=DEFAULT_CACHE_MB, sendfile=True, profiler=False):
     """تشغيل السيرفر المحلي"""
-    
+
     # التأكد من أننا في المجلد الصحيح
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
-    
+
     # إنشاء السيرفر
-    Handler = ArabicHTTPRequestHandler
-    
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+    with make_server(port, bind, workers, single, script_dir, cache_mb, sendfile, profiler=profiler) as httpd:
+        host = bind or "localhost"
+        mode = "اتصال واحد" if single else f"{workers} worker + keep-alive"
         print("=" * 60)
         print("🚀 سيرفر متجر نينجا العراق يعمل الآن!")
         print("=" * 60)
-        print(f"📍 العنوان المحلي: http://localhost:{PORT}")
+        print(f"📍 العنوان المحلي: http://{host}:{port}")
         print(f"📁 المجلد: {script_dir}")
+        print(f"⚙️  الوضع: {mode}")
+        print(f"🗜️  الضغط: {', '.join(ENCODERS)} (كاش {cache_mb} MB)")
+        print(f"🧭 المسارات: {len(httpd.routes.files)}")
+        print(f"📊 الإحصائيات: http://{host}:{port}{STATS_PATH}")
+        if profiler:
+            print(f"⏱️  القياس: http://{host}:{port}{PROFILE_PATH}?seconds={DEFAULT_PROFILE_SECONDS}")
         print("=" * 60)
         print("💡 لإيقاف السيرفر اضغط: Ctrl+C")
         print("=" * 60)
-        
+
         # فتح المتصفح تلقائياً
-        webbrowser.open(f'http://localhost:{PORT}')
-        
+        if not headless:
+            webbrowser.open(f'http://{host}:{port}')
+
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -66,5 +973,23 @@ def run_server():
             print("=" * 60)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="سيرفر التطوير المحلي لمتجر نينجا العراق")
+    parser.add_argument("--port", type=int, default=PORT, help="رقم المنفذ (افتراضي 8000)")
+    parser.add_argument("--bind", default=BIND, help="عنوان الربط (افتراضي: كل الواجهات)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="عدد الـ threads التي تخدم الاتصالات")
+    parser.add_argument("--headless", action="store_true", help="عدم فتح المتصفح تلقائياً")
+    parser.add_argument("--single", action="store_true", help="السيرفر القديم أحادي الاتصال")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                        help="حجم كاش الردود المضغوطة بالميجابايت (0 = بدون كاش)")
+    parser.add_argument("--no-sendfile", action="store_true",
+                        help="نسخ الملفات عبر Python بدلاً من sendfile (للمقارنة)")
+    parser.add_argument("--enable-profiler", action="store_true",
+                        help=f"تفعيل {PROFILE_PATH}?seconds=N لقياس الطلبات بـ cProfile")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    run_server()
+    args = parse_args()
+    run_server(args.port, args.bind, args.workers, args.headless, args.single, args.cache_mb,
+               not args.no_sendfile, args.enable_profiler)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تحميل السايت ماب من الموقع مع كاش على القرص
+Streaming sitemap fetcher with an on-disk conditional-GET cache
+
+كل sitemap يُحفظ في .sitemap_cache/ مع ETag و Last-Modified. خلال مدة TTL
+يُقرأ الملف من القرص مباشرة، وبعدها يُرسل طلب شرطي (If-None-Match /
+If-Modified-Since) فإذا رد السيرفر 304 يُستخدم الملف المحفوظ. الرد الجديد
+يُحلَّل أثناء التحميل (بدون تحميله كاملاً في الذاكرة)، و sitemap index
+يُتابَع إلى الملفات الفرعية. عند فشل الشبكة تُستخدم النسخة المحفوظة إن وُجدت.
+
+الاستخدام / Usage:
+    python sitemap_cache.py https://iraq-ninja-store.arabsad.com/sitemap.xml
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+from url_index import SITEMAP_CHUNK_SIZE, parse_sitemap, read_chunks
+
+CACHE_DIR = ".sitemap_cache"
+DEFAULT_TTL = 6 * 60 * 60
+REQUEST_TIMEOUT = 20
+# أقصى عدد ملفات sitemap تُتابع من sitemap index واحد
+MAX_SITEMAPS = 50
+
+
+class SitemapCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=DEFAULT_TTL, session=None, timeout=REQUEST_TIMEOUT):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self.stats = {"fresh": 0, "not_modified": 0, "downloaded": 0, "stale": 0}
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".xml"), os.path.join(self.cache_dir, key + ".json")
+
+    def _load_meta(self, meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, meta_path, meta):
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def chunks(self, url):
+        """محتوى الـ sitemap كقطع bytes: من الكاش أو من الشبكة مباشرة"""
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path) if os.path.exists(body_path) else None
+        if meta and time.time() - meta.get("fetched_at", 0) < self.ttl:
+            self.stats["fresh"] += 1
+            return read_chunks(body_path)
+
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            resp = self.session.get(url, headers=headers, stream=True, timeout=self.timeout)
+        except requests.RequestException as e:
+            return self._stale(url, body_path, meta, e)
+
+        if resp.status_code == 304 and meta:
+            resp.close()
+            meta["fetched_at"] = time.time()
+            self._save_meta(meta_path, meta)
+            self.stats["not_modified"] += 1
+            return read_chunks(body_path)
+        if resp.status_code != 200:
+            resp.close()
+            return self._stale(url, body_path, meta, f"HTTP {resp.status_code}")
+        return self._download(url, resp, body_path, meta_path)
+
+    def _stale(self, url, body_path, meta, reason):
+        if meta:
+            print(f"⚠ تعذر تحديث {url} ({reason})، استخدام النسخة المحفوظة")
+            self.stats["stale"] += 1
+            return read_chunks(body_path)
+        print(f"✗ تعذر تحميل {url} ({reason})")
+        return iter(())
+
+    def _download(self, url, resp, body_path, meta_path):
+        """تمرير القطع للمحلل أثناء كتابتها في الكاش؛ الملف يُعتمد فقط إذا اكتمل التحميل"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.cache_dir)
+        complete = False
+        try:
+            with os.fdopen(fd, "wb") as f, resp:
+                for chunk in resp.iter_content(SITEMAP_CHUNK_SIZE):
+                    f.write(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp_path, body_path)
+                self._save_meta(meta_path, {
+                    "url": url,
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "fetched_at": time.time(),
+                })
+                self.stats["downloaded"] += 1
+            else:
+                os.unlink(tmp_path)
+
+    def iter_locs(self, url):
+        """كل روابط الصفحات في الـ sitemap، مع متابعة sitemap index إلى ملفاته الفرعية"""
+        pending = [url]
+        seen = set()
+        while pending and len(seen) < MAX_SITEMAPS:
+            current = pending.pop(0)
+            if current in seen:
+                continue
+            seen.add(current)
+            for kind, loc in parse_sitemap(self.chunks(current)):
+                if kind == "sitemap":
+                    pending.append(loc)
+                else:
+                    yield loc
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("الاستخدام: python sitemap_cache.py <sitemap-url>")
+        raise SystemExit(2)
+    cache = SitemapCache()
+    count = sum(1 for _ in cache.iter_locs(sys.argv[1]))
+    print(f"✓ {count} رابط — {cache.stats}")
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+اختبارات serve.py: سيرفرات مستقلة في نفس العملية
+"""
+
+import http.client
+import threading
+
+import pytest
+
+from serve import make_server
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / "index.html").write_text("<h1>متجر</h1>" * 100, encoding="utf-8")
+    (tmp_path / "404.html").write_text("<h1>404</h1>", encoding="utf-8")
+    return tmp_path
+
+
+def start(httpd):
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+def stop(httpd, thread):
+    httpd.shutdown()
+    httpd.server_close()
+    thread.join()
+
+
+def get(httpd, path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", httpd.server_address[1], timeout=5)
+    try:
+        conn.request("GET", path, headers=headers or {})
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+
+def test_servers_keep_their_own_settings(site):
+    first = make_server(port=0, bind="127.0.0.1", directory=str(site), cache_mb=0,
+                        sendfile=False, log_requests=False)
+    second = make_server(port=0, bind="127.0.0.1", directory=str(site), log_requests=False)
+    threads = [start(first), start(second)]
+    try:
+        for httpd in (first, second):
+            assert get(httpd, "/", {"Accept-Encoding": "gzip"})[0] == 200
+        # كاش بحجم 0 لا يحتفظ بشيء، والسيرفر الآخر لا يتأثر به
+        assert first.response_cache.size == 0
+        assert second.response_cache.size > 0
+        assert (first.use_sendfile, second.use_sendfile) == (False, True)
+    finally:
+        stop(first, threads[0])
+        stop(second, threads[1])
+
+
+def test_server_close_stops_route_watcher(site):
+    httpd = make_server(port=0, bind="127.0.0.1", directory=str(site), log_requests=False)
+    watcher = httpd.routes._watcher
+    assert watcher.is_alive()
+    stop(httpd, start(httpd))
+    assert not watcher.is_alive()
+
+
+def test_profiler_stop_then_restart(site):
+    httpd = make_server(port=0, bind="127.0.0.1", directory=str(site), log_requests=False, profiler=True)
+    thread = start(httpd)
+    try:
+        profiler = httpd.profiler
+        assert get(httpd, "/__profile?seconds=0.3")[0] == 202
+        old_timer = profiler._timer
+        assert get(httpd, "/__profile?stop=1")[0] == 200
+        # stop يلغي مؤقت الفترة
+        assert old_timer.finished.is_set()
+        assert get(httpd, "/__profile?seconds=60")[0] == 202
+        # مؤقت الفترة الأولى انتهى وقته: الفترة الجديدة مستمرة
+        old_timer.join(2)
+        threading.Event().wait(0.5)
+        assert profiler.active
+        last = profiler.last
+        # حتى لو وصل المؤقت القديم متأخراً لا يُنهي الفترة الجديدة ولا يغيّر last
+        profiler.stop(profiler._generation - 1)
+        assert profiler.active and profiler.last is last
+        summary = profiler.stop()
+        assert not profiler.active and profiler.last is summary
+    finally:
+        stop(httpd, thread)
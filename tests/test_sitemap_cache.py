@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+اختبارات sitemap_cache.py على سيرفر HTTP محلي يقدّم sitemap.xml و sitemap_index.xml من المشروع
+"""
+
+import email.utils
+import hashlib
+import http.server
+import os
+import re
+import threading
+import time
+
+import pytest
+
+from sitemap_cache import SitemapCache
+from url_index import SITEMAP_PATH, iter_sitemap_locs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SitemapHandler(http.server.BaseHTTPRequestHandler):
+    """ملفات المشروع مع ETag و Last-Modified؛ روابط sitemap_index.xml تشير للسيرفر المحلي"""
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        try:
+            with open(os.path.join(ROOT, self.path.lstrip("/")), "rb") as f:
+                body = f.read()
+        except OSError:
+            self.send_error(404)
+            return
+        if self.path == "/sitemap_index.xml":
+            body = re.sub(rb"<loc>[^<]*/([^/<]+)</loc>",
+                          lambda m: b"<loc>%s/%s</loc>" % (self.server.base_url.encode(), m.group(1)), body)
+        etag = '"%s"' % hashlib.sha1(body + str(self.server.mtime).encode()).hexdigest()
+        last_modified = email.utils.formatdate(self.server.mtime, usegmt=True)
+        if (self.headers.get("If-None-Match") == etag
+                or self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SitemapHandler)
+    httpd.requests = []
+    httpd.mtime = time.time()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_port}"
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SitemapCache(cache_dir=str(tmp_path / "cache"), timeout=5)
+
+
+def expected_locs():
+    return list(iter_sitemap_locs(os.path.join(ROOT, SITEMAP_PATH)))
+
+
+def test_fresh_fetch(server, cache):
+    locs = list(cache.iter_locs(server.base_url + "/sitemap.xml"))
+    assert locs == expected_locs()
+    assert cache.stats["downloaded"] == 1
+    # خلال مدة TTL يُقرأ الملف من القرص بدون طلب
+    assert list(cache.iter_locs(server.base_url + "/sitemap.xml")) == locs
+    assert cache.stats["fresh"] == 1
+    assert server.requests == ["/sitemap.xml"]
+
+
+@pytest.mark.parametrize("drop", ["ETag", "Last-Modified"])
+def test_revalidation_not_modified(server, cache, drop):
+    url = server.base_url + "/sitemap.xml"
+    list(cache.iter_locs(url))
+    # بعد انتهاء TTL: طلب شرطي بـ Last-Modified فقط أو ETag فقط، والرد 304
+    body_path, meta_path = cache._paths(url)
+    meta = cache._load_meta(meta_path)
+    meta["etag" if drop == "ETag" else "last_modified"] = None
+    cache._save_meta(meta_path, meta)
+    cache.ttl = 0
+    assert list(cache.iter_locs(url)) == expected_locs()
+    assert cache.stats["not_modified"] == 1
+    assert cache.stats["downloaded"] == 1
+    assert len(server.requests) == 2
+
+
+def test_ttl_expiry(server, cache):
+    url = server.base_url + "/sitemap.xml"
+    list(cache.iter_locs(url))
+    body_path, meta_path = cache._paths(url)
+    meta = cache._load_meta(meta_path)
+    meta["fetched_at"] -= cache.ttl + 1
+    cache._save_meta(meta_path, meta)
+    # الـ sitemap تغيّر على السيرفر: ETag و Last-Modified جديدان
+    server.mtime += 60
+    list(cache.iter_locs(url))
+    assert cache.stats["downloaded"] == 2
+    assert len(server.requests) == 2
+    # التحميل الجديد يبدأ مدة TTL من جديد
+    list(cache.iter_locs(url))
+    assert cache.stats["fresh"] == 1
+    assert len(server.requests) == 2
+
+
+def test_stale_when_origin_down(server, cache):
+    url = server.base_url + "/sitemap.xml"
+    list(cache.iter_locs(url))
+    server.shutdown()
+    server.server_close()
+    cache.ttl = 0
+    assert list(cache.iter_locs(url)) == expected_locs()
+    assert cache.stats["stale"] == 1
+
+
+def test_origin_down_without_cache(server, cache):
+    server.shutdown()
+    server.server_close()
+    assert list(cache.iter_locs(server.base_url + "/sitemap.xml")) == []
+
+
+def test_sitemap_index_follows_child(server, cache):
+    locs = list(cache.iter_locs(server.base_url + "/sitemap_index.xml"))
+    assert locs == expected_locs()
+    assert server.requests == ["/sitemap_index.xml", "/sitemap.xml"]
+    assert cache.stats["downloaded"] == 2
@@ -1,68 +1,33 @@
 # Global Store Optimization Script
+import argparse
 import os
 import re
+from functools import lru_cache
+
+from build_assets import build_stylesheet, stylesheet_link
+from html_pipeline import (START, BaseTagStage, FaqStage, Pipeline, RelativeLinksStage, ThemeStage,
+                           print_stage_timings)
+from parallel import Timer, print_summary, run_files
 
 # The base URL for GitHub Pages
 BASE_URL = "https://sherow1982.github.io/iraq-ninja-store/"
 BASE_TAG = f'<base href="{BASE_URL}">'
 
-WOODMART_STYLE = """
-<style>
-/* Theme Overhaul: Woodmart Style */
-:root {
-    --primary-color: #764ba2;
-    --secondary-color: #667eea;
-    --text-dark: #2d3748;
-    --bg-light: #f8fafc;
-    --white: #ffffff;
-    --shadow-sm: 0 1px 3px rgba(0,0,0,0.1);
-    --radius: 8px;
-}
-
-body {
-    font-family: 'Inter', 'Segoe UI', Tahoma, sans-serif !important;
-    background-color: var(--bg-light) !important;
-    color: var(--text-dark) !important;
-}
+# Theme CSS lives in templates/theme.css and is bundled by build_assets.py
+# into assets/site.<hash>.css; pages only link to it.
+FONT_LINK = '<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap" rel="stylesheet">'
+STYLESHEET_LINK_RE = re.compile(r'<link rel="stylesheet" href="assets/site\.[0-9a-f]+\.css">')
+FONT_LINK_RE = re.compile(re.escape(FONT_LINK))
+# Inline CSS left by older versions of this script; it now lives in the bundled stylesheet
+STALE_CSS = (
+    re.compile(r'/\* Theme Overhaul.*?(?:\.faq-item\s*\{.*?\}|\Z)', re.DOTALL),
+    re.compile(r'\A\s*\.faq-section \{.*?\.faq-answer \{.*?\}\s*\Z', re.DOTALL),
+)
 
-.site-header {
-    background: var(--white) !important;
-    color: var(--text-dark) !important;
-    border-bottom: 1px solid #e2e8f0;
-    box-shadow: var(--shadow-sm) !important;
-}
-.logo a, .main-nav a, .dropdown .dropbtn { color: var(--text-dark) !important; }
-.main-nav { border-top: 1px solid #f1f5f9 !important; }
-.search-input { background: #f1f5f9 !important; border: 1px solid #e2e8f0 !important; }
-.search-btn { background: var(--primary-color) !important; }
 
-/* Section Styling */
-.product-section, .reviews-section, .faq-section {
-    background: var(--white) !important;
-    border: 1px solid #e2e8f0 !important;
-    box-shadow: var(--shadow-sm) !important;
-    border-radius: var(--radius) !important;
-    margin-bottom: 30px !important;
-    padding: 30px !important;
-}
-
-.faq-title { 
-    color: var(--text-dark) !important; 
-    font-weight: 800 !important; 
-    border-bottom: 3px solid var(--primary-color);
-    display: inline-block;
-    margin-bottom: 25px !important;
-}
-.faq-item { 
-    background: #f9fafb !important; 
-    border-right: 5px solid var(--primary-color) !important; 
-    margin-bottom: 15px;
-    padding: 20px;
-    border-radius: var(--radius);
-}
-</style>
-<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap" rel="stylesheet">
-"""
+def theme_head(stylesheet):
+    """The <head> block every page gets: the hashed site stylesheet plus the Inter font."""
+    return f"{stylesheet_link(stylesheet)}\n{FONT_LINK}"
 
 FAQ_TEMPLATE = """
 <section class="faq-section">
@@ -88,63 +53,60 @@ FAQ_TEMPLATE = """
 </section>
 """
 
-def process_file(filepath):
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # 1. Base Tag Fix (Ensure unique and correct)
-    content = re.sub(r'<base href=".*?">', '', content) # Remove any existing
-    content = content.replace('<head>', f'<head>\n{BASE_TAG}')
+def is_product_page(path):
+    return 'products' in path.lower()
 
-    # 2. Convert Absolute Links/Sources/Actions to Relative
-    content = content.replace('href="/', 'href="')
-    content = content.replace('src="/', 'src="')
-    content = content.replace('action="/', 'action="')
-    content = content.replace("window.location.href='/", "window.location.href='")
+def product_faq(texts):
+    """FAQ_TEMPLATE for the product named in the page's <h1> (or <title>)."""
+    if 'h1' in texts:
+        # The <h1> is the bare name, which may itself contain '-'
+        product_name = texts['h1'].strip()
+    elif 'title' in texts:
+        product_name = texts['title'].split('|')[0].split('-')[0].strip()
+    else:
+        product_name = "هذا المنتج"
+    return FAQ_TEMPLATE.format(product_name=product_name) + '\n'
 
-    # 3. Inject Woodmart Theme & Clean up old style/font duplicates
-    # Remove previous injections of Woodmart/Inter Font to avoid duplicates
-    # Improved regex to catch the block whether it has <style> tags or not, and handle broken HTML
-    content = re.sub(r'(<style>)?\s*/\* Theme Overhaul.*?</style>', '', content, flags=re.DOTALL)
-    content = re.sub(r'/\* Theme Overhaul.*?\*/.*?\.faq-item\s*{.*?}', '', content, flags=re.DOTALL)
-    
-    content = content.replace('<link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800&display=swap" rel="stylesheet">', '')
-    content = content.replace('</style>\n</style>', '</style>')
-    
-    # Inject fresh
-    if '</head>' in content:
-        content = content.replace('</head>', WOODMART_STYLE + '\n</head>')
+@lru_cache(maxsize=None)
+def build_pipeline(head=None):
+    """All optimizations, in order; every stage leaves already optimized pages untouched."""
+    return Pipeline([
+        # 1. Base Tag Fix (exactly one, right after <head>)
+        BaseTagStage(BASE_TAG),
+        # 2. Convert Absolute Links/Sources/Actions to Relative
+        RelativeLinksStage(),
+        # 3. Drop old theme links and inline styles, link the current stylesheet
+        ThemeStage(head, stale_links=(STYLESHEET_LINK_RE, FONT_LINK_RE), stale_css=STALE_CSS),
+        # 4. Product-Specific FAQ, replacing any FAQ section, before reviews or footer
+        FaqStage(product_faq, anchors=((START, 'div', 'reviews-section'), (START, 'footer', None)),
+                 capture={'h1': 'product-title', 'title': None}, applies=is_product_page),
+    ])
 
-    # 4. Product-Specific FAQ
-    if 'products' in filepath.lower():
-        title_match = re.search(r'<h1 class="product-title">(.*?)</h1>', content)
-        if not title_match:
-            title_match = re.search(r'<title>(.*?)</title>', content)
-        
-        product_name = title_match.group(1).split('|')[0].split('-')[0].strip() if title_match else "هذا المنتج"
-        faq_html = FAQ_TEMPLATE.format(product_name=product_name)
-        
-        # Clean ALL FAQ sections (old and new)
-        content = re.sub(r'<section class="faq-section">.*?</section>', '', content, flags=re.DOTALL)
-        
-        # Insert before reviews or footer
-        if '<div class="reviews-section">' in content:
-            content = content.replace('<div class="reviews-section">', faq_html + '\n<div class="reviews-section">')
-        elif '<footer' in content:
-            content = content.replace('<footer', faq_html + '\n<footer')
+def process_file(filepath, head=None):
+    """Apply all optimizations to one page. Returns True if the file was rewritten."""
+    return build_pipeline(head).process_file(filepath)[0]
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(content)
-
-def run():
-    print(f"Starting Global Optimization for {BASE_URL}...")
-    count = 0
-    for root, dirs, files in os.walk('.'):
+def collect_files(root='.'):
+    paths = []
+    for dirpath, dirs, files in os.walk(root):
+        # templates/ holds build_site.py's page templates, not pages
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d != 'templates']
         for file in files:
             if file.endswith('.html') and 'theme_manager' not in file:
-                process_file(os.path.join(root, file))
-                count += 1
-    print(f"Success! Optimized {count} files. 🚀")
+                paths.append(os.path.join(dirpath, file))
+    return paths
+
+def run(jobs=1):
+    print(f"Starting Global Optimization for {BASE_URL}...")
+    pipeline = build_pipeline(theme_head(build_stylesheet()))
+    with Timer() as t:
+        results = run_files(pipeline.process_file, collect_files(), jobs)
+    _, errors = print_summary(results, t.elapsed, jobs, changed=lambda result: result[0])
+    print_stage_timings(pipeline.names, results)
+    print(f"Success! Optimized {len(results) - len(errors)} files. 🚀")
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Re-theme every HTML page of the store")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="worker processes (0 = one per CPU core)")
+    run(parser.parse_args().jobs)
@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import io
 import os
 import random
-import json
 import requests
 from datetime import datetime
 from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tweepy
 
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+from image_cache import ImageCache
+from posting_ledger import PostingLedger, current_month
+from sitemap_cache import SitemapCache
+from url_index import load_index, normalize_slug, product_slug_from_url
+
 API_KEY = os.getenv("TWITTER_API_KEY")
 API_SECRET = os.getenv("TWITTER_API_KEY_SECRET") or os.getenv("TWITTER_API_SECRET")
 ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
@@ -22,44 +30,48 @@ api_v1 = tweepy.API(auth)
 client = tweepy.Client(consumer_key=API_KEY, consumer_secret=API_SECRET, access_token=ACCESS_TOKEN, access_token_secret=ACCESS_SECRET)
 
 BASE_URL = "https://iraq-ninja-store.arabsad.com"
-SITEMAP_URL = f"{BASE_URL}/sitemap.xml"
-PRODUCTS_JSON_PATH = "products.json"
-TRACKING_FILE = "posted_products.json"
+# الـ index موجود دائماً ويشير لـ sitemap.xml أو لأجزائه sitemap-N.xml
+SITEMAP_URL = f"{BASE_URL}/sitemap_index.xml"
 MAX_POSTS_PER_MONTH = 95
 
+HTTP_RETRIES = 3
+HTTP_POOL_SIZE = 4
+
 IRAQ_GOVS = ["بغداد", "البصرة", "الموصل", "أربيل", "كركوك", "النجف", "كربلاء", "السليمانية", "الأنبار", "ديالى", "دهوك", "بابل", "ذي_قار", "واسط", "ميسان", "المثنى", "القادسية", "صلاح_الدين"]
 
+def make_session():
+    """جلسة HTTP مشتركة: إعادة استخدام الاتصالات + إعادة المحاولة عند أخطاء الشبكة و 429/5xx"""
+    retry = Retry(total=HTTP_RETRIES, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session = requests.Session()
+    session.headers["User-Agent"] = "Mozilla/5.0"
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+SESSION = make_session()
+IMAGE_CACHE = ImageCache()
+
 def load_products():
-    with open(PRODUCTS_JSON_PATH, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    products = data if isinstance(data, list) else data
+    products = load_catalog(PRODUCTS_JSON_PATH).products
     print(f"✓ تم تحميل {len(products)} منتج")
     return products
 
 def fetch_sitemap_links():
     try:
-        resp = requests.get(SITEMAP_URL, timeout=20)
-        if resp.status_code != 200:
-            return {}
+        cache = SitemapCache(session=SESSION)
         links = {}
-        for line in resp.text.splitlines():
-            line = line.strip()
-            if line.startswith("<loc>") and line.endswith("</loc>"):
-                url = line.replace("<loc>", "").replace("</loc>", "").strip()
-                if "/products/" in url and url.endswith(".html"):
-                    slug = url.split("/products/")[-1].replace(".html", "")
-                    links[slug] = url
-        print(f"✓ تم سحب روابط المنتجات ({len(links)}) من السايت ماب")
+        for url in cache.iter_locs(SITEMAP_URL):
+            slug = product_slug_from_url(url)
+            if slug:
+                links[slug] = url
+        print(f"✓ تم سحب روابط المنتجات ({len(links)}) من السايت ماب {cache.stats}")
         return links
-    except Exception:
+    except Exception as e:
+        print(f"✗ خطأ في قراءة السايت ماب: {e}")
         return {}
 
-def normalize_slug(name):
-    slug = name.strip()
-    for ch in ["(", ")", "[", "]", "{", "}", "/", "\\", "|", ",", "،", ".", "!", "؟", ":", ";", "'", '"']:
-        slug = slug.replace(ch, "")
-    return slug.replace(" ", "-").lower()
-
 def make_product_key(product):
     pid = product.get("id") or product.get("handle") or product.get("slug")
     if pid:
@@ -95,40 +107,21 @@ def _extract_from_variants(product):
             return v0.get("image") or v0.get("image_url") or ""
     return ""
 
-def load_tracking():
-    current_month = datetime.now().strftime("%Y-%m")
-    if not os.path.exists(TRACKING_FILE):
-        return {"posted_products": [], "current_month": current_month, "posts_this_month": 0, "cycle_count": 0}
-    try:
-        with open(TRACKING_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception:
-        data = {}
-    tracking = {
-        "posted_products": data.get("posted_products", []),
-        "current_month": data.get("current_month", current_month),
-        "posts_this_month": data.get("posts_this_month", 0),
-        "cycle_count": data.get("cycle_count", 0)
-    }
-    if tracking["current_month"] != current_month:
-        print("📅 شهر جديد! إعادة تعيين العداد.")
-        tracking["current_month"] = current_month
-        tracking["posts_this_month"] = 0
-    return tracking
-
-def save_tracking(tracking):
-    with open(TRACKING_FILE, "w", encoding="utf-8") as f:
-        json.dump(tracking, f, ensure_ascii=False, indent=2)
+def pick_unposted(products, ledger):
+    """أول منتج غير منشور بترتيب عشوائي (كل فحص بحث في فهرس السجل)"""
+    order = list(products)
+    random.shuffle(order)
+    for product in order:
+        if not ledger.is_posted(make_product_key(product)):
+            return product
+    return None
 
-def choose_product_for_post(products, sitemap_links, tracking):
-    posted_set = set(tracking["posted_products"])
-    unposted = [p for p in products if make_product_key(p) not in posted_set]
-    if not unposted:
-        tracking["cycle_count"] += 1
-        tracking["posted_products"] = []
-        unposted = products
-        print(f"🔄 تم إنهاء دورة نشر كاملة، بدء دورة جديدة. (الدورة رقم: {tracking['cycle_count']})")
-    product = random.choice(unposted)
+def choose_product_for_post(products, url_index, ledger):
+    product = pick_unposted(products, ledger)
+    if product is None:
+        cycle = ledger.new_cycle()
+        product = random.choice(products)
+        print(f"🔄 تم إنهاء دورة نشر كاملة، بدء دورة جديدة. (الدورة رقم: {cycle})")
     key = make_product_key(product)
     name = product.get("name") or product.get("title") or "منتج بدون اسم"
     price = product.get("price") or product.get("sale_price") or ""
@@ -141,8 +134,7 @@ def choose_product_for_post(products, sitemap_links, tracking):
     sku_clean = product.get("sku", "").replace(".", "").lower()
     default_url = f"{BASE_URL}/products/{encoded_slug}-{sku_clean}.html"
     
-    product_url = sitemap_links.get(slug_guess) or sitemap_links.get(encoded_slug) or default_url
-    tracking["posted_products"].append(key)
+    product_url = url_index.lookup(product) or default_url
     return {"name": name, "price": price, "old_price": old_price, "image_url": image_url, "product_url": product_url, "product_key": key}
 
 def calc_discount(price, old_price):
@@ -157,7 +149,7 @@ def calc_discount(price, old_price):
 
 def shorten_url_disabled(url):
     try:
-        res = requests.get(f"http://tinyurl.com/api-create.php?url={url}", timeout=10)
+        res = SESSION.get(f"http://tinyurl.com/api-create.php?url={url}", timeout=10)
         if res.status_code == 200 and res.text.startswith("http"):
             print(f"✓ تم اختصار الرابط: {res.text.strip()}")
             return res.text.strip()
@@ -193,27 +185,44 @@ def format_price(val):
         return str(val)
 
 def download_image(image_url):
+    """bytes الصورة من الكاش أو من الشبكة (تبقى في الذاكرة بدون ملف مؤقت)"""
     if not image_url:
         print("⚠ لا يوجد رابط صورة")
         return None
+    cached = IMAGE_CACHE.get(image_url)
+    if cached is not None:
+        print(f"✓ الصورة موجودة في الكاش ({len(cached)} بايت)")
+        return cached
     try:
         print(f"⏳ جاري تحميل الصورة من: {image_url}")
-        resp = requests.get(image_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=20)
+        resp = SESSION.get(image_url, timeout=20)
         if resp.status_code != 200:
             print(f"✗ فشل تحميل الصورة (HTTP {resp.status_code})")
             return None
         print(f"✓ تم تحميل الصورة ({len(resp.content)} بايت)")
-        with open("product_image.jpg", "wb") as f:
-            f.write(resp.content)
-        return "product_image.jpg"
+        try:
+            IMAGE_CACHE.put(image_url, resp.content)
+        except OSError as e:
+            print(f"⚠ تعذر حفظ الصورة في الكاش: {e}")
+        return resp.content
     except Exception as e:
         print(f"✗ خطأ في تحميل الصورة: {e}")
         return None
 
-def upload_media_to_twitter(image_path):
+def image_filename(data):
+    """اسم ملف بامتداد مناسب لنوع الصورة (يستخدمه tweepy لتحديد نوع الملف)"""
+    if data.startswith(b"\x89PNG"):
+        return "product_image.png"
+    if data.startswith(b"GIF8"):
+        return "product_image.gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "product_image.webp"
+    return "product_image.jpg"
+
+def upload_media_to_twitter(image_data):
     try:
         print(f"⏳ جاري رفع الصورة إلى تويتر")
-        media = api_v1.media_upload(image_path)
+        media = api_v1.media_upload(filename=image_filename(image_data), file=io.BytesIO(image_data))
         print(f"✓ تم رفع صورة المنتج (Media ID: {media.media_id})")
         return str(media.media_id)
     except Exception as e:
@@ -270,43 +279,44 @@ def main():
     print("Twitter Auto-Post Bot - Iraq Ninja Store")
     print(f"التاريخ: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("=" * 50)
-    tracking = load_tracking()
-    print(f"\n📊 إحصائيات الشهر الحالي ({tracking['current_month']}):")
-    print(f"  - المنشورات هذا الشهر: {tracking['posts_this_month']}/{MAX_POSTS_PER_MONTH}")
-    print(f"  - المنتجات المنشورة في هذه الدورة: {len(tracking['posted_products'])}")
-    print(f"  - رقم الدورة: {tracking['cycle_count']}\n")
-    if tracking["posts_this_month"] >= MAX_POSTS_PER_MONTH:
+    # القفل يبقى طوال التشغيل حتى لا يختار تشغيلان متداخلان نفس المنتج
+    with PostingLedger() as ledger:
+        run(ledger)
+
+def run(ledger):
+    posts_this_month = ledger.posts_this_month()
+    print(f"\n📊 إحصائيات الشهر الحالي ({current_month()}):")
+    print(f"  - المنشورات هذا الشهر: {posts_this_month}/{MAX_POSTS_PER_MONTH}")
+    print(f"  - المنتجات المنشورة في هذه الدورة: {ledger.posted_in_cycle()}")
+    print(f"  - رقم الدورة: {ledger.cycle}\n")
+    if posts_this_month >= MAX_POSTS_PER_MONTH:
         print(f"⚠ تم الوصول للحد الأقصى ({MAX_POSTS_PER_MONTH} منشور/شهر)")
         print("⏸ لن يتم النشر حتى بداية الشهر القادم")
-        save_tracking(tracking)
         return
     products = load_products()
-    sitemap_links = fetch_sitemap_links()
-    product = choose_product_for_post(products, sitemap_links, tracking)
+    url_index = load_index()
+    if not len(url_index):
+        # لا توجد مصادر محلية (products_slugs.csv / sitemap.xml): نرجع للسايت ماب على الموقع
+        url_index.add_sitemap_links(fetch_sitemap_links())
+    product = choose_product_for_post(products, url_index, ledger)
     print("📦 المنتج المختار:")
     print(f"  الاسم: {product['name']}")
     print(f"  السعر: {product['price']}")
     print(f"  رابط الصورة: {product['image_url']}\n")
-    image_path = download_image(product["image_url"])
-    media_id = upload_media_to_twitter(image_path) if image_path else None
+    image_data = download_image(product["image_url"])
+    media_id = upload_media_to_twitter(image_data) if image_data else None
     tweet_text = build_tweet_text(product)
     success = post_tweet_with_image(tweet_text, media_id)
     if success:
-        tracking["posts_this_month"] += 1
-        save_tracking(tracking)
+        ledger.record_post(product["product_key"])
         print("=" * 50)
         print("✓ العملية اكتملت بنجاح")
-        print(f"📊 المنشورات المتبقية: {MAX_POSTS_PER_MONTH - tracking['posts_this_month']}")
+        print(f"📊 المنشورات المتبقية: {MAX_POSTS_PER_MONTH - ledger.posts_this_month()}")
         print("=" * 50)
     else:
         print("=" * 50)
         print("✗ فشلت العملية")
         print("=" * 50)
-    if image_path and os.path.exists(image_path):
-        try:
-            os.remove(image_path)
-        except Exception:
-            pass
 
 if __name__ == "__main__":
     main()
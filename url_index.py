@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فهرس روابط المنتجات لبوت تويتر (رقم المنتج / SKU / slug ← الرابط)
+Offline product URL index for twitter_bot.py
+
+يُبنى من products_slugs.csv و sitemap_index.xml (مع ملفاته الفرعية) المحليين (و products.json لأرقام
+المنتجات) ويُحفظ في .product_urls.json. عند التشغيل يُقرأ الملف مرة واحدة،
+ولا يُعاد بناؤه إلا إذا تغيّر حجم أو وقت تعديل أحد المصادر.
+
+الاستخدام / Usage:
+    python url_index.py            # إعادة بناء الفهرس وطباعة الإحصائيات
+"""
+
+import csv
+import json
+import os
+import posixpath
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote, urlsplit
+
+from catalog import PRODUCTS_JSON_PATH, load_catalog
+
+INDEX_PATH = ".product_urls.json"
+INDEX_VERSION = 1
+SLUGS_CSV_PATH = "products_slugs.csv"
+# generate_feeds.py يكتبه دائماً، سواء كان الـ sitemap ملفاً واحداً أو مقسّماً
+SITEMAP_PATH = "sitemap_index.xml"
+
+SITEMAP_CHUNK_SIZE = 64 * 1024
+
+_ZERO_WIDTH = re.compile("[\u200b-\u200f\u2060\ufeff]")
+_SKU_SUFFIX = re.compile(r"-[a-z]\d+$")
+
+
+def normalize_slug(name):
+    slug = name.strip()
+    for ch in ["(", ")", "[", "]", "{", "}", "/", "\\", "|", ",", "،", ".", "!", "؟", ":", ";", "'", '"']:
+        slug = slug.replace(ch, "")
+    return slug.replace(" ", "-").lower()
+
+
+def slug_key(slug):
+    """مفتاح موحّد للـ slug: بدون ترميز URL أو أحرف غير مرئية أو شرطات مكررة"""
+    slug = _ZERO_WIDTH.sub("", unquote(slug)).lower()
+    return re.sub(r"-{2,}", "-", slug).strip("-")
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _drain(parser):
+    for _, elem in parser.read_events():
+        name = _local_name(elem.tag)
+        if name in ("url", "sitemap"):
+            loc = next((child.text for child in elem if _local_name(child.tag) == "loc"), None)
+            if loc and loc.strip():
+                yield name, loc.strip()
+            elem.clear()
+
+
+def parse_sitemap(chunks):
+    """
+    قراءة sitemap أو sitemap index بشكل تدريجي من قطع bytes.
+    يُرجع ("url", رابط) لكل صفحة و ("sitemap", رابط) لكل sitemap فرعي.
+    """
+    parser = ET.XMLPullParser(events=("end",))
+    empty = True
+    for chunk in chunks:
+        empty = empty and not chunk
+        parser.feed(chunk)
+        yield from _drain(parser)
+    if empty:
+        return
+    parser.close()
+    yield from _drain(parser)
+
+
+def read_chunks(path, size=SITEMAP_CHUNK_SIZE):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _local_sitemap(path, loc):
+    """الملف المحلي لرابط sitemap فرعي: نفس الاسم في مجلد الـ index"""
+    return os.path.join(os.path.dirname(path), posixpath.basename(urlsplit(loc).path))
+
+
+def sitemap_files(path):
+    """الملف نفسه، وإذا كان sitemap index فملفاته الفرعية الموجودة محلياً أيضاً"""
+    files, pending = [], [path]
+    while pending:
+        current = pending.pop(0)
+        if current in files or not os.path.exists(current):
+            continue
+        files.append(current)
+        for kind, loc in parse_sitemap(read_chunks(current)):
+            if kind == "url":
+                break  # urlset عادي: لا ملفات فرعية
+            pending.append(_local_sitemap(current, loc))
+    return files
+
+
+def iter_sitemap_locs(path):
+    """روابط الصفحات في ملف sitemap محلي، مع متابعة sitemap index إلى ملفاته الفرعية"""
+    for sitemap in sitemap_files(path):
+        for kind, loc in parse_sitemap(read_chunks(sitemap)):
+            if kind == "url":
+                yield loc
+
+
+def product_slug_from_url(url):
+    if "/products/" not in url or not url.endswith(".html"):
+        return None
+    return url.split("/products/")[-1][:-len(".html")]
+
+
+def source_stamps(paths):
+    stamps = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stamps[path] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+class ProductURLIndex:
+    def __init__(self, by_id=None, by_sku=None, by_slug=None):
+        self.by_id = by_id or {}
+        self.by_sku = by_sku or {}
+        self.by_slug = by_slug or {}
+
+    def __len__(self):
+        return len(self.by_slug)
+
+    def add_slug(self, slug, url):
+        self.by_slug.setdefault(slug_key(slug), url)
+
+    def add_sitemap_links(self, links):
+        """إضافة روابط {slug: url} (مثلاً من السايت ماب البعيد) دون استبدال الموجود"""
+        for slug, url in links.items():
+            self.add_slug(slug, url)
+
+    def lookup(self, product):
+        pid = product.get("id")
+        if pid is not None and str(pid) in self.by_id:
+            return self.by_id[str(pid)]
+        sku = product.get("sku")
+        if sku and sku in self.by_sku:
+            return self.by_sku[sku]
+        name = product.get("name") or product.get("title") or ""
+        return self.by_slug.get(slug_key(normalize_slug(name))) if name else None
+
+    def to_dict(self):
+        return {"by_id": self.by_id, "by_sku": self.by_sku, "by_slug": self.by_slug}
+
+
+def build_index(csv_path=SLUGS_CSV_PATH, sitemap_path=SITEMAP_PATH, products_path=PRODUCTS_JSON_PATH):
+    index = ProductURLIndex()
+    products = load_catalog(products_path).products if os.path.exists(products_path) else []
+
+    if os.path.exists(csv_path):
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                url = row["URL"]
+                position = int(row["Index"])
+                if position < len(products) and products[position].get("sku") == row["SKU"]:
+                    index.by_id[str(products[position]["id"])] = url
+                index.by_sku.setdefault(row["SKU"], url)
+                index.add_slug(row["Slug"], url)
+                index.add_slug(_SKU_SUFFIX.sub("", row["Slug"]), url)
+                index.add_slug(normalize_slug(row["Title"]), url)
+
+    # روابط السايت ماب بدون SKU تُربط بالرابط الرسمي إن وُجد، وإلا تُستخدم كما هي
+    if os.path.exists(sitemap_path):
+        for url in iter_sitemap_locs(sitemap_path):
+            slug = product_slug_from_url(url)
+            if slug:
+                index.add_slug(slug, url)
+    return index
+
+
+def _write_json(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_index(path=INDEX_PATH, csv_path=SLUGS_CSV_PATH, sitemap_path=SITEMAP_PATH,
+               products_path=PRODUCTS_JSON_PATH):
+    """تحميل الفهرس من القرص، أو إعادة بنائه إذا تغيّرت مصادره"""
+    stamps = source_stamps([csv_path, *sitemap_files(sitemap_path), products_path])
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION and data.get("sources") == stamps:
+            return ProductURLIndex(data["by_id"], data["by_sku"], data["by_slug"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = build_index(csv_path, sitemap_path, products_path)
+    if stamps:
+        try:
+            _write_json(path, dict(index.to_dict(), version=INDEX_VERSION, sources=stamps))
+        except OSError as e:
+            print(f"⚠ تعذر حفظ فهرس الروابط: {e}")
+    print(f"✓ تم بناء فهرس الروابط ({len(index.by_id)} منتج، {len(index)} slug)")
+    return index
+
+
+if __name__ == "__main__":
+    if os.path.exists(INDEX_PATH):
+        os.remove(INDEX_PATH)
+    load_index()